@@ -0,0 +1,540 @@
+import errno
+import fcntl
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from tendrl.gluster_integration import ini2json
+from tendrl.gluster_integration import metrics
+
+
+# get-state keys look like "volume1.brick2.client3.bytesread", every
+# "<kind><N>" component below introduces a nested entity
+_NESTED_RE = re.compile(r'^(brick|snapshot|pair|client)([0-9]+)$')
+
+
+class StateEntity(object):
+    """One indexed get-state entry (peerN, volumeN, volumeN.brickM ...)
+
+    Fields are stored with the entity prefix stripped, so
+    "volume1.brick2.port" is available as brick['port'].
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.fields = {}
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def get(self, field, default=None):
+        return self.fields.get(field, default)
+
+
+class PeerState(StateEntity):
+    pass
+
+
+class ClientState(StateEntity):
+    pass
+
+
+class VolumeMember(StateEntity):
+    def __init__(self, index, volume):
+        super(VolumeMember, self).__init__(index)
+        self.volume = volume
+
+
+class SnapshotState(VolumeMember):
+    pass
+
+
+class PairState(VolumeMember):
+    pass
+
+
+class BrickState(VolumeMember):
+    def __init__(self, index, volume):
+        super(BrickState, self).__init__(index, volume)
+        self.clients = []
+
+
+class VolumeState(StateEntity):
+    def __init__(self, index):
+        super(VolumeState, self).__init__(index)
+        self.bricks = []
+        self.snapshots = []
+        self.pairs = []
+        # "volumeN.options.<name>" overrides of the detail output
+        self.options = {}
+        # defaults from `gluster get-state glusterd ... volumeoptions`
+        self.default_options = None
+
+    @property
+    def id(self):
+        return self.fields.get('id')
+
+    @property
+    def name(self):
+        return self.fields.get('name')
+
+    def effective_options(self):
+        """Default values of the volume options with the overrides
+        applied, None when the defaults were not collected
+        """
+        if self.default_options is None:
+            return None
+        options = dict(self.default_options)
+        options.update(self.options)
+        return options
+
+
+_MEMBER_TYPES = {
+    'brick': BrickState,
+    'snapshot': SnapshotState,
+    'pair': PairState,
+}
+
+
+def _sorted(entities):
+    return [entities[index] for index in sorted(entities)]
+
+
+class GlusterState(object):
+    """Typed, indexed view of `gluster get-state glusterd ... detail`
+
+    Built once per sync from the dict returned by ini2json, it replaces
+    the 'volume%s.brick%s.field' string lookups over raw_data with
+    nested peers -> volumes -> bricks -> clients/snapshots/pairs lists,
+    indexed by volume id, volume name and brick hostname.
+    """
+
+    def __init__(self, raw_data=None, raw_options=None):
+        self.raw_data = raw_data or {}
+        self.peers = self._build_peers(self.raw_data.get('Peers', {}))
+        self.volumes = self._build_volumes(self.raw_data.get('Volumes', {}))
+        self.volume_by_id = {}
+        self.volume_by_name = {}
+        self.bricks_by_hostname = {}
+        for volume in self.volumes:
+            if volume.id is not None:
+                self.volume_by_id[volume.id] = volume
+            if volume.name is not None:
+                self.volume_by_name[volume.name] = volume
+            for brick in volume.bricks:
+                self.bricks_by_hostname.setdefault(
+                    brick.get('hostname'), []
+                ).append(brick)
+        if raw_options is not None:
+            self._attach_default_options(
+                raw_options.get('Volume Options') or {}
+            )
+
+    def _attach_default_options(self, vol_options):
+        # "volumeN.options.keyM" / "volumeN.options.valueM" pairs, where
+        # only M < "volumeN.options.count" are reported options
+        keys = {}
+        values = {}
+        counts = {}
+        names = {}
+        for key, value in vol_options.iteritems():
+            name, _, field = key.partition('.')
+            try:
+                index = int(name[6:])
+            except ValueError:
+                continue
+            if field == 'name':
+                names[index] = value
+            elif field == 'options.count':
+                counts[index] = int(value)
+            elif field.startswith('options.key'):
+                keys.setdefault(index, {})[int(field[11:])] = value
+            elif field.startswith('options.value'):
+                values.setdefault(index, {})[int(field[13:])] = value
+        for volume in self.volumes:
+            # both get-state outputs list volumes in the same order, the
+            # name (when reported) guards against a volume being created
+            # or deleted in between the two calls
+            if names.get(volume.index, volume.name) != volume.name or \
+                volume.index not in counts:
+                continue
+            options = {}
+            volume_keys = keys.get(volume.index, {})
+            volume_values = values.get(volume.index, {})
+            for opt_count in range(1, counts[volume.index]):
+                if opt_count in volume_keys and opt_count in volume_values:
+                    options[volume_keys[opt_count]] = \
+                        volume_values[opt_count]
+            volume.default_options = options
+
+    def delta(self, previous):
+        return StateDelta(previous, self)
+
+    @staticmethod
+    def _build_peers(peers):
+        entities = {}
+        for key, value in peers.iteritems():
+            name, _, field = key.partition('.')
+            if not name.startswith('peer') or not field:
+                continue
+            try:
+                index = int(name[4:])
+            except ValueError:
+                continue
+            peer = entities.get(index)
+            if peer is None:
+                peer = entities[index] = PeerState(index)
+            peer.fields[field] = value
+        return _sorted(entities)
+
+    @staticmethod
+    def _build_volumes(volumes):
+        entities = {}
+        members = {}
+        clients = {}
+        for key, value in volumes.iteritems():
+            name, _, field = key.partition('.')
+            if not name.startswith('volume') or not field:
+                continue
+            try:
+                index = int(name[6:])
+            except ValueError:
+                continue
+            volume = entities.get(index)
+            if volume is None:
+                volume = entities[index] = VolumeState(index)
+            kind, _, sub_field = field.partition('.')
+            match = _NESTED_RE.match(kind) if sub_field else None
+            if match is None or match.group(1) not in _MEMBER_TYPES:
+                volume.fields[field] = value
+                if kind == 'options' and sub_field:
+                    volume.options[sub_field] = value
+                continue
+            kind, sub_index = match.group(1), int(match.group(2))
+            member = members.get((index, kind, sub_index))
+            if member is None:
+                member = members[(index, kind, sub_index)] = \
+                    _MEMBER_TYPES[kind](sub_index, volume)
+            if kind == 'brick':
+                client, _, client_field = sub_field.partition('.')
+                match = _NESTED_RE.match(client) if client_field else None
+                if match is not None and match.group(1) == 'client':
+                    brick_clients = clients.setdefault(member, {})
+                    client_index = int(match.group(2))
+                    client = brick_clients.get(client_index)
+                    if client is None:
+                        client = brick_clients[client_index] = \
+                            ClientState(client_index)
+                    client.fields[client_field] = value
+                    continue
+            member.fields[sub_field] = value
+
+        for brick, brick_clients in clients.iteritems():
+            brick.clients = _sorted(brick_clients)
+        grouped = {}
+        for (index, kind, sub_index), member in members.iteritems():
+            grouped.setdefault((index, kind), {})[sub_index] = member
+        for (index, kind), kind_members in grouped.iteritems():
+            setattr(entities[index], kind + 's', _sorted(kind_members))
+        return _sorted(entities)
+
+
+def _fields(entities):
+    return [entity.fields for entity in entities]
+
+
+class StateDelta(object):
+    """Structural diff of a GlusterState against the previous sync
+
+    Every check answers True when there is nothing to compare with (no
+    previous state, new peer/volume/brick ...), so callers can always
+    fall back to a full write.
+    """
+
+    def __init__(self, previous, current):
+        self.previous = previous
+        self.current = current
+        self._peers = None
+        self._members = {}
+
+    def _previous_volume(self, volume):
+        if self.previous is None:
+            return None
+        return self.previous.volume_by_id.get(volume.id)
+
+    def changed(self):
+        """True when any peer or volume was added, removed or changed"""
+        if self.previous is None or \
+            len(self.previous.peers) != len(self.current.peers) or \
+            len(self.previous.volumes) != len(self.current.volumes):
+            return True
+        return any(
+            self.peer_changed(peer) for peer in self.current.peers
+        ) or any(
+            self.volume_changed(volume) for volume in self.current.volumes
+        )
+
+    def peer_changed(self, peer):
+        if self.previous is None:
+            return True
+        if self._peers is None:
+            self._peers = dict(
+                (p.get('uuid'), p) for p in self.previous.peers
+            )
+        old = self._peers.get(peer.get('uuid'))
+        return old is None or old.fields != peer.fields
+
+    def volume_changed(self, volume):
+        old = self._previous_volume(volume)
+        return old is None or old.fields != volume.fields
+
+    def options_changed(self, volume):
+        old = self._previous_volume(volume)
+        return old is None or old.default_options is None or \
+            old.default_options != volume.default_options or \
+            old.options != volume.options
+
+    def options_diff(self, volume):
+        """{option: (previous value, value)} of the effective options
+        which changed, None when there is nothing to compare with
+
+        A value is None on the side where the option is not reported.
+        """
+        old = self._previous_volume(volume)
+        if old is None:
+            return None
+        old_options = old.effective_options()
+        options = volume.effective_options()
+        if old_options is None or options is None:
+            return None
+        diff = {}
+        for name in set(old_options) | set(options):
+            if old_options.get(name) != options.get(name):
+                diff[name] = (old_options.get(name), options.get(name))
+        return diff
+
+    def pairs_changed(self, volume):
+        old = self._previous_volume(volume)
+        return old is None or _fields(old.pairs) != _fields(volume.pairs)
+
+    def _previous_member(self, member, kind, key_field):
+        old_volume = self._previous_volume(member.volume)
+        if old_volume is None:
+            return None
+        cache_key = (old_volume.id, kind)
+        members = self._members.get(cache_key)
+        if members is None:
+            members = self._members[cache_key] = dict(
+                (m.get(key_field), m) for m in getattr(old_volume, kind)
+            )
+        return members.get(member.get(key_field))
+
+    def clients_changed(self, brick):
+        old = self._previous_member(brick, 'bricks', 'path')
+        return old is None or _fields(old.clients) != _fields(brick.clients)
+
+    def snapshot_changed(self, snapshot):
+        old = self._previous_member(snapshot, 'snapshots', 'name')
+        return old is None or old.fields != snapshot.fields
+
+
+def load(state_file_path):
+    return GlusterState(ini2json.ini_to_dict(state_file_path))
+
+
+COLLECT_FIFO = "fifo"
+COLLECT_FILE = "file"
+
+
+def _get_state_cmd(odir, output_file, detail):
+    return [
+        'gluster',
+        'get-state',
+        'glusterd',
+        'odir',
+        odir,
+        'file',
+        output_file,
+        detail
+    ]
+
+
+class _FifoReader(threading.Thread):
+    """Parses the get-state output while glusterd is writing it"""
+
+    def __init__(self, fifo, path):
+        super(_FifoReader, self).__init__()
+        self.daemon = True
+        self.fifo = fifo
+        self.path = path
+        self.result = {}
+        self.error = None
+
+    def run(self):
+        with self.fifo:
+            try:
+                self.result = ini2json.ini_stream_to_dict(
+                    self.fifo, self.path
+                )
+            except Exception as ex:
+                self.error = ex
+                # glusterd blocks writing into a full pipe, keep
+                # reading till it is done with the output
+                for _ in self.fifo:
+                    pass
+
+
+def _collect_fifo(odir, detail):
+    path = os.path.join(odir, 'glusterd-state')
+    os.mkfifo(path, 0o600)
+    # open both ends up front: nobody blocks in open() and the reader
+    # only sees EOF once our write end is closed, i.e. after the
+    # command returned, whether glusterd wrote anything or not
+    read_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    write_fd = os.open(path, os.O_WRONLY)
+    flags = fcntl.fcntl(read_fd, fcntl.F_GETFL)
+    fcntl.fcntl(read_fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
+    reader = _FifoReader(os.fdopen(read_fd), path)
+    reader.start()
+    try:
+        metrics.spawned("get_state")
+        subprocess.call(_get_state_cmd(odir, 'glusterd-state', detail))
+    finally:
+        os.close(write_fd)
+        reader.join()
+    if reader.error is not None:
+        raise reader.error
+    if not reader.result:
+        _no_output(path)
+    return reader.result
+
+
+def _collect_file(odir, detail):
+    path = os.path.join(odir, 'glusterd-state')
+    metrics.spawned("get_state")
+    subprocess.call(_get_state_cmd(odir, 'glusterd-state', detail))
+    if not os.path.exists(path):
+        _no_output(path)
+    result = ini2json.ini_to_dict(path)
+    if not result:
+        _no_output(path)
+    return result
+
+
+def _no_output(path):
+    # a failed get-state must fail the sync cycle, an empty state would
+    # be synced as a cluster without peers nor volumes
+    raise IOError(errno.ENOENT, "gluster get-state produced no output", path)
+
+
+def collect(detail='detail', mode=COLLECT_FIFO, tmp_dir=None):
+    """Run `gluster get-state glusterd ... <detail>` and parse its output
+
+    Every call gets its own private output directory, so concurrent
+    callers never share a file. In COLLECT_FIFO mode the output is a
+    named pipe streamed into ini2json while glusterd writes it, nothing
+    reaches the disk. In COLLECT_FILE mode glusterd writes a regular
+    file into tmp_dir (use a tmpfs like /dev/shm to keep it in memory)
+    which is parsed and removed afterwards.
+
+    Raises IOError when get-state produced no output (the command
+    failed), like reading its missing output file always did.
+    """
+    odir = tempfile.mkdtemp(prefix='glusterd-state-', dir=tmp_dir)
+    try:
+        if mode == COLLECT_FILE:
+            return _collect_file(odir, detail)
+        return _collect_fifo(odir, detail)
+    finally:
+        shutil.rmtree(odir, ignore_errors=True)
+
+
+def collect_state(mode=COLLECT_FIFO, tmp_dir=None):
+    """GlusterState of a fresh `get-state ... detail` (no volume options)"""
+    return GlusterState(collect('detail', mode, tmp_dir))
+
+
+class StateCache(object):
+    """Latest GlusterState shared by the sync thread and callbacks
+
+    The sync thread publishes every state it collects through update(),
+    which stamps it with an increasing ``version`` and the time its
+    collection started (``collected_at``). Readers call latest(), which
+    returns the cached state while it is recent enough and otherwise
+    runs a single refresh that concurrent readers wait for and share.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._state = None
+        self._version = 0
+        self._refreshing = False
+
+    @property
+    def version(self):
+        return self._version
+
+    def update(self, state, collected_at=None):
+        with self._cond:
+            self._publish(state, collected_at)
+
+    def _publish(self, state, collected_at):
+        if collected_at is None:
+            collected_at = time.time()
+        if self._state is not None and \
+            self._state.collected_at > collected_at:
+            # a newer state got published meanwhile
+            return
+        self._version += 1
+        state.version = self._version
+        state.collected_at = collected_at
+        self._state = state
+        self._cond.notify_all()
+
+    def _fresh(self, max_age, newer_than):
+        state = self._state
+        if state is None:
+            return None
+        if max_age is not None and \
+            time.time() - state.collected_at > max_age:
+            return None
+        if newer_than is not None and state.collected_at < newer_than:
+            return None
+        return state
+
+    def latest(self, max_age=None, newer_than=None, refresh=collect_state):
+        """Cached state collected less than max_age seconds ago (and not
+        before newer_than), refreshed through refresh() when needed
+        """
+        with self._cond:
+            while True:
+                state = self._fresh(max_age, newer_than)
+                if state is not None:
+                    return state
+                if not self._refreshing:
+                    break
+                self._cond.wait()
+            self._refreshing = True
+        try:
+            collected_at = time.time()
+            state = refresh()
+        except Exception:
+            with self._cond:
+                self._refreshing = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._refreshing = False
+            self._publish(state, collected_at)
+            self._cond.notify_all()
+            return self._state
+
+
+cache = StateCache()
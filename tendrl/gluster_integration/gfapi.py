@@ -92,19 +92,13 @@ def glfsFini(fs, volumeId):
         raise GlfsFiniException(rc=rc)
 
 
-def getVolumeStatvfs(volumeId, host=GLUSTER_VOL_HOST,
-                     port=GLUSTER_VOL_PORT,
-                     protocol=GLUSTER_VOL_PROTOCAL):
+def glfsStatvfs(fs, path=GLUSTER_VOL_PATH):
     statvfsdata = StatVfsStruct()
 
-    fs = glfsInit(volumeId, host, port, protocol)
-
-    rc = _glfs_statvfs(fs, GLUSTER_VOL_PATH, ctypes.byref(statvfsdata))
+    rc = _glfs_statvfs(fs, path, ctypes.byref(statvfsdata))
     if rc != 0:
         raise GlfsStatvfsException(rc=rc)
 
-    glfsFini(fs, volumeId)
-
     # To convert to os.statvfs_result we need to pass tuple/list in
     # following order: bsize, frsize, blocks, bfree, bavail, files,
     #                  ffree, favail, flag, namemax
@@ -119,6 +113,18 @@ def getVolumeStatvfs(volumeId, host=GLUSTER_VOL_HOST,
                               statvfsdata.f_flag,
                               statvfsdata.f_namemax))
 
+
+def getVolumeStatvfs(volumeId, host=GLUSTER_VOL_HOST,
+                     port=GLUSTER_VOL_PORT,
+                     protocol=GLUSTER_VOL_PROTOCAL):
+    fs = glfsInit(volumeId, host, port, protocol)
+
+    data = glfsStatvfs(fs)
+
+    glfsFini(fs, volumeId)
+
+    return data
+
 # C function prototypes for using the library gfapi
 
 
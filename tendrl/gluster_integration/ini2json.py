@@ -105,21 +105,105 @@ class StrictConfigParser(ConfigParser):
             raise NotImplementedError()
 
 
-def ini_to_dict(ini_file_path):
-    cfg = StrictConfigParser()
-    f = open(ini_file_path)
-    cfg.readfp(f)
-    f.close()
+def _tokenize(parts):
+    tokens = []
+    for part in parts:
+        tokens.extend(part.split())
+    if len(tokens) == 1:
+        return tokens[0]
+    elif len(tokens) == 0:
+        return ''
+    return tokens
 
-    config = {}
 
-    for section in cfg.sections():
-        config[section] = {}
-        for name, value in cfg.items(section):
-            config[section][name] = [x.strip() for x in value.split() if x]
-            if len(config[section][name]) == 1:
-                config[section][name] = config[section][name][0]
-            elif len(config[section][name]) == 0:
-                config[section][name] = ''
+def ini_stream_to_dict(fp, fpname='<???>'):
+    """Parse `gluster get-state` style ini content in a single pass
 
+    Reads ``fp`` (any iterable of lines, e.g. a file, a pipe or a FIFO)
+    line by line and returns the same structure as the StrictConfigParser
+    based conversion: {section: {option: value}}, where value is a single
+    token, a list of tokens or '' when the option has no value. Option
+    names are lower cased, DEFAULT options are merged into every section
+    and the StrictConfigParser errors (ValueError for duplicate sections,
+    MissingSectionHeaderError, ParsingError) are raised for bad input.
+    No '%(name)s' interpolation is performed.
+    """
+    defaults = {}
+    sections = {}
+    cursect = None
+    curopt = None
+    lineno = 0
+    e = None
+    for line in fp:
+        lineno += 1
+        first = line[:1]
+        # comment or blank line?
+        if first in '#;' or not line.strip():
+            continue
+        if first in 'rR' and line.split(None, 1)[0].lower() == 'rem':
+            continue
+        # continuation line?
+        if first.isspace() and cursect is not None and curopt is not None:
+            value = line.strip()
+            if value:
+                curopt.append(value)
+            continue
+        # a section header?
+        if first == '[':
+            end = line.find(']', 1)
+            if end > 1:
+                sectname = line[1:end]
+                if sectname in sections:
+                    raise ValueError('Duplicate section %r' % sectname)
+                elif sectname == DEFAULTSECT:
+                    cursect = defaults
+                else:
+                    cursect = {}
+                    sections[sectname] = cursect
+                curopt = None
+                continue
+        if cursect is None:
+            raise MissingSectionHeaderError(fpname, lineno, line)
+        # an option line?
+        colon = line.find(':')
+        equal = line.find('=')
+        if colon == -1 or (equal != -1 and equal < colon):
+            pos = equal
+        else:
+            pos = colon
+        if pos > 0 and not first.isspace():
+            optval = line[pos + 1:].rstrip('\n').lstrip()
+            if ';' in optval:
+                # ';' is a comment delimiter only if it follows
+                # a spacing character
+                semi = optval.find(';')
+                if optval[semi - 1].isspace():
+                    optval = optval[:semi]
+            optval = optval.strip()
+            if optval == '""':
+                optval = ''
+            curopt = [optval]
+            cursect[line[:pos].rstrip().lower()] = curopt
+        else:
+            # a non-fatal parsing error, keep going and raise all
+            # the bogus lines at the end of the file
+            if not e:
+                e = ParsingError(fpname)
+            e.append(lineno, repr(line))
+    if e:
+        raise e
+
+    config = {}
+    for sectname, options in sections.iteritems():
+        section = {}
+        for name, parts in defaults.iteritems():
+            section[name] = _tokenize(parts)
+        for name, parts in options.iteritems():
+            section[name] = _tokenize(parts)
+        config[sectname] = section
     return config
+
+
+def ini_to_dict(ini_file_path):
+    with open(ini_file_path) as f:
+        return ini_stream_to_dict(f, ini_file_path)
@@ -8,17 +8,18 @@
 # will be invoked
 
 import etcd
-import subprocess
+import functools
 
 from tendrl.commons.utils import etcd_utils
 from tendrl.commons.utils import log_utils as logger
 from tendrl.commons.utils import monitoring_utils
 from tendrl.commons.utils import time_utils
-from tendrl.gluster_integration import ini2json
+from tendrl.gluster_integration import get_state
+from tendrl.gluster_integration.message import coalescer
+from tendrl.gluster_integration import sync_events
 
 
 import time
-import uuid
 
 RESOURCE_TYPE_BRICK = "brick"
 RESOURCE_TYPE_PEER = "host"
@@ -28,6 +29,31 @@ RESOURCE_TYPE_VOLUME = "volume"
 class Callback(object):
     def __init__(self):
         self.sync_interval = NS.config.data.get("sync_interval", 10)
+        # native events of a flapping node are saved once per window
+        self.coalescer = coalescer.Coalescer(
+            NS.config.data.get(
+                "event_coalesce_window", coalescer.DEFAULT_WINDOW
+            )
+        )
+
+    def _wait_for_sync(self):
+        # let the sync thread catch up with the event: wait for the first
+        # sync started from now on to complete, and have it start right
+        # away. Any sync completes within the TTL of the synced objects.
+        generation = sync_events.generations.next()
+        sync_events.requests.expedite()
+        timeout = NS.config.data.get(
+            "sync_wait_timeout", int(self.sync_interval) + 100
+        )
+        if not sync_events.generations.wait(generation, timeout):
+            logger.log(
+                "debug",
+                NS.publisher_id,
+                {
+                    "message": "No sync completed within %ss, going "
+                    "on without it" % timeout
+                }
+            )
 
     def quorum_lost(self, event):
         context = "quorum|" + event['message']['volume']
@@ -44,7 +70,7 @@ class Callback(object):
                   "volume_name": event['message']['volume']
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def quorum_regained(self, event):
         context = "quorum|" + event['message']['volume']
@@ -61,7 +87,7 @@ class Callback(object):
                   "volume_name": event['message']['volume']
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def svc_connected(self, event):
         context = "svc_connection|" + event['message']['svc_name']
@@ -79,7 +105,7 @@ class Callback(object):
             severity="recovery",
             current_value="service_connected"
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def svc_disconnected(self, event):
         context = "svc_connection|" + event['message']['svc_name']
@@ -97,7 +123,7 @@ class Callback(object):
             severity="warning",
             current_value="service_disconnected"
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def ec_min_bricks_not_up(self, event):
         context = "ec_min_bricks_up|" + event['message']['subvol']
@@ -116,7 +142,7 @@ class Callback(object):
                   "volume_name": volume_name
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def ec_min_bricks_up(self, event):
         context = "ec_min_bricks_up|" + event['message']['subvol']
@@ -135,7 +161,7 @@ class Callback(object):
                   "volume_name": volume_name
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def afr_quorum_met(self, event):
         context = "afr_quorum_state|" + event['message']['subvol']
@@ -153,7 +179,7 @@ class Callback(object):
                   "volume_name": volume_name
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def afr_quorum_fail(self, event):
         context = "afr_quorum_state|" + event['message']['subvol']
@@ -172,7 +198,7 @@ class Callback(object):
                   "volume_name": volume_name
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def afr_subvol_up(self, event):
         context = "afr_subvol_state|" + event['message']['subvol']
@@ -190,7 +216,7 @@ class Callback(object):
                   "volume_name": volume_name
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def afr_subvols_down(self, event):
         context = "afr_subvol_state|" + event['message']['subvol']
@@ -208,7 +234,7 @@ class Callback(object):
                   "volume_name": volume_name
                   }
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def unknown_peer(self, event):
         context = "unknown_peer|" + event['message']['peer'].split(":")[0]
@@ -223,7 +249,7 @@ class Callback(object):
             current_value="unknown_peer",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def brickpath_resolve_failed(self, event):
         context = "brickpath_resolve_failed|" + event['message'][
@@ -242,7 +268,7 @@ class Callback(object):
             current_value="brick_path_resolve_failed",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def quota_crossed_soft_limit(self, event):
         context = "quota_crossed_soft_limit|" + event[
@@ -261,7 +287,7 @@ class Callback(object):
             current_value="quota_crossed_soft_limit",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def bitrot_bad_file(self, event):
         context = "bitrot_bad_file|" + event['message'][
@@ -280,7 +306,7 @@ class Callback(object):
             current_value="bitrot_bad_file",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def afr_split_brain(self, event):
         context = "afr_split_brain|" + event['message']["subvol"]
@@ -297,7 +323,7 @@ class Callback(object):
             current_value="afr_split_brain",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def snapshot_soft_limit_reached(self, event):
         context = "snapshot_soft_limit_reached|" + event[
@@ -314,7 +340,7 @@ class Callback(object):
             current_value="snapshot_soft_limit_reached",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def snapshot_hard_limit_reached(self, event):
         context = "snapshot_hard_limit_reached|" + event[
@@ -331,7 +357,7 @@ class Callback(object):
             current_value="snapshot_hard_limit_reached",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def compare_friend_volume_failed(self, event):
         context = "compare_friend_volume_failed|" + event['message']['volume']
@@ -347,7 +373,7 @@ class Callback(object):
             current_value="compare_friend_volume_failed",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def posix_health_check_failed(self, event):
         context = "posix_health_check_failed|" + event[
@@ -368,7 +394,7 @@ class Callback(object):
             current_value="posix_health_check_failed",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def peer_reject(self, event):
         context = "peer_reject|" + event['message']['peer'].split(":")[0]
@@ -383,7 +409,7 @@ class Callback(object):
             current_value="peer_reject",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def rebalance_status_update_failed(self, event):
         context = "rebalance_status_update_failed|" + event[
@@ -400,7 +426,7 @@ class Callback(object):
             current_value="rebalance_status_update_failed",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def svc_reconfigure_failed(self, event):
         context = "svc_reconfigure_failed|" + event['message']["service"]
@@ -418,7 +444,7 @@ class Callback(object):
             current_value="svc_reconfigure_failed",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def georep_checkpoint_completed(self, event):
         georep_pair = "{0}:{1}:{2}--->{3}:{4}".format(
@@ -456,10 +482,10 @@ class Callback(object):
             current_value="georep_checkpoint_completed",
             alert_notify=True
         )
-        native_event.save()
+        self.coalescer.save(native_event)
 
     def peer_detach(self, event):
-        time.sleep(self.sync_interval)
+        self._wait_for_sync()
         job_id = monitoring_utils.update_dashboard(
             event['message']['host'],
             RESOURCE_TYPE_PEER,
@@ -476,7 +502,7 @@ class Callback(object):
         )
 
     def volume_delete(self, event):
-        time.sleep(self.sync_interval)
+        self._wait_for_sync()
         fetched_volumes = NS.gluster.objects.Volume().load_all()
         for fetched_volume in fetched_volumes:
             if fetched_volume.name == event['message']['name']:
@@ -594,7 +620,10 @@ class Callback(object):
         )
 
     def volume_remove_brick_force(self, event):
-        time.sleep(self.sync_interval)
+        self._wait_for_sync()
+        self._remove_bricks(event)
+
+    def _remove_bricks(self, event):
         # Event returns bricks list as space separated single string
         bricks = event['message']['bricks'].split(" ")
         for brick in bricks:
@@ -681,54 +710,38 @@ class Callback(object):
         self.volume_remove_brick_force(event)
 
     def snapshot_restored(self, event):
-        time.sleep(self.sync_interval)
+        received = time.time()
+        self._wait_for_sync()
         message = event["message"]
         volume = message['volume_name']
         volume_id = ""
         bricks_to_remove = []
 
-        # get the list of current bricks by running get-state
-        output_dir = '/var/run/'
-        output_file = 'glusterd-state-snapshot-%s' % str(uuid.uuid4())
-        subprocess.call(
-            [
-                'gluster',
-                'get-state',
-                'glusterd',
-                'odir',
-                output_dir,
-                'file',
-                output_file,
-                'detail'
-            ]
-        )
-        raw_data = ini2json.ini_to_dict(
-            output_dir + output_file
-        )
-        subprocess.call(['rm', '-rf', output_dir + output_file])
-        index = 1
-        while True:
-            try:
-                current_vol = 'volume%s.name' % index
-                if raw_data['Volumes'][current_vol] == volume:
-                    current_vol_id = 'volume%s.id' % index
-                    volume_id = raw_data['Volumes'][current_vol_id]
-                    break
-            except KeyError:
-                return
-            index += 1
+        # get the list of current bricks from a get-state taken after
+        # the restore, usually the one of the last sync cycle
+        state = get_state.cache.latest(
+            max_age=NS.config.data.get(
+                "get_state_max_age", self.sync_interval
+            ),
+            newer_than=received,
+            refresh=functools.partial(
+                get_state.collect_state,
+                NS.config.data.get(
+                    "get_state_collection", get_state.COLLECT_FIFO
+                ),
+                NS.config.data.get("get_state_dir", "/var/run")
+            )
+        )
+        volume_state = state.volume_by_name.get(volume)
+        if volume_state is None:
+            return
+        volume_id = volume_state.id
         latest_bricks = []
-        b_index = 1
-        while True:
+        for brick in volume_state.bricks:
             try:
-                curr_brick = 'volume%s.brick%s.path' % (
-                    index, b_index
-                )
-                brick = raw_data['Volumes'][curr_brick]
-                b_index += 1
+                latest_bricks.append(brick['path'])
             except KeyError:
                 break
-            latest_bricks.append(brick)
 
         # get the list of bricks in etcd for this volume
 
@@ -762,7 +775,8 @@ class Callback(object):
         brick_details["volume"] = volume
         brick_details["bricks"] = " ".join(bricks_to_remove)
         event["message"] = brick_details
-        self.volume_remove_brick_force(event)
+        # the sync already caught up with the restore
+        self._remove_bricks(event)
 
 
 def parse_subvolume(subvol):
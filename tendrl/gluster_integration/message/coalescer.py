@@ -0,0 +1,136 @@
+import threading
+import time
+
+from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration import metrics
+
+
+# seconds during which the native events of a context are collapsed
+DEFAULT_WINDOW = 10
+
+metrics.registry.describe(
+    "gluster_integration_native_events_coalesced_total", metrics.COUNTER,
+    "Native events collapsed into the save of a later event of the same "
+    "context"
+)
+
+
+class _Window(object):
+    def __init__(self, deadline):
+        self.deadline = deadline
+        # events of the context since the first one, already saved
+        self.occurrences = 0
+        # latest event of the context not saved yet
+        self.latest = None
+
+
+class Coalescer(object):
+    """Collapses the NativeEvents of a context saved in bursts
+
+    A flapping node sends AFR_SUBVOL_DOWN/UP, SVC_CONNECTED/DISCONNECTED
+    ... over and over, each of them saving the NativeEvents of the same
+    context. The first event of a context is saved at once and opens a
+    `window` seconds long window, the events of the context arriving in
+    it only replace the pending one. When the window ends the latest of
+    them is saved with the number of events folded into it (the first
+    one, already saved, not counted) as its occurrences. A context is
+    written at most twice per window whatever the number of events. A
+    window of 0 saves every event at once.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._cond = threading.Condition()
+        # {context: _Window}
+        self._windows = {}
+        self._thread = None
+        self._stopped = False
+
+    def save(self, native_event):
+        if self.window <= 0:
+            native_event.save()
+            return
+        with self._cond:
+            window = self._windows.get(native_event.context)
+            if window is not None:
+                window.occurrences += 1
+                window.latest = native_event
+                metrics.registry.inc(
+                    "gluster_integration_native_events_coalesced_total"
+                )
+                return
+            self._windows[native_event.context] = _Window(
+                time.time() + self.window
+            )
+            self._start()
+        native_event.occurrences = 1
+        native_event.save()
+
+    def _start(self):
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(
+                target=self._run, name="native_event_coalescer"
+            )
+            self._thread.daemon = True
+            self._thread.start()
+        self._cond.notify()
+
+    def _expired(self, now=None):
+        """Pop the windows ended by now (all of them if None), returns the
+        events to save
+        """
+        pending = []
+        for context, window in self._windows.items():
+            if now is None or window.deadline <= now:
+                del self._windows[context]
+                if window.latest is not None:
+                    window.latest.occurrences = window.occurrences
+                    pending.append(window.latest)
+        return pending
+
+    def _save_all(self, pending):
+        for native_event in pending:
+            try:
+                native_event.save()
+            except Exception as ex:
+                logger.log(
+                    "error",
+                    NS.publisher_id,
+                    {
+                        "message": "Failed to save native event %s: "
+                        "%s" % (native_event.context, ex)
+                    }
+                )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._windows:
+                        deadline = min(
+                            window.deadline
+                            for window in self._windows.itervalues()
+                        )
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                pending = self._expired(time.time())
+            self._save_all(pending)
+
+    def flush(self):
+        """Save the pending events now and close all the windows"""
+        with self._cond:
+            pending = self._expired()
+        self._save_all(pending)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._thread = None
+            self._cond.notify_all()
+        self.flush()
@@ -0,0 +1,212 @@
+import collections
+import threading
+import time
+
+from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration.message.callback import parse_subvolume
+from tendrl.gluster_integration import metrics
+
+
+DEFAULT_SIZE = 1000
+# callbacks such as volume_delete sleep sync_interval before doing their
+# work, the workers are mostly waiting threads
+DEFAULT_WORKERS = 16
+# callbacks of one event type running at the same time
+DEFAULT_TYPE_LIMIT = 4
+
+metrics.registry.describe(
+    "gluster_integration_events_dropped_total", metrics.COUNTER,
+    "Native events dropped because the event queue was full, by event type"
+)
+metrics.registry.describe(
+    "gluster_integration_callbacks_running", metrics.GAUGE,
+    "Callbacks of native events running, by event type"
+)
+
+
+# message fields naming what an event is about, the first one present
+# is used: the volume, else the service or the peer
+_ORDERING_FIELDS = (
+    "volume", "volume_name", "master_volume", "Volume", "name", "subvol",
+    "svc_name", "service", "peer", "host"
+)
+
+
+def ordering_key(event):
+    """What the event is about, the callbacks of the events of one key
+    run one at a time in the order received. None if it names nothing.
+    """
+    message = event.get("message") or {}
+    for field in _ORDERING_FIELDS:
+        value = message.get(field)
+        if not value:
+            continue
+        if field == "subvol":
+            return "volume|%s" % parse_subvolume(value)
+        if field in ("peer", "host"):
+            return "peer|%s" % value.split(":")[0]
+        if field in ("svc_name", "service"):
+            return "service|%s" % value
+        return "volume|%s" % value
+    return None
+
+
+class EventQueue(object):
+    """Native events waiting for their callback
+
+    put() only queues the event, so glustereventsd gets the answer to its
+    webhook post at once, and `workers` threads run handler(event_type,
+    event) for the queued events. At most type_limits[event_type]
+    (default_limit for the types not in it) callbacks of an event type
+    run at the same time: a worker skips the events whose type is at its
+    limit, the (sleeping) callbacks of a storm of one type do not hold
+    up the others. The events of the same volume, service or peer (see
+    ordering_key) are handled one at a time in the order received, as
+    glustereventsd posted them: a SVC_DISCONNECTED followed by a
+    SVC_CONNECTED never ends up saved in the opposite order. Events
+    arriving while `size` are waiting are dropped.
+    """
+
+    def __init__(
+        self,
+        handler,
+        size=DEFAULT_SIZE,
+        workers=DEFAULT_WORKERS,
+        default_limit=DEFAULT_TYPE_LIMIT,
+        type_limits=None
+    ):
+        self._handler = handler
+        self.size = size
+        self.workers = workers
+        self.default_limit = default_limit
+        self.type_limits = dict(type_limits or {})
+        self.dropped = 0
+        self._cond = threading.Condition()
+        # (event type, event, ordering key) in the order received
+        self._events = collections.deque()
+        self._running = collections.defaultdict(int)
+        # ordering keys of the running callbacks
+        self._busy = set()
+        self._threads = []
+        self._stopped = False
+
+    def limit(self, event_type):
+        return self.type_limits.get(event_type, self.default_limit)
+
+    def depth(self):
+        with self._cond:
+            return len(self._events)
+
+    def put(self, event_type, event):
+        """Queue event, False if it was dropped"""
+        with self._cond:
+            if len(self._events) >= self.size:
+                self.dropped += 1
+                metrics.registry.inc(
+                    "gluster_integration_events_dropped_total",
+                    event=event_type
+                )
+                return False
+            self._events.append((event_type, event, ordering_key(event)))
+            # idle workers are all alike, if the one woken cannot run
+            # this event no other one could
+            self._cond.notify()
+        return True
+
+    def _next(self):
+        """First queued (event type, event, ordering key) whose type is
+        below its limit and whose key has no running callback nor earlier
+        event left queued, waits for one. None once stopped.
+        """
+        with self._cond:
+            while not self._stopped:
+                blocked = set(self._busy)
+                for index, item in enumerate(self._events):
+                    event_type, _, key = item
+                    if key is not None and key in blocked:
+                        continue
+                    if self._running[event_type] < self.limit(event_type):
+                        del self._events[index]
+                        self._running[event_type] += 1
+                        if key is not None:
+                            self._busy.add(key)
+                        return item
+                    if key is not None:
+                        blocked.add(key)
+                self._cond.wait()
+        return None
+
+    def _work(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            event_type, event, key = item
+            try:
+                self._handler(event_type, event)
+            except Exception as ex:
+                logger.log(
+                    "error",
+                    NS.publisher_id,
+                    {
+                        "message": "Callback of native event %s "
+                        "failed: %s" % (event_type, ex)
+                    }
+                )
+            finally:
+                with self._cond:
+                    self._running[event_type] -= 1
+                    self._busy.discard(key)
+                    # a worker may be waiting for this type or key to
+                    # free up
+                    self._cond.notify_all()
+
+    def start(self):
+        with self._cond:
+            self._stopped = False
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name="event_queue_%s" % len(self._threads)
+                )
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """Let the workers exit once their running callback returns, the
+        queued events are dropped with the daemon
+        """
+        with self._cond:
+            self._stopped = True
+            self._threads = []
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout):
+        """True once no event is queued or running, False if it takes
+        more than timeout seconds
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._events or any(self._running.itervalues()):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def collect(self):
+        """Publish the queue depth and running callbacks, a collector of
+        the metrics registry
+        """
+        with self._cond:
+            depth = len(self._events)
+            running = dict(self._running)
+        metrics.registry.set(
+            "gluster_integration_queue_depth", depth, queue="events"
+        )
+        for event_type, count in running.iteritems():
+            metrics.registry.set(
+                "gluster_integration_callbacks_running", count,
+                event=event_type
+            )
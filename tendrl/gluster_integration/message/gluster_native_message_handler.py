@@ -1,13 +1,18 @@
 import threading
+import time
 
 from flask import Flask
 from flask import request
+from flask import Response
 
 from tendrl.commons.utils import cmd_utils
 from tendrl.commons.utils import log_utils as logger
 from tendrl.commons.utils import service as svc
 from tendrl.commons.utils import service_status as svc_stat
 from tendrl.gluster_integration.message import callback as cb
+from tendrl.gluster_integration.message import event_queue
+from tendrl.gluster_integration import metrics
+from tendrl.gluster_integration import sync_events
 
 
 app = Flask(__name__)
@@ -21,19 +26,59 @@ class GlusterNativeMessageHandler(threading.Thread):
         self.host = "0.0.0.0"
         self.port = 8697
         self.callback = cb.Callback()
+        self.events = event_queue.EventQueue(
+            self._handle,
+            size=NS.config.data.get(
+                "event_queue_size", event_queue.DEFAULT_SIZE
+            ),
+            workers=NS.config.data.get(
+                "event_workers", event_queue.DEFAULT_WORKERS
+            ),
+            default_limit=NS.config.data.get(
+                "event_type_concurrency", event_queue.DEFAULT_TYPE_LIMIT
+            ),
+            type_limits=NS.config.data.get("event_type_limits")
+        )
+        metrics.registry.register_collector(self.events.collect)
 
         @app.route(self.path, methods=["POST"])
         def events_listener():
             gluster_event = request.json
             if gluster_event:
+                if NS.config.data.get("event_driven_sync", False):
+                    # let the sync thread resync what the event changed
+                    sync_events.requests.notify(gluster_event)
                 callback_function_name = gluster_event["event"].lower()
-                try:
-                    function = getattr(self.callback, callback_function_name)
-                except AttributeError:
+                metrics.event_received(callback_function_name)
+                if not hasattr(self.callback, callback_function_name):
                     # tendrl does not handle this particular event hence ignore
+                    metrics.event_handled(callback_function_name, "ignored")
                     return "Event Ignored"
-                function(gluster_event)
-                return "OK"
+                # callbacks can take a long time (volume_delete sleeps
+                # sync_interval), the event queue workers run them
+                if not self.events.put(callback_function_name, gluster_event):
+                    return "Event Dropped", 503
+                return "Event Accepted", 202
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics_endpoint():
+            return Response(
+                metrics.registry.render(), content_type=metrics.CONTENT_TYPE
+            )
+
+    def _handle(self, callback_function_name, gluster_event):
+        function = getattr(self.callback, callback_function_name)
+        start = time.time()
+        try:
+            function(gluster_event)
+        except Exception:
+            metrics.event_handled(
+                callback_function_name, "failed", time.time() - start
+            )
+            raise
+        metrics.event_handled(
+            callback_function_name, "processed", time.time() - start
+        )
 
     def _setup_gluster_native_message_reciever(self):
         service = svc.Service("glustereventsd")
@@ -89,6 +134,8 @@ class GlusterNativeMessageHandler(threading.Thread):
         return True
 
     def stop(self):
+        self.events.stop()
+        self.callback.coalescer.stop()
         if not self._cleanup_gluster_native_message_reciever():
             logger.log(
                 "error",
@@ -104,5 +151,6 @@ class GlusterNativeMessageHandler(threading.Thread):
                 {"message": "gluster native message reciever setup failed"}
             )
             return
+        self.events.start()
         # TODO(rohan) find better way to run/cleanup
         app.run(self.host, self.port, threaded=True)
@@ -1,67 +1,129 @@
+import etcd
 import json
 
 from tendrl.commons.utils import event_utils
+from tendrl.gluster_integration.objects.native_events import PENDING_DIR
 
 POST_RECOVERY_TTL = 200
 NOTIFICATION_TTL = 86400   # one day
 
+# the first incremental run processes all the events, the ones saved
+# before the pending index was kept included
+_scanned = False
 
-def process_events():
-    events = NS.gluster.objects.NativeEvents().load_all()
-    if events:
-        for event in events:
+
+def _pending():
+    """[(context, key, modifiedIndex)] of the pending index"""
+    try:
+        result = NS._int.client.read(
+            PENDING_DIR.format(NS.tendrl_context.integration_id)
+        )
+    except etcd.EtcdKeyNotFound:
+        return []
+    return [
+        (leaf.value, leaf.key, leaf.modifiedIndex)
+        for leaf in result.leaves if not leaf.dir
+    ]
+
+
+def _unmark(key, index):
+    # a context saved again since it was read stays pending
+    try:
+        NS._int.wclient.delete(key, prevIndex=index)
+    except (etcd.EtcdKeyNotFound, etcd.EtcdCompareFailed):
+        pass
+
+
+def process_events(incremental=False):
+    """Raise the alerts of the native events saved by the callbacks
+
+    Incremental runs load only the events of the contexts in the pending
+    index (see NativeEvents.save) instead of all of them, the processed
+    ones kept for NOTIFICATION_TTL included.
+    """
+    global _scanned
+    pending = _pending() if incremental else []
+    if incremental and _scanned:
+        events = []
+        for context, _, _ in pending:
             try:
-                event.tags = json.loads(event.tags)
-            except(TypeError, ValueError):
-                # tags can be None
-                pass
-            if event.severity == "recovery" and not event.recovery_processed:
-                # this perticular event is recovery event
-                # so process this event and delete it
-                event_utils.emit_event(
-                    event.context.split("|")[0],
-                    event.current_value,
-                    event.message,
-                    event.context,
-                    "INFO",
-                    tags=event.tags
-                )
-                processed_event = NS.gluster.objects.NativeEvents(
-                    event.context,
-                    recovery_processed=True
-                )
-                processed_event.save(ttl=POST_RECOVERY_TTL)
+                event = NS.gluster.objects.NativeEvents(
+                    context=context
+                ).load()
+            except etcd.EtcdKeyNotFound:
                 continue
+            if event.severity is not None:
+                events.append(event)
+    else:
+        events = NS.gluster.objects.NativeEvents().load_all()
+    if events:
+        for event in events:
+            _process_event(event)
+    for _, key, index in pending:
+        _unmark(key, index)
+    _scanned = incremental
 
-            if event.alert_notify and not event.processed:
-                event_utils.emit_event(
-                    event.context.split("|")[0],
-                    event.current_value,
-                    event.message,
-                    event.context,
-                    event.severity.upper(),
-                    alert_notify=event.alert_notify,
-                    tags=event.tags
-                )
-                processed_event = NS.gluster.objects.NativeEvents(
-                    event.context,
-                    processed=True
-                )
-                processed_event.save(NOTIFICATION_TTL)
-                continue
 
-            if event.severity == "warning" and not event.processed:
-                event_utils.emit_event(
-                    event.context.split("|")[0],
-                    event.current_value,
-                    event.message,
-                    event.context,
-                    "WARNING",
-                    tags=event.tags
-                )
-                processed_event = NS.gluster.objects.NativeEvents(
-                    event.context,
-                    processed=True
-                )
-                processed_event.save()
-                continue
+def _process_event(event):
+    try:
+        event.tags = json.loads(event.tags)
+    except(TypeError, ValueError):
+        # tags can be None
+        pass
+    message = event.message
+    try:
+        occurrences = int(event.occurrences or 1)
+    except (TypeError, ValueError):
+        occurrences = 1
+    if occurrences > 1:
+        # a burst of events of this context, see coalescer
+        message = "%s (%s occurrences)" % (message, occurrences)
+    if event.severity == "recovery" and not event.recovery_processed:
+        # this perticular event is recovery event
+        # so process this event and delete it
+        event_utils.emit_event(
+            event.context.split("|")[0],
+            event.current_value,
+            message,
+            event.context,
+            "INFO",
+            tags=event.tags
+        )
+        processed_event = NS.gluster.objects.NativeEvents(
+            event.context,
+            recovery_processed=True
+        )
+        processed_event.save(ttl=POST_RECOVERY_TTL)
+        return
+
+    if event.alert_notify and not event.processed:
+        event_utils.emit_event(
+            event.context.split("|")[0],
+            event.current_value,
+            message,
+            event.context,
+            event.severity.upper(),
+            alert_notify=event.alert_notify,
+            tags=event.tags
+        )
+        processed_event = NS.gluster.objects.NativeEvents(
+            event.context,
+            processed=True
+        )
+        processed_event.save(NOTIFICATION_TTL)
+        return
+
+    if event.severity == "warning" and not event.processed:
+        event_utils.emit_event(
+            event.context.split("|")[0],
+            event.current_value,
+            message,
+            event.context,
+            "WARNING",
+            tags=event.tags
+        )
+        processed_event = NS.gluster.objects.NativeEvents(
+            event.context,
+            processed=True
+        )
+        processed_event.save()
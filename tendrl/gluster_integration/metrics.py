@@ -0,0 +1,210 @@
+import collections
+import threading
+
+
+GAUGE = "gauge"
+COUNTER = "counter"
+# content type of the prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value, label=False):
+    value = unicode(value).replace(u"\\", u"\\\\").replace(u"\n", u"\\n")
+    if label:
+        value = value.replace(u'"', u'\\"')
+    return value
+
+
+def _format(value):
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class Registry(object):
+    """Gauges and counters of the running gluster-integration
+
+    Values are kept per set of labels, e.g.
+    registry.set("sync_phase_seconds", 1.5, phase="collect").
+    Metrics are described once with describe(), values of metrics
+    nobody described are kept as untyped gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {name: {'type': .., 'help': .., 'values': {labels: value}}}
+        self._metrics = collections.OrderedDict()
+        self._collectors = []
+
+    def _metric(self, name):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = {
+                'type': GAUGE,
+                'help': '',
+                'values': collections.OrderedDict()
+            }
+        return metric
+
+    def describe(self, name, metric_type, help_text):
+        with self._lock:
+            metric = self._metric(name)
+            metric['type'] = metric_type
+            metric['help'] = help_text
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._metric(name)['values'][
+                tuple(sorted(labels.items()))
+            ] = value
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._metric(name)['values']
+            values[key] = values.get(key, 0) + amount
+
+    def maximum(self, name, value, **labels):
+        """Keep the largest value set"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._metric(name)['values']
+            if key not in values or value > values[key]:
+                values[key] = value
+
+    def get(self, name, **labels):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                return None
+            return metric['values'].get(tuple(sorted(labels.items())))
+
+    def total(self, name):
+        """Sum of the values of a metric over all its labels"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                return 0
+            return sum(metric['values'].itervalues())
+
+    def register_collector(self, collector):
+        """collector() is called before every render(), to set the
+        gauges (queue depths ...) only worth reading when scraped
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def snapshot(self):
+        """[(name, type, help, [(labels dict, value), ...]), ...]"""
+        with self._lock:
+            return [
+                (name, metric['type'], metric['help'], [
+                    (dict(labels), value)
+                    for labels, value in metric['values'].iteritems()
+                ])
+                for name, metric in self._metrics.iteritems()
+            ]
+
+    def render(self):
+        """The metrics in the prometheus text exposition format"""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        lines = []
+        for name, metric_type, help_text, values in self.snapshot():
+            if help_text:
+                lines.append(u"# HELP %s %s" % (name, _escape(help_text)))
+            lines.append(u"# TYPE %s %s" % (name, metric_type))
+            for labels, value in values:
+                if labels:
+                    name_labels = u"%s{%s}" % (name, u",".join(
+                        u'%s="%s"' % (label, _escape(labels[label], True))
+                        for label in sorted(labels)
+                    ))
+                else:
+                    name_labels = name
+                lines.append(u"%s %s" % (name_labels, _format(value)))
+        return u"\n".join(lines) + u"\n"
+
+
+registry = Registry()
+registry.describe(
+    "gluster_integration_etcd_operations_total", COUNTER,
+    "etcd requests of gluster-integration, by operation"
+)
+registry.describe(
+    "gluster_integration_sync_phase_seconds", GAUGE,
+    "Duration of the phases of the last sync cycle"
+)
+registry.describe(
+    "gluster_integration_subprocess_spawns_total", COUNTER,
+    "Commands run by gluster-integration, by command"
+)
+registry.describe(
+    "gluster_integration_etcd_errors_total", COUNTER,
+    "etcd requests of gluster-integration which failed, by operation and "
+    "error"
+)
+registry.describe(
+    "gluster_integration_queue_depth", GAUGE,
+    "Items waiting in the queues of gluster-integration, by queue"
+)
+registry.describe(
+    "gluster_integration_events_received_total", COUNTER,
+    "Native events received, by event type"
+)
+registry.describe(
+    "gluster_integration_events_handled_total", COUNTER,
+    "Native events handled, by event type and result (processed, "
+    "ignored or failed)"
+)
+registry.describe(
+    "gluster_integration_callback_seconds_total", COUNTER,
+    "Seconds spent in the callbacks of native events, by event type"
+)
+registry.describe(
+    "gluster_integration_callback_seconds_max", GAUGE,
+    "Longest callback of native events, by event type"
+)
+
+
+def etcd_operation(operation):
+    registry.inc("gluster_integration_etcd_operations_total", op=operation)
+
+
+def etcd_error(operation, error):
+    registry.inc(
+        "gluster_integration_etcd_errors_total", op=operation,
+        error=type(error).__name__
+    )
+
+
+def spawned(command):
+    registry.inc(
+        "gluster_integration_subprocess_spawns_total", command=command
+    )
+
+
+def event_received(event_type):
+    registry.inc("gluster_integration_events_received_total", event=event_type)
+
+
+def event_handled(event_type, result, seconds=None):
+    registry.inc(
+        "gluster_integration_events_handled_total", event=event_type,
+        result=result
+    )
+    if seconds is not None:
+        registry.inc(
+            "gluster_integration_callback_seconds_total", seconds,
+            event=event_type
+        )
+        registry.maximum(
+            "gluster_integration_callback_seconds_max", seconds,
+            event=event_type
+        )
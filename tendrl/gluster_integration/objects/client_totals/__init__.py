@@ -0,0 +1,27 @@
+from tendrl.commons import objects
+
+
+class ClientTotals(objects.BaseObject):
+    def __init__(
+        self,
+        hostname=None,
+        bytesread=None,
+        byteswrite=None,
+        connection_count=None,
+        *args,
+        **kwargs
+    ):
+        super(ClientTotals, self).__init__(*args, **kwargs)
+
+        self.hostname = hostname
+        self.bytesread = bytesread
+        self.byteswrite = byteswrite
+        self.connection_count = connection_count
+        self.value = 'clusters/{0}/ClientTotals/{1}'
+
+    def render(self):
+        self.value = self.value.format(
+            NS.tendrl_context.integration_id,
+            self.hostname
+        )
+        return super(ClientTotals, self).render()
@@ -3,6 +3,11 @@ import json
 from tendrl.commons import objects
 
 
+# contexts whose event changed since process_events last handled them,
+# <PENDING_DIR>/<context as in the event key> = context
+PENDING_DIR = 'clusters/{0}/native_events_pending'
+
+
 class NativeEvents(objects.BaseObject):
     def __init__(
         self,
@@ -14,6 +19,7 @@ class NativeEvents(objects.BaseObject):
         alert_notify=None,
         current_value=None,
         tags={},
+        occurrences=None,
         *args,
         **kwargs
     ):
@@ -27,6 +33,7 @@ class NativeEvents(objects.BaseObject):
         self.alert_notify = alert_notify
         self.current_value = current_value
         self.tags = tags
+        self.occurrences = occurrences
         self.value = 'clusters/{0}/native_events/{1}'
 
     def render(self):
@@ -41,3 +48,17 @@ class NativeEvents(objects.BaseObject):
             context
         )
         return super(NativeEvents, self).render()
+
+    def save(self, *args, **kwargs):
+        super(NativeEvents, self).save(*args, **kwargs)
+        # the callbacks save new states, process_events only flags them
+        # processed
+        if self.severity is not None and \
+            NS.config.data.get("incremental_event_processing", False):
+            NS._int.wclient.write(
+                "%s/%s" % (
+                    PENDING_DIR.format(NS.tendrl_context.integration_id),
+                    self.value.rsplit("/", 1)[-1]
+                ),
+                self.context
+            )
@@ -0,0 +1,26 @@
+from tendrl.commons import objects
+
+
+class VolumeOptionChange(objects.BaseObject):
+    def __init__(
+        self,
+        vol_id=None,
+        changed_at=None,
+        changes=None,
+        *args,
+        **kwargs
+    ):
+        super(VolumeOptionChange, self).__init__(*args, **kwargs)
+
+        self.vol_id = vol_id
+        self.changed_at = changed_at
+        self.changes = changes
+        self.value = 'clusters/{0}/Volumes/{1}/OptionsHistory/{2}'
+
+    def render(self):
+        self.value = self.value.format(
+            NS.tendrl_context.integration_id,
+            self.vol_id,
+            self.changed_at
+        )
+        return super(VolumeOptionChange, self).render()
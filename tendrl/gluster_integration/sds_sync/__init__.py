@@ -1,7 +1,4 @@
-import blivet
 import json
-import re
-import subprocess
 import threading
 import time
 
@@ -15,18 +12,31 @@ from tendrl.commons.objects.cluster_alert_counters import \
 from tendrl.commons import sds_sync
 from tendrl.commons.utils import cmd_utils
 from tendrl.commons.utils import etcd_utils
-from tendrl.commons.utils import event_utils
+# sds_sync.event_utils stays importable, alerts go through alert_batch
+from tendrl.commons.utils import event_utils  # noqa
 from tendrl.commons.utils.time_utils import now as tendrl_now
-from tendrl.gluster_integration import ini2json
+from tendrl.gluster_integration import get_state
+from tendrl.gluster_integration import metrics
+from tendrl.gluster_integration import sync_events
+from tendrl.gluster_integration import worker_pool
 from tendrl.gluster_integration.message import process_events as evt
+from tendrl.gluster_integration.sds_sync import alert_batch
+from tendrl.gluster_integration.sds_sync import batch_writer
 from tendrl.gluster_integration.sds_sync import brick_device_details
+from tendrl.gluster_integration.sds_sync import brick_index
 from tendrl.gluster_integration.sds_sync import brick_utilization
 from tendrl.gluster_integration.sds_sync import client_connections
 from tendrl.gluster_integration.sds_sync import cluster_status
+from tendrl.gluster_integration.sds_sync import device_tree
 from tendrl.gluster_integration.sds_sync import georep_details
+from tendrl.gluster_integration.sds_sync import instrumentation
+from tendrl.gluster_integration.sds_sync import leases
+from tendrl.gluster_integration.sds_sync import object_sync
 from tendrl.gluster_integration.sds_sync import rebalance_status
+from tendrl.gluster_integration.sds_sync import scheduler
 from tendrl.gluster_integration.sds_sync import snapshots
 from tendrl.gluster_integration.sds_sync import utilization
+from tendrl.gluster_integration.sds_sync import volume_options
 
 
 RESOURCE_TYPE_BRICK = "brick"
@@ -41,6 +51,9 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
     def __init__(self):
         super(GlusterIntegrationSdsSyncStateThread, self).__init__()
         self._complete = threading.Event()
+        # get-state of the last completed sync, used to only write the
+        # objects which changed since then
+        self._previous_state = None
 
     def run(self):
         Event(
@@ -85,17 +98,44 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
                     )
                 )
 
-        _sleep = 0
+        # optionally rescan the block devices in the background, only
+        # when the device layout of the node changes
+        device_tree_refresher = None
+        refresh_interval = int(
+            NS.config.data.get("device_tree_refresh_interval", 0)
+        )
+        if refresh_interval > 0:
+            device_tree_refresher = device_tree.DeviceTreeRefresher(
+                device_tree.cache, refresh_interval
+            )
+            device_tree_refresher.start()
+
+        sync_scheduler = scheduler.SyncScheduler(
+            int(NS.config.data.get("sync_interval", 10)),
+            float(NS.config.data.get(
+                "sync_duty_cycle", scheduler.DEFAULT_DUTY_CYCLE
+            )),
+            float(NS.config.data.get(
+                "sync_etcd_latency", scheduler.DEFAULT_ETCD_LATENCY
+            ))
+        )
+        # where the time of the cycles goes
+        sync_stats = instrumentation.SyncStats()
         while not self._complete.is_set():
             # To detect out of band deletes
             # refresh gluster object inventory at config['sync_interval']
-            SYNC_TTL = int(NS.config.data.get("sync_interval", 10)) + 100
+            sync_scheduler.interval = int(
+                NS.config.data.get("sync_interval", 10)
+            )
+            SYNC_TTL = sync_scheduler.ttl
+            sync_scheduler.start_cycle()
+            generation = sync_events.generations.start()
+            instrumentation.count_etcd(NS._int.client)
+            instrumentation.count_etcd(NS._int.wclient)
+            sync_stats.start_cycle()
             NS.node_context = NS.node_context.load()
             NS.tendrl_context = NS.tendrl_context.load()
-            if _sleep > 5:
-                _sleep = int(NS.config.data.get("sync_interval", 10))
-            else:
-                _sleep += 1
+            changed = False
 
             try:
                 _cluster = NS.tendrl.objects.Cluster(
@@ -114,177 +154,127 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
                 except (etcd.EtcdAlreadyExist, etcd.EtcdCompareFailed) as ex:
                     pass
 
-                subprocess.call(
-                    [
-                        'gluster',
-                        'get-state',
-                        'glusterd',
-                        'odir',
-                        '/var/run',
-                        'file',
-                        'glusterd-state',
-                        'detail'
-                    ]
-                )
-                raw_data = ini2json.ini_to_dict(
-                    '/var/run/glusterd-state'
+                # object saves of the cycle are queued and written in
+                # batches, see batch_writer
+                batch_writer.begin(int(NS.config.data.get(
+                    "sync_write_workers", batch_writer.DEFAULT_WORKERS
+                )))
+                # status change alerts are deduplicated and emitted at
+                # the end of the cycle, see alert_batch
+                _begin_alerts()
+                # TTLs still valid after the next cycle are left alone,
+                # the scheduler never lets more than a TTL pass in
+                # between two cycles
+                leases.manager.begin(sync_scheduler.ttl)
+                sync_stats.mark("start")
+                collect_mode = NS.config.data.get(
+                    "get_state_collection", get_state.COLLECT_FIFO
                 )
-                subprocess.call(['rm', '-rf', '/var/run/glusterd-state'])
-                subprocess.call(
-                    [
-                        'gluster',
-                        'get-state',
-                        'glusterd',
-                        'odir',
-                        '/var/run',
-                        'file',
-                        'glusterd-state-vol-opts',
-                        'volumeoptions'
-                    ]
+                collect_dir = NS.config.data.get(
+                    "get_state_dir", "/var/run"
                 )
-                raw_data_options = ini2json.ini_to_dict(
-                    '/var/run/glusterd-state-vol-opts'
+                collected_at = time.time()
+                raw_data = get_state.collect(
+                    'detail', collect_mode, collect_dir
                 )
-                subprocess.call(
-                    [
-                        'rm',
-                        '-rf',
-                        '/var/run/glusterd-state-vol-opts'
-                    ]
+                raw_data_options = get_state.collect(
+                    'volumeoptions', collect_mode, collect_dir
                 )
                 sync_object = NS.gluster.objects.\
                     SyncObject(data=json.dumps(raw_data))
                 sync_object.save()
+                sync_stats.mark("get_state")
+
+                state = get_state.GlusterState(raw_data, raw_data_options)
+                get_state.cache.update(state, collected_at)
+                delta = state.delta(self._previous_state)
+                changed = delta.changed()
+                sync_stats.mark("parse")
 
                 if "Peers" in raw_data:
-                    index = 1
-                    peers = raw_data["Peers"]
-                    disconnected_hosts = []
-                    while True:
-                        try:
-                            peer = NS.gluster.\
-                                objects.Peer(
-                                    peer_uuid=peers['peer%s.uuid' % index],
-                                    hostname=peers[
-                                        'peer%s.primary_hostname' % index
-                                    ],
-                                    state=peers['peer%s.state' % index],
-                                    connected=peers['peer%s.connected' % index]
-                                )
-                            try:
-                                stored_peer_status = NS._int.client.read(
-                                    "clusters/%s/Peers/%s/connected" % (
-                                        NS.tendrl_context.integration_id,
-                                        peers['peer%s.uuid' % index]
-                                    )
-                                ).value
-                                current_status = peers[
-                                    'peer%s.connected' % index
-                                ]
-                                if stored_peer_status != "" and \
-                                    current_status != stored_peer_status:
-                                    msg = (
-                                        "Status of peer: %s in cluster %s "
-                                        "changed from %s to %s"
-                                    ) % (
-                                        peers[
-                                            'peer%s.primary_hostname' %
-                                            index
-                                        ],
-                                        NS.tendrl_context.integration_id,
-                                        stored_peer_status,
-                                        current_status
-                                    )
-                                    instance = "peer_%s" % peers[
-                                        'peer%s.primary_hostname' % index
-                                    ]
-                                    event_utils.emit_event(
-                                        "peer_status",
-                                        current_status,
-                                        msg,
-                                        instance,
-                                        'WARNING' if current_status !=
-                                        'Connected'
-                                        else 'INFO'
-                                    )
-                                    # Disconnected host name to raise brick alert
-                                    if current_status.lower() == "disconnected":
-                                        disconnected_hosts.append(
-                                            peers[
-                                                'peer%s.primary_hostname' %
-                                                index
-                                            ]
-                                        )
-                            except etcd.EtcdKeyNotFound:
-                                pass
-                            SYNC_TTL += 5
-                            peer.save(ttl=SYNC_TTL)
-                            index += 1
-                        except KeyError:
-                            break
-                    # Raise an alert for bricks when peer disconnected
-                    # or node goes down
-                    for disconnected_host in disconnected_hosts:
-                        brick_status_alert(
-                            disconnected_host
-                        ) 
+                    SYNC_TTL = self._sync_peers(state, delta, SYNC_TTL)
+                sync_stats.mark("peers")
                 if "Volumes" in raw_data:
-                    index = 1
-                    volumes = raw_data['Volumes']
-                    while True:
-                        try:
-                            sync_volumes(
-                                volumes, index,
-                                raw_data_options.get('Volume Options'),
-                                # sync_interval + 100 + no of peers + 350
-                                SYNC_TTL + 350
-                            )
-                            index += 1
-                            SYNC_TTL += 1
-                        except KeyError:
-                            break
-                    # populate the volume specific options
-                    reg_ex = re.compile("^volume[0-9]+.options+")
-                    options = {}
-                    for key in volumes.keys():
-                        if reg_ex.match(key):
-                            options[key] = volumes[key]
-                    for key in options.keys():
-                        volname = key.split('.')[0]
-                        vol_id = volumes['%s.id' % volname]
-                        dict1 = {}
-                        for k, v in options.items():
-                            if k.startswith('%s.options' % volname):
-                                dict1['.'.join(k.split(".")[2:])] = v
-                                options.pop(k, None)
-                        NS.gluster.objects.VolumeOptions(
-                            vol_id=vol_id,
-                            options=dict1
-                        ).save()
+                    context = VolumeSyncContext(
+                        background_device_tree=refresh_interval > 0
+                    )
+                    sync_stats.mark("blivet")
+                    SYNC_TTL += sync_volume_list(
+                        state.volumes,
+                        # sync_interval + 100 + no of peers + 350
+                        SYNC_TTL + 350,
+                        delta,
+                        int(NS.config.data.get("sync_volume_workers", 1)),
+                        context
+                    )
+                    sync_stats.mark("volumes")
+                    # the provisioner helpers load the synced volumes
+                    # and bricks back from etcd
+                    batch_writer.flush()
+                    sync_stats.mark("write")
 
                 # Sync cluster global details
                 if "provisioner/%s" % NS.tendrl_context.integration_id \
                     in NS.node_context.tags:
-                    all_volumes = NS.gluster.objects.Volume().load_all() or []
-                    volumes = []
-                    for volume in all_volumes:
-                        if not str(volume.deleted).lower() == "true":
-                            volumes.append(volume)
-                    cluster_status.sync_cluster_status(volumes, SYNC_TTL + 350)
-                    utilization.sync_utilization_details(volumes)
-                    client_connections.sync_volume_connections(volumes)
-                    georep_details.aggregate_session_status()
-                    evt.process_events()
+                    volumes = _synced_volumes()
+                    # brick details of all the volumes, read at most
+                    # once from etcd
+                    bricks = brick_index.BrickIndex(state)
+                    cluster_status.sync_cluster_status(
+                        volumes,
+                        SYNC_TTL + 350,
+                        bricks
+                    )
+                    sync_stats.mark("cluster_status")
+                    utilization.sync_utilization_details(
+                        volumes,
+                        NS.config.data.get(
+                            "in_process_volume_utilization", False
+                        ),
+                        int(NS.config.data.get(
+                            "volume_utilization_timeout",
+                            utilization.DEFAULT_TIMEOUT
+                        )),
+                        int(NS.config.data.get(
+                            "volume_utilization_workers",
+                            utilization.DEFAULT_WORKERS
+                        )),
+                        # samples of up to 3 sync cycles ago
+                        3 * int(NS.config.data.get("sync_interval", 10))
+                    )
+                    sync_stats.mark("utilization")
+                    client_connections.sync_volume_connections(
+                        volumes, bricks
+                    )
+                    client_connections.sync_client_totals(
+                        bricks, SYNC_TTL + 350
+                    )
+                    sync_stats.mark("clients")
+                    georep_details.aggregate_session_status(state.volumes)
+                    sync_stats.mark("georep")
+                    evt.process_events(NS.config.data.get(
+                        "incremental_event_processing", False
+                    ))
+                    sync_stats.mark("events")
                     rebalance_status.sync_volume_rebalance_status(volumes)
                     rebalance_status.sync_volume_rebalance_estimated_time(
                         volumes
                     )
+                    sync_stats.mark("rebalance")
                     snapshots.sync_volume_snapshots(
-                        raw_data['Volumes'],
+                        state.volumes,
                         int(NS.config.data.get(
                             "sync_interval", 10
-                        )) + len(volumes) * 4
+                        )) + len(volumes) * 4,
+                        delta
                     )
+                    sync_stats.mark("snapshots")
+                leases.manager.renew(int(NS.config.data.get(
+                    "sync_write_workers", batch_writer.DEFAULT_WORKERS
+                )))
+                batch = batch_writer.end()
+                sync_scheduler.observe_etcd(batch.writes, batch.flush_time)
+                sync_stats.mark("write")
 
                 _cluster = NS.tendrl.objects.Cluster(
                     integration_id=NS.tendrl_context.integration_id
@@ -309,8 +299,11 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
                 if "provisioner/%s" % NS.tendrl_context.integration_id in \
                     NS.node_context.tags:
                     self._enable_disable_volume_profiling()
+                sync_stats.mark("finish")
+                self._previous_state = state
 
             except Exception as ex:
+                batch_writer.discard()
                 Event(
                     ExceptionMessage(
                         priority="error",
@@ -320,6 +313,12 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
                                  }
                     )
                 )
+            finally:
+                # alerts of a failed cycle too, the transitions it saved
+                # are not found again by the next one
+                alert_batch.end()
+                # callbacks waiting for this sync can go on
+                sync_events.generations.complete(generation)
             try:
                 etcd_utils.read(
                     '/clusters/%s/_sync_now' %
@@ -329,7 +328,30 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
             except etcd.EtcdKeyNotFound:
                 pass
 
-            time.sleep(_sleep)
+            sync_stats.end_cycle()
+            stats_file = NS.config.data.get("sync_stats_file")
+            if stats_file:
+                try:
+                    sync_stats.write(stats_file)
+                except (IOError, OSError) as ex:
+                    Event(
+                        Message(
+                            priority="debug",
+                            publisher=NS.publisher_id,
+                            payload={"message": "Failed to write sync "
+                                     "stats to %s: %s" % (stats_file, ex)
+                                     }
+                        )
+                    )
+            _sleep = sync_scheduler.next_sleep(changed)
+            if NS.config.data.get("event_driven_sync", False):
+                self._sync_events(_sleep)
+            else:
+                # callbacks expedite the next sync, see sync_events
+                sync_events.requests.pause(_sleep)
+
+        if device_tree_refresher is not None:
+            device_tree_refresher.stop()
 
         Event(
             Message(
@@ -340,6 +362,173 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
             )
         )
 
+    def _sync_events(self, timeout):
+        # until the next full sync is due, sync what the native events
+        # received report changed
+        deadline = time.time() + timeout
+        while not self._complete.is_set():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            targets = sync_events.requests.wait(
+                remaining,
+                float(NS.config.data.get("event_sync_delay", 2))
+            )
+            if targets is None:
+                return
+            self._sync_targets(targets)
+
+    def _sync_targets(self, targets):
+        """Sync only the peers and volumes of sync_events.SyncTargets
+
+        Done from a single get-state, whatever the number of events.
+        Changes are taken against the state of the last full sync, which
+        stays the reference: anything not targeted here is synced by the
+        next full sync.
+        """
+        sync_interval = int(NS.config.data.get("sync_interval", 10))
+        sync_ttl = sync_interval + 100
+        generation = sync_events.generations.start()
+        try:
+            collect_mode = NS.config.data.get(
+                "get_state_collection", get_state.COLLECT_FIFO
+            )
+            collect_dir = NS.config.data.get("get_state_dir", "/var/run")
+            collected_at = time.time()
+            state = get_state.GlusterState(
+                get_state.collect('detail', collect_mode, collect_dir),
+                get_state.collect(
+                    'volumeoptions', collect_mode, collect_dir
+                )
+            )
+            get_state.cache.update(state, collected_at)
+            delta = state.delta(self._previous_state)
+
+            batch_writer.begin(int(NS.config.data.get(
+                "sync_write_workers", batch_writer.DEFAULT_WORKERS
+            )))
+            _begin_alerts()
+            # the TTLs set here are tracked too, the keys not targeted
+            # are left to the next full sync
+            leases.manager.begin(sync_ttl, partial=True)
+            if targets.peers:
+                sync_ttl = self._sync_peers(state, delta, sync_ttl)
+            volume_states = targets.volume_states(state)
+            if volume_states:
+                sync_volume_list(
+                    volume_states,
+                    sync_ttl + 350,
+                    delta,
+                    int(NS.config.data.get("sync_volume_workers", 1)),
+                    VolumeSyncContext(
+                        background_device_tree=int(NS.config.data.get(
+                            "device_tree_refresh_interval", 0
+                        )) > 0
+                    )
+                )
+                batch_writer.flush()
+            if volume_states and "provisioner/%s" % \
+                NS.tendrl_context.integration_id in NS.node_context.tags:
+                volumes = _synced_volumes()
+                cluster_status.sync_cluster_status(
+                    volumes,
+                    sync_ttl + 350,
+                    brick_index.BrickIndex(state)
+                )
+                if targets.georep:
+                    georep_details.aggregate_session_status(state.volumes)
+                snapshot_states = [
+                    volume_state for volume_state in volume_states
+                    if volume_state.name in targets.snapshots
+                ]
+                if snapshot_states:
+                    snapshots.sync_volume_snapshots(
+                        snapshot_states,
+                        sync_interval + len(volumes) * 4,
+                        delta
+                    )
+            leases.manager.renew(int(NS.config.data.get(
+                "sync_write_workers", batch_writer.DEFAULT_WORKERS
+            )))
+            batch_writer.end()
+        except Exception as ex:
+            batch_writer.discard()
+            Event(
+                ExceptionMessage(
+                    priority="error",
+                    publisher=NS.publisher_id,
+                    payload={"message": "gluster sds event sync error",
+                             "exception": ex
+                             }
+                )
+            )
+        finally:
+            alert_batch.end()
+            sync_events.generations.complete(generation)
+
+    def _sync_peers(self, state, delta, sync_ttl):
+        # sync_ttl grows by 5 per peer, returns the last ttl used
+        disconnected_hosts = []
+        for peer_state in state.peers:
+            try:
+                peer_changed = delta.peer_changed(peer_state)
+                peer = NS.gluster.objects.Peer(
+                    peer_uuid=peer_state['uuid'],
+                    hostname=peer_state['primary_hostname'],
+                    state=peer_state['state'],
+                    connected=peer_state['connected']
+                )
+                # the stored status is read every cycle: a drifted
+                # value alerts and is rewritten even if the get-state
+                # of the peer is unchanged
+                try:
+                    stored_peer_status = NS._int.client.read(
+                        "clusters/%s/Peers/%s/connected" % (
+                            NS.tendrl_context.integration_id,
+                            peer_state['uuid']
+                        )
+                    ).value
+                    current_status = peer_state['connected']
+                    if stored_peer_status != "" and \
+                        current_status != stored_peer_status:
+                        peer_changed = True
+                        msg = (
+                            "Status of peer: %s in cluster %s "
+                            "changed from %s to %s"
+                        ) % (
+                            peer_state['primary_hostname'],
+                            NS.tendrl_context.integration_id,
+                            stored_peer_status,
+                            current_status
+                        )
+                        instance = "peer_%s" % peer_state[
+                            'primary_hostname'
+                        ]
+                        alert_batch.emit(
+                            "peer_status",
+                            current_status,
+                            msg,
+                            instance,
+                            'WARNING' if current_status != 'Connected'
+                            else 'INFO'
+                        )
+                        # Disconnected host name to raise brick alert
+                        if current_status.lower() == "disconnected":
+                            disconnected_hosts.append(
+                                peer_state['primary_hostname']
+                            )
+                except etcd.EtcdKeyNotFound:
+                    pass
+                sync_ttl += 5
+                object_sync.sync_object(peer, sync_ttl, peer_changed)
+            except KeyError:
+                break
+        # Raise an alert for bricks when peer disconnected
+        # or node goes down
+        for disconnected_host in disconnected_hosts:
+            brick_status_alert(disconnected_host)
+        return sync_ttl
+
     def _enable_disable_volume_profiling(self):
         cluster = NS.tendrl.objects.Cluster(
             integration_id=NS.tendrl_context.integration_id
@@ -358,6 +547,7 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
                     action = "stop"
                 else:
                     continue
+            metrics.spawned("volume_profile")
             out, err, rc = cmd_utils.Command(
                 "gluster volume profile %s %s" %
                 (volume.name, action)
@@ -388,17 +578,147 @@ class GlusterIntegrationSdsSyncStateThread(sds_sync.SdsSyncThread):
             )
 
 
-def sync_volumes(volumes, index, vol_options, sync_ttl):
-    # instantiating blivet class, this will be used for
-    # getting brick_device_details
-    b = blivet.Blivet()
+class VolumeSyncContext(object):
+    """Node details shared by every sync_volumes() call of a sync cycle
+
+    Built once per cycle instead of once per volume, so the volumes can
+    also be synced concurrently without each of them re-reading the
+    node networks. The blivet device tree is only rescanned when the
+    device layout of the node changed (see device_tree), with
+    background_device_tree the rescan is left to DeviceTreeRefresher.
+    """
+
+    def __init__(self, background_device_tree=False):
+        if background_device_tree:
+            self.devicetree = device_tree.cache.current()
+        else:
+            self.devicetree = device_tree.cache.get()
+        self.tag_list = NS.node_context.load().tags
+        self.network_ip = _node_network_ip()
+        # {brick path: utilization} of the local bricks, see
+        # sync_volume_list
+        self.brick_utilization = None
+
+    def is_local(self, hostname):
+        return hostname == NS.node_context.fqdn or \
+            hostname in self.network_ip
+
+    def local_brick_paths(self, volumes):
+        paths = []
+        for volume_state in volumes:
+            for brick_state in volume_state.bricks:
+                if 'path' in brick_state and \
+                    self.is_local(brick_state.get('hostname')):
+                    paths.append(brick_state['path'])
+        return paths
+
+
+def _begin_alerts():
+    alert_batch.begin(
+        int(NS.config.data.get("alert_rate_limit", alert_batch.DEFAULT_RATE)),
+        int(NS.config.data.get(
+            "alert_rate_period", alert_batch.DEFAULT_PERIOD
+        ))
+    )
+
+
+def _synced_volumes():
+    # Volume objects of the cluster, deleted volumes excluded
+    volumes = []
+    for volume in NS.gluster.objects.Volume().load_all() or []:
+        if not str(volume.deleted).lower() == "true":
+            volumes.append(volume)
+    return volumes
+
+
+def _node_network_ip():
+    # ipv4 address of current node
+    network_ip = []
+    try:
+        networks = NS._int.client.read(
+            "nodes/%s/Networks" % NS.node_context.
+            node_id
+        )
+        for interface in networks.leaves:
+            key = interface.key.split("/")[-1]
+            network = NS.tendrl.objects.NodeNetwork(
+                interface=key
+            ).load()
+            if network.ipv4:
+                network_ip.extend(network.ipv4)
+    except etcd.EtcdKeyNotFound as ex:
+        Event(
+            ExceptionMessage(
+                priority="debug",
+                publisher=NS.publisher_id,
+                payload={
+                    "message": "Could not find "
+                    "any ipv4 networks for node"
+                    " %s" % NS.node_context.node_id,
+                    "exception": ex
+                }
+            )
+        )
+    return network_ip
+
+
+def _emit_event(alerts, *args, **kwargs):
+    # alerts raised by a volume sync are queued when a list is given,
+    # the caller emits them in volume order once the volume is synced
+    if alerts is None:
+        alert_batch.emit(*args, **kwargs)
+    else:
+        alerts.append((args, kwargs))
+
+
+def sync_volume_list(volumes, sync_ttl, delta, workers=1, context=None):
+    """Sync every volume of the get-state, `workers` volumes at a time
+
+    The volumes get increasing TTLs (sync_ttl, sync_ttl + 1 ...) like
+    the serial loop used to give them, and the alerts of each volume
+    are emitted once all volumes are synced, in volume order. Volumes
+    with incomplete get-state details (KeyError) are skipped. Returns
+    the number of volumes synced.
+    """
+    if context is None:
+        context = VolumeSyncContext()
+    # one /proc/mounts parse and lvm scan for all the local bricks
+    context.brick_utilization = brick_utilization.bricks_utilization(
+        context.local_brick_paths(volumes)
+    )
+
+    def _sync(item):
+        index, volume_state = item
+        alerts = []
+        sync_volumes(
+            volume_state, sync_ttl + index, delta, context, alerts
+        )
+        return alerts
 
-    # reset blivet during every sync to get latest information
-    # about storage devices in the machine
-    b.reset()
-    devicetree = b.devicetree
-    node_context = NS.node_context.load()
-    tag_list = node_context.tags
+    results = worker_pool.bounded_map(
+        _sync, enumerate(volumes), workers
+    )
+    synced = 0
+    for result in results:
+        if isinstance(result.error, KeyError):
+            continue
+        for args, kwargs in result.get():
+            alert_batch.emit(*args, **kwargs)
+        synced += 1
+    return synced
+
+
+def sync_volumes(volume_state, sync_ttl, delta, context=None, alerts=None):
+    if context is None:
+        context = VolumeSyncContext()
+    devicetree = context.devicetree
+    tag_list = context.tag_list
+    utilizations = context.brick_utilization
+    if utilizations is None:
+        utilizations = brick_utilization.bricks_utilization(
+            context.local_brick_paths([volume_state])
+        )
+    volume_changed = delta.volume_changed(volume_state)
     # Raise alerts for volume state change.
     cluster_provisioner = "provisioner/%s" % NS.tendrl_context.integration_id
     if cluster_provisioner in tag_list:
@@ -406,22 +726,23 @@ def sync_volumes(volumes, index, vol_options, sync_ttl):
             stored_volume_status = NS._int.client.read(
                 "clusters/%s/Volumes/%s/status" % (
                     NS.tendrl_context.integration_id,
-                    volumes['volume%s.id' % index]
+                    volume_state['id']
                 )
             ).value
-            current_status = volumes['volume%s.status' % index]
+            current_status = volume_state['status']
             if stored_volume_status != "" and \
                 current_status != stored_volume_status:
+                # rewritten below even if the get-state is unchanged
+                volume_changed = True
                 msg = ("Status of volume: %s in cluster %s "
                        "changed from %s to %s") % (
-                           volumes['volume%s.name' % index],
+                           volume_state['name'],
                            NS.tendrl_context.integration_id,
                            stored_volume_status,
                            current_status)
-                instance = "volume_%s" % volumes[
-                    'volume%s.name' % index
-                ]
-                event_utils.emit_event(
+                instance = "volume_%s" % volume_state['name']
+                _emit_event(
+                    alerts,
                     "volume_status",
                     current_status,
                     msg,
@@ -429,129 +750,91 @@ def sync_volumes(volumes, index, vol_options, sync_ttl):
                     'WARNING' if current_status == 'Stopped'
                     else 'INFO',
                     tags={"entity_type": RESOURCE_TYPE_VOLUME,
-                          "volume_name": volumes['volume%s.name' % index]
+                          "volume_name": volume_state['name']
                           }
                 )
-        except (KeyError, etcd.EtcdKeyNotFound) as ex:
-            if isinstance(ex, KeyError):
-                raise ex
+        except etcd.EtcdKeyNotFound:
             pass
 
         volume = NS.gluster.objects.Volume(
-            vol_id=volumes['volume%s.id' % index],
+            vol_id=volume_state['id'],
             vol_type="arbiter"
-            if int(volumes['volume%s.arbiter_count' % index]) > 0
-            else volumes['volume%s.type' % index],
-            name=volumes['volume%s.name' % index],
-            transport_type=volumes['volume%s.transport_type' % index],
-            status=volumes['volume%s.status' % index],
-            brick_count=volumes['volume%s.brickcount' % index],
-            snap_count=volumes['volume%s.snap_count' % index],
-            stripe_count=volumes['volume%s.stripe_count' % index],
-            replica_count=volumes['volume%s.replica_count' % index],
-            subvol_count=volumes['volume%s.subvol_count' % index],
-            arbiter_count=volumes['volume%s.arbiter_count' % index],
-            disperse_count=volumes['volume%s.disperse_count' % index],
-            redundancy_count=volumes['volume%s.redundancy_count' % index],
-            quorum_status=volumes['volume%s.quorum_status' % index],
-            snapd_status=volumes['volume%s.snapd_svc.online_status' % index],
-            snapd_inited=volumes['volume%s.snapd_svc.inited' % index],
+            if int(volume_state['arbiter_count']) > 0
+            else volume_state['type'],
+            name=volume_state['name'],
+            transport_type=volume_state['transport_type'],
+            status=volume_state['status'],
+            brick_count=volume_state['brickcount'],
+            snap_count=volume_state['snap_count'],
+            stripe_count=volume_state['stripe_count'],
+            replica_count=volume_state['replica_count'],
+            subvol_count=volume_state['subvol_count'],
+            arbiter_count=volume_state['arbiter_count'],
+            disperse_count=volume_state['disperse_count'],
+            redundancy_count=volume_state['redundancy_count'],
+            quorum_status=volume_state['quorum_status'],
+            snapd_status=volume_state['snapd_svc.online_status'],
+            snapd_inited=volume_state['snapd_svc.inited'],
         )
-        volume.save(ttl=sync_ttl)
+        object_sync.sync_object(volume, sync_ttl, volume_changed)
 
-        # Initialize volume alert count
-        try:
-            volume_alert_count_key = '/clusters/%s/Volumes/%s/'\
-                                     'alert_counters' % (
-                                         NS.tendrl_context.integration_id,
-                                         volumes['volume%s.id' % index]
-                                     )
-            etcd_utils.read(volume_alert_count_key)
-        except(etcd.EtcdException)as ex:
-            if type(ex) == etcd.EtcdKeyNotFound:
-                NS.gluster.objects.VolumeAlertCounters(
-                    integration_id=NS.tendrl_context.integration_id,
-                    volume_id=volumes['volume%s.id' % index]
-                ).save()
-        # Save the default values of volume options
-        vol_opt_dict = {}
-        for opt_count in \
-            range(1, int(vol_options['volume%s.options.count' % index])):
-            vol_opt_dict[
-                vol_options[
-                    'volume%s.options.key%s' % (index, opt_count)
-                ]
-            ] = vol_options[
-                'volume%s.options.value%s' % (index, opt_count)
-            ]
-        NS.gluster.objects.VolumeOptions(
-            vol_id=volume.vol_id,
-            options=vol_opt_dict
-        ).save(ttl=sync_ttl)
+        # Initialize volume alert count, already done by an earlier
+        # sync when the volume did not change
+        if volume_changed:
+            try:
+                volume_alert_count_key = '/clusters/%s/Volumes/%s/'\
+                                         'alert_counters' % (
+                                             NS.tendrl_context.integration_id,
+                                             volume_state['id']
+                                         )
+                etcd_utils.read(volume_alert_count_key)
+            except(etcd.EtcdException)as ex:
+                if type(ex) == etcd.EtcdKeyNotFound:
+                    NS.gluster.objects.VolumeAlertCounters(
+                        integration_id=NS.tendrl_context.integration_id,
+                        volume_id=volume_state['id']
+                    ).save()
+        # Save the volume options, defaults included
+        volume_options.sync_volume_options(
+            volume_state,
+            sync_ttl,
+            delta,
+            int(NS.config.data.get(
+                "volume_options_history_ttl",
+                volume_options.DEFAULT_HISTORY_TTL
+            ))
+        )
 
     rebal_det = NS.gluster.objects.RebalanceDetails(
-        vol_id=volumes['volume%s.id' % index],
-        rebal_id=volumes['volume%s.rebalance.id' % index],
-        rebal_status=volumes['volume%s.rebalance.status' % index],
-        rebal_failures=volumes['volume%s.rebalance.failures' % index],
-        rebal_skipped=volumes['volume%s.rebalance.skipped' % index],
-        rebal_lookedup=volumes['volume%s.rebalance.lookedup' % index],
-        rebal_files=volumes['volume%s.rebalance.files' % index],
-        rebal_data=volumes['volume%s.rebalance.data' % index],
-        time_left=volumes.get('volume%s.rebalance.time_left' % index),
+        vol_id=volume_state['id'],
+        rebal_id=volume_state['rebalance.id'],
+        rebal_status=volume_state['rebalance.status'],
+        rebal_failures=volume_state['rebalance.failures'],
+        rebal_skipped=volume_state['rebalance.skipped'],
+        rebal_lookedup=volume_state['rebalance.lookedup'],
+        rebal_files=volume_state['rebalance.files'],
+        rebal_data=volume_state['rebalance.data'],
+        time_left=volume_state.get('rebalance.time_left'),
     )
-    rebal_det.save(ttl=sync_ttl)
-    georep_details.save_georep_details(volumes, index)
+    object_sync.sync_object(rebal_det, sync_ttl, volume_changed)
+    if delta.pairs_changed(volume_state):
+        georep_details.save_georep_details(volume_state)
 
-    b_index = 1
-    # ipv4 address of current node
-    try:
-        network_ip = []
-        networks = NS._int.client.read(
-            "nodes/%s/Networks" % NS.node_context.
-            node_id
-        )
-        for interface in networks.leaves:
-            key = interface.key.split("/")[-1]
-            network = NS.tendrl.objects.NodeNetwork(
-                interface=key
-            ).load()
-            if network.ipv4:
-                network_ip.extend(network.ipv4)
-    except etcd.EtcdKeyNotFound as ex:
-        Event(
-            ExceptionMessage(
-                priority="debug",
-                publisher=NS.publisher_id,
-                payload={
-                    "message": "Could not find "
-                    "any ipv4 networks for node"
-                    " %s" % NS.node_context.node_id,
-                    "exception": ex
-                }
-            )
-        )
-    while True:
+    for brick_state in volume_state.bricks:
         try:
             # Update brick node wise
-            hostname = volumes[
-                'volume%s.brick%s.hostname' % (index, b_index)
-            ]
-            if (NS.node_context.fqdn != hostname) and (
-                hostname not in network_ip):
-                b_index += 1
+            if not context.is_local(brick_state['hostname']):
                 continue
             sub_vol_size = (int(
-                volumes['volume%s.brickcount' % index]
+                volume_state['brickcount']
             )) / int(
-                volumes['volume%s.subvol_count' % index]
+                volume_state['subvol_count']
             )
             brick_name = NS.node_context.fqdn
             brick_name += ":"
-            brick_name += volumes['volume%s.brick%s' '.path' % (
-                index,
-                b_index
-            )].split(":")[-1].replace("/", "_")
+            brick_name += brick_state['path'].split(":")[-1].replace(
+                "/", "_"
+            )
 
             # Raise alerts if the brick path changes
             try:
@@ -564,29 +847,22 @@ def sync_volumes(volumes, index, vol_options, sync_ttl):
                         brick_name.split(":_")[-1]
                     )
                 ).value
-                current_status = volumes.get(
-                    'volume%s.brick%s.status' % (index, b_index)
-                )
+                current_status = brick_state.get('status')
                 if current_status != sbs:
                     msg = ("Status of brick: %s "
                            "under volume %s in cluster %s chan"
                            "ged from %s to %s") % (
-                               volumes['volume%s.brick%s' '.path' % (
-                                   index,
-                                   b_index
-                               )],
-                               volumes['volume%s.' 'name' % index],
+                               brick_state['path'],
+                               volume_state['name'],
                                NS.tendrl_context.integration_id,
                                sbs,
                                current_status)
                     instance = "volume_%s|brick_%s" % (
-                        volumes['volume%s.name' % index],
-                        volumes['volume%s.brick%s.path' % (
-                            index,
-                            b_index
-                        )]
+                        volume_state['name'],
+                        brick_state['path']
                     )
-                    event_utils.emit_event(
+                    _emit_event(
+                        alerts,
                         "brick_status",
                         current_status,
                         msg,
@@ -594,8 +870,7 @@ def sync_volumes(volumes, index, vol_options, sync_ttl):
                         'WARNING' if current_status == 'Stopped'
                         else 'INFO',
                         tags={"entity_type": RESOURCE_TYPE_BRICK,
-                              "volume_name": volumes[
-                                  'volume%s.' 'name' % index]
+                              "volume_name": volume_state['name']
                               }
                     )
 
@@ -606,8 +881,8 @@ def sync_volumes(volumes, index, vol_options, sync_ttl):
 
             vol_brick_path = brk_pth % (
                 NS.tendrl_context.integration_id,
-                volumes['volume%s.id' % index],
-                str((b_index - 1) / sub_vol_size),
+                volume_state['id'],
+                str((brick_state.index - 1) / sub_vol_size),
                 brick_name
             )
 
@@ -617,89 +892,51 @@ def sync_volumes(volumes, index, vol_options, sync_ttl):
                 NS.node_context.fqdn,
                 brick_name.split(":_")[-1],
                 name=brick_name,
-                vol_id=volumes['volume%s.id' % index],
-                sequence_number=b_index,
-                brick_path=volumes[
-                    'volume%s.brick%s.path' % (index, b_index)
-                ],
-                hostname=volumes.get(
-                    'volume%s.brick%s.hostname' % (index, b_index)
-                ),
-                port=volumes.get(
-                    'volume%s.brick%s.port' % (index, b_index)
-                ),
-                vol_name=volumes['volume%s.name' % index],
+                vol_id=volume_state['id'],
+                sequence_number=brick_state.index,
+                brick_path=brick_state['path'],
+                hostname=brick_state.get('hostname'),
+                port=brick_state.get('port'),
+                vol_name=volume_state['name'],
                 used=True,
                 node_id=NS.node_context.node_id,
-                status=volumes.get(
-                    'volume%s.brick%s.status' % (index, b_index)
-                ),
-                filesystem_type=volumes.get(
-                    'volume%s.brick%s.filesystem_type' % (index, b_index)
-                ),
-                mount_opts=volumes.get(
-                    'volume%s.brick%s.mount_options' % (index, b_index)
-                ),
-                utilization=brick_utilization.brick_utilization(
-                    volumes['volume%s.brick%s.path' % (index, b_index)]
-                ),
-                client_count=volumes.get(
-                    'volume%s.brick%s.client_count' % (index, b_index)
-                ),
-                is_arbiter=volumes.get(
-                    'volume%s.brick%s.is_arbiter' % (index, b_index)
-                ),
+                status=brick_state.get('status'),
+                filesystem_type=brick_state.get('filesystem_type'),
+                mount_opts=brick_state.get('mount_options'),
+                utilization=utilizations.get(brick_state['path']),
+                client_count=brick_state.get('client_count'),
+                is_arbiter=brick_state.get('is_arbiter'),
             )
-            brick.save(ttl=sync_ttl)
+            batch_writer.save(brick, sync_ttl)
             # sync brick device details
             brick_device_details.\
                 update_brick_device_details(
                     brick_name,
-                    volumes[
-                        'volume%s.brick%s.path' % (
-                            index, b_index)
-                    ],
+                    brick_state['path'],
                     devicetree,
                     sync_ttl
                 )
 
             # Sync the brick client details
-            c_index = 1
-            if volumes.get(
-                'volume%s.brick%s.client_count' % (index, b_index)
-            ) > 0:
-                while True:
+            if brick_state.get('client_count') > 0:
+                clients_changed = delta.clients_changed(brick_state)
+                for client_state in brick_state.clients:
                     try:
-                        NS.gluster.objects.ClientConnection(
+                        client = NS.gluster.objects.ClientConnection(
                             brick_name=brick_name,
                             fqdn=NS.node_context.fqdn,
                             brick_dir=brick_name.split(":_")[-1],
-                            hostname=volumes[
-                                'volume%s.brick%s.client%s.hostname' % (
-                                    index, b_index, c_index
-                                )
-                            ],
-                            bytesread=volumes[
-                                'volume%s.brick%s.client%s.bytesread' % (
-                                    index, b_index, c_index
-                                )
-                            ],
-                            byteswrite=volumes[
-                                'volume%s.brick%s.client%s.byteswrite' % (
-                                    index, b_index, c_index
-                                )
-                            ],
-                            opversion=volumes[
-                                'volume%s.brick%s.client%s.opversion' % (
-                                    index, b_index, c_index
-                                )
-                            ]
-                        ).save(ttl=sync_ttl)
+                            hostname=client_state['hostname'],
+                            bytesread=client_state['bytesread'],
+                            byteswrite=client_state['byteswrite'],
+                            opversion=client_state['opversion']
+                        )
+                        object_sync.sync_object(
+                            client, sync_ttl, clients_changed
+                        )
                     except KeyError:
                         break
-                    c_index += 1
             sync_ttl += 4
-            b_index += 1
         except KeyError:
             break
 
@@ -740,7 +977,9 @@ def brick_status_alert(hostname):
                         brick.vol_name,
                         brick.brick_path,
                     )
-                    event_utils.emit_event(
+                    # emitted once the lock is released, with the
+                    # other alerts of the cycle
+                    alert_batch.emit(
                         "brick_status",
                         BRICK_STOPPED.title(),
                         msg,
@@ -0,0 +1,162 @@
+import collections
+import threading
+import time
+
+from tendrl.commons.utils import event_utils
+from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration import metrics
+
+
+# alerts of one instance emitted at most `rate` times per `period`
+# seconds when a rate is configured, the default of 0 emits them all
+DEFAULT_RATE = 0
+DEFAULT_PERIOD = 600
+
+metrics.registry.describe(
+    "gluster_integration_alerts_total", metrics.COUNTER,
+    "Status change alerts raised by the sync, by result (emitted, "
+    "deduplicated or held back by the rate limit)"
+)
+
+
+class RateLimiter(object):
+    """At most `rate` alerts per `period` seconds for every instance"""
+
+    def __init__(self, rate=DEFAULT_RATE, period=DEFAULT_PERIOD):
+        self.rate = rate
+        self.period = period
+        # {(resource, instance): times of its last alerts}
+        self._emitted = {}
+
+    def allow(self, key, now):
+        if self.rate <= 0:
+            return True
+        emitted = self._emitted.setdefault(
+            key, collections.deque(maxlen=self.rate)
+        )
+        if len(emitted) == self.rate and now - emitted[0] < self.period:
+            return False
+        emitted.append(now)
+        return True
+
+    def forget(self, now):
+        """Drop the instances without an alert in the last period"""
+        for key, emitted in self._emitted.items():
+            if not emitted or now - emitted[-1] >= self.period:
+                del self._emitted[key]
+
+
+class AlertBatch(object):
+    """Status change alerts of a sync cycle, deduplicated until flush()
+    at the end of the cycle
+
+    This is not a grouped send: tendrl-commons publishes one alert per
+    event_utils.emit_event call, and flush() makes one such call for
+    every alert left. add() takes the arguments of emit_event. The
+    alerts of the same resource and instance (the brick alerts of a
+    node going down raised by brick_status_alert then by the volume sync
+    ...) collapse into the last one. With a rate limit set, alerts over
+    the rate of their instance are held back, the latest of them is
+    emitted by the first flush the rate allows it.
+    """
+
+    def __init__(self, limiter, held=None):
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        # {(resource, instance): (args, kwargs)} in first alert order
+        self._pending = collections.OrderedDict(held or ())
+        self.held = collections.OrderedDict()
+        self.added = 0
+        self.emitted = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, resource, curr_value, msg, instance, severity, **kwargs):
+        key = (resource, instance)
+        with self._lock:
+            self.added += 1
+            if key in self._pending:
+                metrics.registry.inc(
+                    "gluster_integration_alerts_total", result="deduplicated"
+                )
+            self._pending[key] = (
+                (resource, curr_value, msg, instance, severity), kwargs
+            )
+
+    def flush(self):
+        """Emit the pending alerts the rate allows, one emit_event call
+        each, returns the number of alerts emitted
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = collections.OrderedDict()
+        now = time.time()
+        emitted = 0
+        for key, (args, kwargs) in pending.iteritems():
+            if not self.limiter.allow(key, now):
+                self.held[key] = (args, kwargs)
+                metrics.registry.inc(
+                    "gluster_integration_alerts_total", result="held"
+                )
+                continue
+            self.held.pop(key, None)
+            try:
+                event_utils.emit_event(*args, **kwargs)
+            except Exception as ex:
+                logger.log(
+                    "error",
+                    NS.publisher_id,
+                    {
+                        "message": "Failed to emit %s alert for %s: "
+                        "%s" % (key[0], key[1], ex)
+                    }
+                )
+                continue
+            emitted += 1
+            metrics.registry.inc(
+                "gluster_integration_alerts_total", result="emitted"
+            )
+        self.emitted += emitted
+        self.limiter.forget(now)
+        return emitted
+
+
+_limiter = RateLimiter()
+_batch = None
+# alerts held back by the rate limit, added to the next batch
+_held = collections.OrderedDict()
+
+
+def begin(rate=DEFAULT_RATE, period=DEFAULT_PERIOD):
+    """Hold the alerts of the sync helpers until end(), the ones of an
+    instance collapsing into its last
+    """
+    global _batch
+    _limiter.rate = rate
+    _limiter.period = period
+    _batch = AlertBatch(_limiter, _held)
+    _held.clear()
+    return _batch
+
+
+def end():
+    """Emit the held alerts one by one and stop holding them"""
+    global _batch
+    batch, _batch = _batch, None
+    if batch is None:
+        return
+    batch.flush()
+    _held.update(batch.held)
+    return batch
+
+
+def emit(*args, **kwargs):
+    """event_utils.emit_event(...), held until end() while a batch is
+    open
+    """
+    batch = _batch
+    if batch is None:
+        event_utils.emit_event(*args, **kwargs)
+    else:
+        batch.add(*args, **kwargs)
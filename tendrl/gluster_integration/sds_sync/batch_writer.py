@@ -0,0 +1,155 @@
+import collections
+import threading
+import time
+
+from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration import metrics
+from tendrl.gluster_integration import worker_pool
+
+
+DEFAULT_WORKERS = 4
+
+# BaseObject attributes which are not object fields
+_NOT_FIELDS = ("value", "list", "hash")
+
+
+def _merge(previous, obj):
+    # BaseObject.save(update=True) keeps the stored value of the fields
+    # left to None, a pending save of the same key is the newest stored
+    # value as far as obj is concerned
+    if previous is obj:
+        return
+    for attr, value in vars(previous).iteritems():
+        if attr.startswith("_") or attr in _NOT_FIELDS or callable(value):
+            continue
+        if value is not None and getattr(obj, attr, None) is None:
+            setattr(obj, attr, value)
+
+
+class WriteBatch(object):
+    """Object saves of a sync cycle, written to etcd with bounded
+    concurrency
+
+    Every save is an etcd hash compare plus one write per field (and a
+    TTL refresh), done one after the other when called from the sync
+    helpers. Queued here instead, the saves of the same object key
+    (Volume is saved by most of the provisioner helpers, Brick by the
+    volume sync and the device details) collapse into one, and flush()
+    writes the remaining objects `workers` at a time.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        # {(object class, key): (object, ttl)} in first save order
+        self._pending = collections.OrderedDict()
+        self.saves = 0
+        self.writes = 0
+        self.flush_time = 0.0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, obj, ttl=None):
+        obj.render()
+        # Volume and VolumeOptions share their key, only saves of the
+        # same object class collapse
+        key = (type(obj), obj.value)
+        with self._lock:
+            self.saves += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                previous, previous_ttl = pending
+                _merge(previous, obj)
+                if ttl is None:
+                    ttl = previous_ttl
+            self._pending[key] = (obj, ttl)
+
+    def flush(self):
+        """Save the queued objects, returns the number of objects saved
+
+        Every object is attempted, the first failure is raised once
+        they all are done.
+        """
+        with self._lock:
+            pending = self._pending.values()
+            self._pending = collections.OrderedDict()
+        if not pending:
+            return 0
+        start = time.time()
+        results = worker_pool.bounded_map(
+            lambda item: _save(*item), pending, self.workers
+        )
+        self.flush_time += time.time() - start
+        self.writes += len(pending)
+        for result in results:
+            result.get()
+        return len(pending)
+
+
+def _save(obj, ttl=None):
+    if ttl:
+        obj.save(ttl=ttl)
+    else:
+        obj.save()
+
+
+_batch = None
+
+
+def begin(workers=DEFAULT_WORKERS):
+    """Queue the saves of the sync helpers until end()"""
+    global _batch
+    _batch = WriteBatch(workers)
+    return _batch
+
+
+def end():
+    """Flush and stop queueing, reports the flush latency of the cycle"""
+    global _batch
+    batch, _batch = _batch, None
+    if batch is None:
+        return
+    batch.flush()
+    logger.log(
+        "debug",
+        NS.publisher_id,
+        {
+            "message": "Sync cycle wrote %s object(s) for %s save(s) "
+            "in %.3fs" % (batch.writes, batch.saves, batch.flush_time)
+        }
+    )
+    return batch
+
+
+def discard():
+    """Stop queueing and drop the pending saves of a failed cycle, the
+    next cycle writes its changes again
+    """
+    global _batch
+    _batch = None
+
+
+def flush():
+    if _batch is not None:
+        _batch.flush()
+
+
+def save(obj, ttl=None):
+    """obj.save(ttl=ttl), queued while a batch is open"""
+    batch = _batch
+    if batch is None:
+        _save(obj, ttl)
+    else:
+        batch.add(obj, ttl)
+
+
+def _collect():
+    batch = _batch
+    metrics.registry.set(
+        "gluster_integration_queue_depth", len(batch) if batch else 0,
+        queue="etcd_writes"
+    )
+
+
+metrics.registry.register_collector(_collect)
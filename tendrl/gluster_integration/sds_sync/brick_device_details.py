@@ -1,5 +1,7 @@
 from tendrl.commons.utils import cmd_utils
 from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration import metrics
+from tendrl.gluster_integration.sds_sync import batch_writer
 
 
 def get_brick_source_and_mount(brick_path):
@@ -11,6 +13,7 @@ def get_brick_source_and_mount(brick_path):
 
     command = "df --output=source,target " + brick_path.split(":")[-1]
     cmd = cmd_utils.Command(command)
+    metrics.spawned("df")
     out, err, rc = cmd.run()
     if rc != 0:
         logger.log(
@@ -74,4 +77,4 @@ def update_brick_device_details(brick_name, brick_path, devicetree, sync_ttl):
         size=size
     )
 
-    brick.save(ttl=sync_ttl)
+    batch_writer.save(brick, sync_ttl)
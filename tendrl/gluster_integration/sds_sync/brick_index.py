@@ -0,0 +1,165 @@
+import etcd
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def client_host(hostname):
+    # get-state reports clients as "<address>:<port>"
+    return hostname.rsplit(":", 1)[0]
+
+
+class BrickIndex(object):
+    """Brick layout, status and clients of every volume, kept in memory
+
+    Built from the GlusterState of the current sync cycle: the bricks of
+    a volume and their subvolumes come from get-state, so do the status
+    and client details of the bricks local to this node. get-state does
+    not report those details for the bricks of other nodes, they are
+    taken from a single recursive read of clusters/<id>/Bricks/all,
+    done only when some brick is missing them.
+    """
+
+    def __init__(self, state):
+        # {vol_id: [[brick path, ...] per subvolume]}
+        self._subvolumes = {}
+        # {brick path: {'status': .., 'client_count': ..,
+        #               'clients': {hostname: {field: value}}}}
+        self._bricks = {}
+        self._etcd_loaded = False
+        for volume_state in state.volumes:
+            subvolumes = self._layout(volume_state)
+            if subvolumes is not None:
+                self._subvolumes[volume_state.id] = subvolumes
+
+    def _layout(self, volume_state):
+        try:
+            sub_vol_size = int(volume_state['brickcount']) / int(
+                volume_state['subvol_count']
+            )
+            subvolumes = [[] for _ in range(
+                int(volume_state['subvol_count'])
+            )]
+            for brick_state in volume_state.bricks:
+                path = brick_state['path']
+                subvolumes[(brick_state.index - 1) / sub_vol_size].append(
+                    path
+                )
+                if 'status' in brick_state:
+                    self._bricks[path] = {
+                        'status': brick_state['status'],
+                        'client_count': brick_state.get('client_count'),
+                        'clients': dict(
+                            (client['hostname'], client.fields)
+                            for client in brick_state.clients
+                            if 'hostname' in client
+                        )
+                    }
+        except (KeyError, ValueError, IndexError, ZeroDivisionError):
+            # incomplete get-state details, let the caller fall back
+            return None
+        return subvolumes
+
+    def _load_bricks(self):
+        self._etcd_loaded = True
+        prefix = "clusters/%s/Bricks/all" % NS.tendrl_context.integration_id
+        try:
+            bricks = NS._int.client.read(prefix, recursive=True)
+        except etcd.EtcdKeyNotFound:
+            return
+        # <prefix>/<fqdn>/<brick dir>/<field> and
+        # <prefix>/<fqdn>/<brick dir>/ClientConnections/<client>/<field>
+        fields = {}
+        clients = {}
+        for leaf in bricks.leaves:
+            parts = leaf.key.split(prefix, 1)[-1].strip("/").split("/")
+            if len(parts) == 3:
+                fields.setdefault(tuple(parts[:2]), {})[parts[2]] = \
+                    leaf.value
+            elif len(parts) == 5 and parts[2] == "ClientConnections":
+                clients.setdefault(tuple(parts[:2]), {}).setdefault(
+                    parts[3], {}
+                )[parts[4]] = leaf.value
+        for key, brick in fields.iteritems():
+            if str(brick.get('deleted')).lower() == "true" or \
+                not brick.get('brick_path') or \
+                brick['brick_path'] in self._bricks:
+                # details of local bricks from get-state are fresher
+                continue
+            self._bricks[brick['brick_path']] = {
+                'status': brick.get('status') or '',
+                'client_count': brick.get('client_count'),
+                'clients': clients.get(key, {})
+            }
+
+    def _volume_bricks(self, vol_id):
+        subvolumes = self._subvolumes.get(vol_id)
+        if subvolumes is None:
+            return None
+        if not self._etcd_loaded and any(
+            path not in self._bricks
+            for subvolume in subvolumes for path in subvolume
+        ):
+            self._load_bricks()
+        return [
+            [self._bricks.get(path) for path in subvolume]
+            for subvolume in subvolumes
+        ]
+
+    def subvolume_statuses(self, vol_id):
+        """[[status, ...] per subvolume] of the bricks of the volume
+
+        The status of a brick is None when its details are not in
+        etcd yet and '' when the brick reported no status. Returns None
+        for volumes not in the get-state of this cycle.
+        """
+        subvolumes = self._volume_bricks(vol_id)
+        if subvolumes is None:
+            return None
+        return [
+            [None if brick is None else brick['status']
+             for brick in subvolume]
+            for subvolume in subvolumes
+        ]
+
+    def client_count(self, vol_id):
+        """Client connections to all the bricks of the volume, None for
+        volumes not in the get-state of this cycle
+        """
+        subvolumes = self._volume_bricks(vol_id)
+        if subvolumes is None:
+            return None
+        return sum(
+            _int(brick['client_count'])
+            for subvolume in subvolumes for brick in subvolume
+            if brick is not None
+        )
+
+    def client_totals(self):
+        """{client host: {'bytesread', 'byteswrite', 'connections'}}
+
+        Summed over the connections of the client to every brick of the
+        volumes in the get-state of this cycle.
+        """
+        totals = {}
+        for vol_id in self._subvolumes:
+            for subvolume in self._volume_bricks(vol_id):
+                for brick in subvolume:
+                    if brick is None:
+                        continue
+                    for hostname, client in brick['clients'].iteritems():
+                        total = totals.setdefault(client_host(hostname), {
+                            'bytesread': 0,
+                            'byteswrite': 0,
+                            'connections': 0
+                        })
+                        total['bytesread'] += _int(client.get('bytesread'))
+                        total['byteswrite'] += _int(
+                            client.get('byteswrite')
+                        )
+                        total['connections'] += 1
+        return totals
@@ -3,6 +3,7 @@ import os
 from tendrl.commons.event import Event
 from tendrl.commons.message import Message
 from tendrl.commons.utils import cmd_utils
+from tendrl.gluster_integration import metrics
 
 
 def _get_mount_point(path):
@@ -52,6 +53,7 @@ def get_lvs():
                 "lv_name,data_percent,pool_lv,lv_attr,lv_size,"
                 "lv_path,lv_metadata_size,metadata_percent,vg_name")
     cmd = cmd_utils.Command(_lvm_cmd, True)
+    metrics.spawned("lvm")
     out, err, rc = cmd.run()
     if rc != 0:
         Event(
@@ -172,3 +174,23 @@ def brick_utilization(path):
     # Below logic will find mount_path from path
     mount_path = [path.split(":")[1]]
     return get_mount_stats(mount_path).values()[0]
+
+
+def bricks_utilization(paths):
+    """Utilization of many bricks with one /proc/mounts and lvm scan
+
+    paths are brick paths ("host:/brick/dir") like for
+    brick_utilization(), returns {path: utilization} for every brick
+    whose mount point could be found.
+    """
+    brick_mounts = {}
+    for path in paths:
+        brick_mounts[path] = _get_mount_point(path.split(":")[-1])
+    if not brick_mounts:
+        return {}
+    mount_detail = get_mount_stats(set(brick_mounts.values()))
+    utilization = {}
+    for path, mount in brick_mounts.iteritems():
+        if mount in mount_detail:
+            utilization[path] = mount_detail[mount]
+    return utilization
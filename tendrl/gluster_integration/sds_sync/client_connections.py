@@ -1,32 +1,60 @@
 import etcd
 
+from tendrl.gluster_integration.sds_sync import batch_writer
 
-def sync_volume_connections(volumes):
-    for volume in volumes:
-        subvol_count = 0
-        vol_connections = 0
-        while True:
-            try:
-                subvol = NS._int.client.read(
-                    "clusters/%s/Volumes/%s/Bricks/subvolume%s" % (
-                        NS.tendrl_context.integration_id,
-                        volume.vol_id,
-                        subvol_count
-                    )
+
+def _etcd_client_count(volume):
+    # walk clusters/<id>/Volumes/<vol>/Bricks/subvolumeN and load every
+    # brick, only used for volumes the BrickIndex does not know
+    subvol_count = 0
+    vol_connections = 0
+    while True:
+        try:
+            subvol = NS._int.client.read(
+                "clusters/%s/Volumes/%s/Bricks/subvolume%s" % (
+                    NS.tendrl_context.integration_id,
+                    volume.vol_id,
+                    subvol_count
                 )
-                if subvol:
-                    for entry in subvol.leaves:
-                        brick_name = entry.key.split("/")[-1]
-                        fetched_brick = NS.gluster.objects.Brick(
-                            brick_name.split(":")[0],
-                            brick_name.split(":_")[-1]
-                        ).load()
-                        if fetched_brick and fetched_brick.client_count:
-                            vol_connections += 0 \
-                                if fetched_brick.client_count == '' \
-                                else int(fetched_brick.client_count)
-                    subvol_count += 1
-            except etcd.EtcdKeyNotFound:
-                break
+            )
+            if subvol:
+                for entry in subvol.leaves:
+                    brick_name = entry.key.split("/")[-1]
+                    fetched_brick = NS.gluster.objects.Brick(
+                        brick_name.split(":")[0],
+                        brick_name.split(":_")[-1]
+                    ).load()
+                    if fetched_brick and fetched_brick.client_count:
+                        vol_connections += 0 \
+                            if fetched_brick.client_count == '' \
+                            else int(fetched_brick.client_count)
+                subvol_count += 1
+        except etcd.EtcdKeyNotFound:
+            break
+    return vol_connections
+
+
+def sync_volume_connections(volumes, brick_index=None):
+    for volume in volumes:
+        vol_connections = None
+        if brick_index is not None:
+            vol_connections = brick_index.client_count(volume.vol_id)
+        if vol_connections is None:
+            vol_connections = _etcd_client_count(volume)
         volume.client_count = vol_connections
-        volume.save()
+        batch_writer.save(volume)
+
+
+def sync_client_totals(brick_index, sync_ttl=None):
+    # per client io across all the bricks, saved with a ttl so the
+    # clients which disconnected go away
+    for hostname, total in brick_index.client_totals().iteritems():
+        batch_writer.save(
+            NS.gluster.objects.ClientTotals(
+                hostname=hostname,
+                bytesread=total['bytesread'],
+                byteswrite=total['byteswrite'],
+                connection_count=total['connections']
+            ),
+            sync_ttl
+        )
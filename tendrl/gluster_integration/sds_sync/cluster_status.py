@@ -1,18 +1,20 @@
 import etcd
 
 from tendrl.commons.utils import cmd_utils
-from tendrl.commons.utils import event_utils
+from tendrl.gluster_integration import metrics
+from tendrl.gluster_integration.sds_sync import alert_batch
+from tendrl.gluster_integration.sds_sync import batch_writer
 
 
 RESOURCE_TYPE_VOLUME = "volume"
 
 
-def sync_cluster_status(volumes, sync_ttl):
+def sync_cluster_status(volumes, sync_ttl, brick_index=None):
     # Calculate status based on volumes status
     degraded_count = 0
     is_healthy = True
     if len(volumes) > 0:
-        volume_states = _derive_volume_states(volumes)
+        volume_states = _derive_volume_states(volumes, brick_index)
         for vol_id, state in volume_states.iteritems():
             if 'down' in state or 'partial' in state:
                 is_healthy = False
@@ -23,6 +25,7 @@ def sync_cluster_status(volumes, sync_ttl):
     cmd = cmd_utils.Command(
         'gluster pool list', True
     )
+    metrics.spawned("pool_list")
     out, err, rc = cmd.run()
     peer_count = 0
     if not err:
@@ -47,7 +50,7 @@ def sync_cluster_status(volumes, sync_ttl):
                    old_status,
                    curr_status)
         instance = "cluster_%s" % NS.tendrl_context.integration_id
-        event_utils.emit_event(
+        alert_batch.emit(
             "cluster_health_status",
             curr_status,
             msg,
@@ -57,54 +60,73 @@ def sync_cluster_status(volumes, sync_ttl):
         )
 
     # Persist the cluster status
-    NS.gluster.objects.GlobalDetails(
+    global_details = NS.gluster.objects.GlobalDetails(
         status='healthy' if is_healthy else 'unhealthy',
         peer_count=peer_count,
         vol_count=len(volumes),
         volume_up_degraded=degraded_count
-    ).save(ttl=sync_ttl)
+    )
+    batch_writer.save(global_details, sync_ttl)
+
 
+def _etcd_subvolume_statuses(volume):
+    # walk clusters/<id>/Volumes/<vol>/Bricks/subvolumeN and load every
+    # brick, only used for volumes the BrickIndex does not know
+    subvol_count = 0
+    subvolumes = []
+    while True:
+        try:
+            subvol = NS._int.client.read(
+                "clusters/%s/Volumes/%s/Bricks/subvolume%s" % (
+                    NS.tendrl_context.integration_id,
+                    volume.vol_id,
+                    subvol_count
+                )
+            )
+            statuses = []
+            for entry in subvol.leaves:
+                brick_name = entry.key.split("/")[-1]
+                fetched_brick = NS.gluster.objects.Brick(
+                    brick_name.split(":")[0],
+                    brick_name.split(":_")[-1]
+                ).load()
+                statuses.append(fetched_brick.status or "")
+            subvolumes.append(statuses)
+            subvol_count += 1
+        except etcd.EtcdKeyNotFound:
+            break
+    return subvolumes
 
-def _derive_volume_states(volumes):
+
+def _derive_volume_states(volumes, brick_index=None):
     out_dict = {}
     for volume in volumes:
         if volume.status == "Stopped":
             out_dict[volume.vol_id] = "down"
         else:
-            subvol_count = 0
+            subvolumes = None
+            if brick_index is not None:
+                subvolumes = brick_index.subvolume_statuses(volume.vol_id)
+            if subvolumes is None:
+                subvolumes = _etcd_subvolume_statuses(volume)
+            subvol_count = len(subvolumes)
             bricks = []
             subvol_states = []
-            while True:
-                try:
-                    subvol = NS._int.client.read(
-                        "clusters/%s/Volumes/%s/Bricks/subvolume%s" % (
-                            NS.tendrl_context.integration_id,
-                            volume.vol_id,
-                            subvol_count
-                        )
-                    )
-                    state = 0
-                    for entry in subvol.leaves:
-                        brick_name = entry.key.split("/")[-1]
-                        fetched_brick = NS.gluster.objects.Brick(
-                            brick_name.split(":")[0],
-                            brick_name.split(":_")[-1]
-                        ).load()
-                        if not fetched_brick.status:
-                            fetched_brick.status = "Stopped"
-                        bricks.append(fetched_brick)
-                        if fetched_brick.status != "Started":
-                            state += 1
-                    subvol_states.append(state)
-                    subvol_count += 1
-                except etcd.EtcdKeyNotFound:
-                    break
+            for statuses in subvolumes:
+                state = 0
+                for status in statuses:
+                    if status is None:
+                        # brick details not synced yet
+                        continue
+                    if not status:
+                        status = "Stopped"
+                    bricks.append(status)
+                    if status != "Started":
+                        state += 1
+                subvol_states.append(state)
 
             total_bricks = len(bricks)
-            up_bricks = 0
-            for brick in bricks:
-                if brick.status == "Started":
-                    up_bricks += 1
+            up_bricks = bricks.count("Started")
             if total_bricks == 0 or total_bricks < int(volume.brick_count):
                 # No brick details updated for the volume yet
                 out_dict[volume.vol_id] = 'unknown'
@@ -146,7 +168,7 @@ def _derive_volume_states(volumes):
                       out_dict[volume.vol_id]
                   )
             instance = "volume_%s" % volume.name
-            event_utils.emit_event(
+            alert_batch.emit(
                 "volume_state",
                 out_dict[volume.vol_id],
                 msg,
@@ -158,6 +180,6 @@ def _derive_volume_states(volumes):
             )
         # Save the volume status
         volume.state = out_dict[volume.vol_id]
-        volume.save()
+        batch_writer.save(volume)
 
     return out_dict
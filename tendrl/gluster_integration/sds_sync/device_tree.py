@@ -0,0 +1,104 @@
+import hashlib
+import os
+import threading
+
+import blivet
+
+from tendrl.commons.utils import log_utils as logger
+
+
+PARTITIONS_FILE = "/proc/partitions"
+# lvm rewrites the metadata backup of a volume group on every change
+LVM_METADATA_DIRS = ("/etc/lvm/backup",)
+
+
+def fingerprint():
+    """Digest of the block device layout of this node
+
+    Changes whenever a disk or partition appears, disappears or gets
+    resized (/proc/partitions) and whenever the lvm metadata of a
+    volume group is updated (lv/vg/pv create, extend, remove ...).
+    """
+    digest = hashlib.sha1()
+    with open(PARTITIONS_FILE) as partitions:
+        digest.update(partitions.read())
+    for metadata_dir in LVM_METADATA_DIRS:
+        try:
+            names = sorted(os.listdir(metadata_dir))
+        except OSError:
+            continue
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(metadata_dir, name))
+            except OSError:
+                continue
+            digest.update("%s:%s:%s\n" % (name, stat.st_mtime, stat.st_size))
+    return digest.hexdigest()
+
+
+class DeviceTreeCache(object):
+    """Blivet device tree rebuilt only when the device layout changes
+
+    blivet.Blivet().reset() rescans every block device of the node,
+    get() returns the last scanned device tree as long as the
+    fingerprint() of the node did not change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devicetree = None
+        self._fingerprint = None
+
+    def get(self):
+        with self._lock:
+            current = fingerprint()
+            if self._devicetree is None or current != self._fingerprint:
+                b = blivet.Blivet()
+                b.reset()
+                self._devicetree = b.devicetree
+                self._fingerprint = current
+            return self._devicetree
+
+    def current(self):
+        """Last scanned device tree, scanning only if there is none"""
+        devicetree = self._devicetree
+        if devicetree is None:
+            return self.get()
+        return devicetree
+
+
+class DeviceTreeRefresher(threading.Thread):
+    """Keeps a DeviceTreeCache up to date in the background
+
+    Checks the device layout every `interval` seconds, so the sync
+    thread can use DeviceTreeCache.current() without ever waiting for
+    a blivet rescan.
+    """
+
+    def __init__(self, device_tree_cache, interval):
+        super(DeviceTreeRefresher, self).__init__()
+        self.daemon = True
+        self._cache = device_tree_cache
+        self._interval = interval
+        self._complete = threading.Event()
+
+    def run(self):
+        while not self._complete.is_set():
+            try:
+                self._cache.get()
+            except Exception as ex:
+                logger.log(
+                    "error",
+                    NS.publisher_id,
+                    {
+                        "message": "Failed to refresh the block device "
+                        "tree: %s" % ex
+                    }
+                )
+            self._complete.wait(self._interval)
+
+    def stop(self):
+        self._complete.set()
+
+
+cache = DeviceTreeCache()
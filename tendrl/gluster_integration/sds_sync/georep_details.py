@@ -1,56 +1,31 @@
 import etcd
 
-from tendrl.commons.utils import event_utils
-from tendrl.gluster_integration.objects.geo_replication_pair\
-    import GeoReplicationPair
 from tendrl.gluster_integration.objects.geo_replication_session\
     import GeoReplicationSession
 from tendrl.gluster_integration.objects.geo_replication_session\
     import GeoReplicationSessionStatus
+from tendrl.gluster_integration.sds_sync import alert_batch
 
 
 RESOURCE_TYPE_VOLUME = "volume"
 
 
-def save_georep_details(volumes, index):
-    pair_index = 1
-    while True:
+def save_georep_details(volume):
+    for pair_state in volume.pairs:
         try:
             session_id = "{0}_{1}_{2}".format(
-                volumes[
-                    'volume%s.pair%s.master_volume' % (
-                        index, pair_index
-                    )
-                ],
-                volumes[
-                    'volume%s.pair%s.slave' % (
-                        index, pair_index)
-                ].split("::")[-1],
-                volumes[
-                    'volume%s.pair%s.session_slave' % (
-                        index, pair_index)
-                ].split(":")[-1]
+                pair_state['master_volume'],
+                pair_state['slave'].split("::")[-1],
+                pair_state['session_slave'].split(":")[-1]
             )
             pair_name = "{0}-{1}".format(
-                volumes[
-                    'volume%s.pair%s.master_node' % (
-                        index, pair_index)
-                ],
-                volumes[
-                    'volume%s.pair%s.master_brick' % (
-                        index, pair_index)
-                ].replace("/", "_")
+                pair_state['master_node'],
+                pair_state['master_brick'].replace("/", "_")
             )
 
             readable_pair_name = "{0}:{1}".format(
-                volumes[
-                    'volume%s.pair%s.master_node' % (
-                        index, pair_index)
-                ],
-                volumes[
-                    'volume%s.pair%s.master_brick' % (
-                        index, pair_index)
-                ]
+                pair_state['master_node'],
+                pair_state['master_brick']
             )
 
             try:
@@ -58,32 +33,30 @@ def save_georep_details(volumes, index):
                     "clusters/%s/Volumes/%s/GeoRepSessions/"
                     "%s/pairs/%s/status" % (
                         NS.tendrl_context.integration_id,
-                        volumes['volume%s.id' % index],
+                        volume['id'],
                         session_id,
                         pair_name
                     )
                 ).value
-                pair_status = volumes[
-                    'volume%s.pair%s.status' % (index, pair_index)
-                ]
+                pair_status = pair_state['status']
                 if fetched_pair_status != pair_status and \
                     pair_status.lower() == 'faulty':
                     msg = ("georep status of pair: %s "
                            "of volume %s is faulty") % (
                                readable_pair_name,
-                               volumes['volume%s.name' % index])
+                               volume['name'])
                     instance = "volume_%s|georep_%s" % (
-                        volumes['volume%s.name' % index],
+                        volume['name'],
                         pair_name
                     )
-                    event_utils.emit_event(
+                    alert_batch.emit(
                         "georep_status",
                         pair_status,
                         msg,
                         instance,
                         'WARNING',
                         tags={"entity_type": RESOURCE_TYPE_VOLUME,
-                              "volume_name": volumes['volume%s.name' % index]
+                              "volume_name": volume['name']
                               }
                     )
                 if fetched_pair_status.lower() == 'faulty' and \
@@ -91,161 +64,116 @@ def save_georep_details(volumes, index):
                     msg = ("georep status of pair: %s "
                            "of volume %s is %s now") % (
                                readable_pair_name,
-                               volumes['volume%s.name' % index],
+                               volume['name'],
                                pair_status)
                     instance = "volume_%s|georep_%s" % (
-                        volumes['volume%s.name' % index],
+                        volume['name'],
                         pair_name
                     )
-                    event_utils.emit_event(
+                    alert_batch.emit(
                         "georep_status",
                         pair_status,
                         msg,
                         instance,
                         'INFO',
                         tags={"entity_type": RESOURCE_TYPE_VOLUME,
-                              "volume_name": volumes['volume%s.name' % index]
+                              "volume_name": volume['name']
                               }
                     )
             except etcd.EtcdKeyNotFound:
                 pass
 
             pair = NS.gluster.objects.GeoReplicationPair(
-                vol_id=volumes['volume%s.id' % index],
+                vol_id=volume['id'],
                 session_id=session_id,
                 pair=pair_name,
-                master_volume=volumes[
-                    'volume%s.pair%s.master_volume' % (
-                        index, pair_index)],
-                master_brick=volumes[
-                    'volume%s.pair%s.master_brick' % (
-                        index, pair_index)],
-                master_node=volumes[
-                    'volume%s.pair%s.master_node' % (
-                        index, pair_index)],
-                slave_user=volumes[
-                    'volume%s.pair%s.slave_user' % (
-                        index, pair_index)],
-                slave=volumes[
-                    'volume%s.pair%s.slave' % (
-                        index, pair_index)],
-                slave_node=volumes[
-                    'volume%s.pair%s.slave_node' % (
-                        index, pair_index)],
-                status=volumes[
-                    'volume%s.pair%s.status' % (
-                        index, pair_index)],
-                crawl_status=volumes[
-                    'volume%s.pair%s.crawl_status' % (
-                        index, pair_index)],
-                last_synced=volumes[
-                    'volume%s.pair%s.last_synced' % (
-                        index, pair_index)],
-                entry=volumes[
-                    'volume%s.pair%s.entry' % (
-                        index, pair_index)],
-                data=volumes[
-                    'volume%s.pair%s.data' % (
-                        index, pair_index)],
-                meta=volumes[
-                    'volume%s.pair%s.meta' % (
-                        index, pair_index)],
-                failures=volumes[
-                    'volume%s.pair%s.failures' % (
-                        index, pair_index)],
-                checkpoint_time=volumes[
-                    'volume%s.pair%s.checkpoint_time' % (
-                        index, pair_index)],
-                checkpoint_completed=volumes[
-                    'volume%s.pair%s.checkpoint_completed' % (
-                        index, pair_index)],
-                checkpoint_completed_time=volumes[
-                    'volume%s.pair%s.checkpoint_completion_time' % (
-                        index, pair_index)]
+                master_volume=pair_state['master_volume'],
+                master_brick=pair_state['master_brick'],
+                master_node=pair_state['master_node'],
+                slave_user=pair_state['slave_user'],
+                slave=pair_state['slave'],
+                slave_node=pair_state['slave_node'],
+                status=pair_state['status'],
+                crawl_status=pair_state['crawl_status'],
+                last_synced=pair_state['last_synced'],
+                entry=pair_state['entry'],
+                data=pair_state['data'],
+                meta=pair_state['meta'],
+                failures=pair_state['failures'],
+                checkpoint_time=pair_state['checkpoint_time'],
+                checkpoint_completed=pair_state['checkpoint_completed'],
+                checkpoint_completed_time=pair_state[
+                    'checkpoint_completion_time'
+                ]
             )
         except KeyError:
             break
         pair.save()
-        pair_index += 1
     return
 
 
-def aggregate_session_status():
-    volumes = None
-    try:
-        volumes = NS._int.client.read(
-            "clusters/%s/Volumes" % NS.tendrl_context.integration_id
-        )
-    except etcd.EtcdKeyNotFound:
-        # ignore as no volumes available till now
-        return
+def _session_status(statuses, pair_count):
     georep_status = GeoReplicationSessionStatus()
-    if volumes:
-        for entry in volumes.leaves:
-            vol_id = entry.key.split("Volumes/")[-1]
-            try:
-                sessions = NS._int.client.read(
-                    "clusters/%s/Volumes/%s/GeoRepSessions" % (
-                        NS.tendrl_context.integration_id,
-                        vol_id,
-                    )
-                )
-            except etcd.EtcdKeyNotFound:
-                continue
-            volume = NS.gluster.objects.Volume(vol_id=vol_id).load()
-            if volume is None:
-                continue
-            pair_count = int(volume.brick_count)
-            for session in sessions.leaves:
-                session_status = None
-                session_id = session.key.split("GeoRepSessions/")[-1]
-                try:
-                    pairs = NS._int.client.read(
-                        "clusters/%s/Volumes/%s/GeoRepSessions"
-                        "/%s/pairs" % (
-                            NS.tendrl_context.integration_id,
-                            vol_id,
-                            session_id
-                        )
-                    )
-                except etcd.EtcdKeyNotFound:
-                    continue
-                faulty_count = 0
-                stopped_count = 0
-                paused_count = 0
-                created_count = 0
-                for element in pairs.leaves:
-                    pair = GeoReplicationPair(
-                        vol_id=vol_id,
-                        session_id=session_id,
-                        pair=element.key.split("pairs/")[-1]
-                    ).load()
-                    if pair.status.lower() == "faulty":
-                        faulty_count += 1
-                    elif pair.status.lower() == "created":
-                        created_count += 1
-                    elif pair.status.lower() == "stopped":
-                        stopped_count += 1
-                    elif pair.status.lower() == "paused":
-                        paused_count += 1
-                if created_count == pair_count:
-                    session_status = georep_status.CREATED
-                elif faulty_count == 0 and (
-                        stopped_count == 0 and paused_count == 0 and
-                        created_count == 0
-                ):
-                    session_status = georep_status.UP
-                elif pair_count == faulty_count:
-                    session_status = georep_status.DOWN
-                elif stopped_count == pair_count:
-                    session_status = georep_status.STOPPED
-                elif paused_count == pair_count:
-                    session_status = georep_status.PAUSED
-                else:
-                    session_status = georep_status.PARTIAL
-                geo_replication_session = GeoReplicationSession(
-                    vol_id=vol_id,
-                    session_id=session_id,
-                    session_status=session_status
+    faulty_count = statuses.count("faulty")
+    created_count = statuses.count("created")
+    stopped_count = statuses.count("stopped")
+    paused_count = statuses.count("paused")
+    if created_count == pair_count:
+        return georep_status.CREATED
+    elif faulty_count == stopped_count == paused_count == created_count == 0:
+        return georep_status.UP
+    elif pair_count == faulty_count:
+        return georep_status.DOWN
+    elif stopped_count == pair_count:
+        return georep_status.STOPPED
+    elif paused_count == pair_count:
+        return georep_status.PAUSED
+    else:
+        return georep_status.PARTIAL
+
+
+def aggregate_session_status(volumes):
+    """Save the status of the geo-rep sessions of the get-state volumes
+
+    Only the volumes get-state reports pairs for are read: one recursive
+    read of their GeoRepSessions and one of their brick_count. Clusters
+    and volumes without geo-replication cost no etcd read.
+    """
+    for volume in volumes:
+        if not volume.pairs:
+            continue
+        prefix = "clusters/%s/Volumes/%s" % (
+            NS.tendrl_context.integration_id,
+            volume.id
+        )
+        try:
+            sessions = NS._int.client.read(
+                prefix + "/GeoRepSessions", recursive=True
+            )
+            pair_count = int(
+                NS._int.client.read(prefix + "/brick_count").value
+            )
+        except etcd.EtcdKeyNotFound:
+            # pairs or volume not synced yet
+            continue
+        except (TypeError, ValueError):
+            continue
+        # {session_id: {pair: status}}
+        statuses = {}
+        for leaf in sessions.leaves:
+            parts = leaf.key.split(
+                prefix + "/GeoRepSessions", 1
+            )[-1].strip("/").split("/")
+            if len(parts) == 4 and parts[1] == "pairs" and \
+                parts[3] == "status":
+                statuses.setdefault(parts[0], {})[parts[2]] = (
+                    leaf.value or ""
+                ).lower()
+        for session_id, pairs in statuses.iteritems():
+            GeoReplicationSession(
+                vol_id=volume.id,
+                session_id=session_id,
+                session_status=_session_status(
+                    pairs.values(), pair_count
                 )
-                geo_replication_session.save()
+            ).save()
@@ -0,0 +1,89 @@
+import threading
+
+from tendrl.commons.utils import log_utils as logger
+
+
+def _gfapi():
+    # gfapi loads libgfapi when imported, only do it when the in
+    # process utilization is actually used
+    from tendrl.gluster_integration import gfapi
+    return gfapi
+
+
+class VolumeHandles(object):
+    """Initialized glfs handles of the volumes, kept across sync cycles
+
+    Fetching the volfile and building the client graph (glfs_init) is
+    what makes tendrl-gluster-vol-utilization slow, here it is done
+    once per volume and the handle is reused for every statvfs. A
+    handle failing a statvfs is dropped and initialized again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handles = {}
+        # per volume locks, a volume hanging in glfs_init must not
+        # block the other volumes
+        self._volume_locks = {}
+
+    def _handle(self, volume_name):
+        with self._lock:
+            volume_lock = self._volume_locks.setdefault(
+                volume_name, threading.Lock()
+            )
+        with volume_lock:
+            fs = self._handles.get(volume_name)
+            if fs is None:
+                gfapi = _gfapi()
+                fs = gfapi.glfsInit(
+                    volume_name,
+                    gfapi.GLUSTER_VOL_HOST,
+                    gfapi.GLUSTER_VOL_PORT,
+                    gfapi.GLUSTER_VOL_PROTOCAL
+                )
+                with self._lock:
+                    self._handles[volume_name] = fs
+            return fs
+
+    def close(self, volume_name):
+        with self._lock:
+            fs = self._handles.pop(volume_name, None)
+        if fs is None:
+            return
+        gfapi = _gfapi()
+        try:
+            gfapi.glfsFini(fs, volume_name)
+        except gfapi.GlusterLibgfapiException as ex:
+            logger.log(
+                "debug",
+                NS.publisher_id,
+                {
+                    "message": "Failed to release gfapi handle of "
+                    "volume: %s. Error: %s" % (volume_name, ex)
+                }
+            )
+
+    def prune(self, volume_names):
+        """Release the handles of volumes not in volume_names"""
+        with self._lock:
+            stale = set(self._handles) - set(volume_names)
+        for volume_name in stale:
+            self.close(volume_name)
+
+    def statvfs(self, volume_name):
+        gfapi = _gfapi()
+        try:
+            return gfapi.glfsStatvfs(self._handle(volume_name))
+        except gfapi.GlfsStatvfsException:
+            # the handle went bad (volume restarted, glusterd
+            # reconnect ...), retry once with a new one
+            self.close(volume_name)
+            return gfapi.glfsStatvfs(self._handle(volume_name))
+
+    def utilization(self, volume_name):
+        """Same details tendrl-gluster-vol-utilization prints"""
+        from tendrl.gluster_integration.sds_sync import vol_utilization
+        return vol_utilization.volumeUtilization(self.statvfs(volume_name))
+
+
+handles = VolumeHandles()
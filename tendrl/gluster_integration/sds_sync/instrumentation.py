@@ -0,0 +1,158 @@
+import collections
+import json
+import os
+import tempfile
+import threading
+import time
+
+from tendrl.gluster_integration import metrics
+
+
+# upper bounds (seconds) of the buckets of the phase duration histogram
+BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, float("inf"))
+DEFAULT_WINDOW = 100
+
+_ETCD = "gluster_integration_etcd_operations_total"
+_SPAWNS = "gluster_integration_subprocess_spawns_total"
+FIELDS = ("seconds", "etcd_reads", "etcd_writes", "spawns")
+
+
+def _counting(operation, method):
+    def _call(*args, **kwargs):
+        metrics.etcd_operation(operation)
+        try:
+            return method(*args, **kwargs)
+        except Exception as ex:
+            # EtcdKeyNotFound included, the error label tells them apart
+            metrics.etcd_error(operation, ex)
+            raise
+    return _call
+
+
+def count_etcd(client):
+    """Count the requests made through an etcd client, and the failed ones
+
+    python-etcd sends refresh(), set(), update() ... through write() and
+    get() through read(), counting these (and delete) covers them all.
+    """
+    if client is None or getattr(client, "_counted", False):
+        return
+    for operation in ("read", "write", "delete"):
+        setattr(
+            client, operation, _counting(operation, getattr(client, operation))
+        )
+    client._counted = True
+
+
+def _counters():
+    registry = metrics.registry
+    writes = registry.get(_ETCD, op="write") or 0
+    deletes = registry.get(_ETCD, op="delete") or 0
+    return (
+        time.time(),
+        registry.get(_ETCD, op="read") or 0,
+        writes + deletes,
+        registry.total(_SPAWNS),
+    )
+
+
+def _percentile(values, percent):
+    index = int(round(percent / 100.0 * (len(values) - 1)))
+    return values[index]
+
+
+class SyncStats(object):
+    """Duration, etcd requests and commands run of every phase of the
+    last `window` sync cycles
+
+    run() calls mark(phase) when a phase ends, whatever ran since the
+    previous mark is accounted to it. etcd requests and commands are
+    counted daemon wide, the ones of callbacks running at the same time
+    end up in the phase too.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self._lock = threading.Lock()
+        self._cycles = collections.deque(maxlen=window)
+        self._current = None
+        self._mark = None
+
+    def start_cycle(self):
+        self._current = collections.OrderedDict()
+        self._mark = _counters()
+
+    def mark(self, phase):
+        if self._current is None:
+            return
+        now = _counters()
+        stats = self._current.setdefault(
+            phase, dict((field, 0) for field in FIELDS)
+        )
+        for field, before, after in zip(FIELDS, self._mark, now):
+            stats[field] += after - before
+        self._mark = now
+        metrics.registry.set(
+            "gluster_integration_sync_phase_seconds", stats["seconds"],
+            phase=phase
+        )
+
+    def end_cycle(self):
+        """Keep the phases of the current cycle, returns them"""
+        cycle, self._current = self._current, None
+        if cycle:
+            with self._lock:
+                self._cycles.append(cycle)
+        return cycle
+
+    def summary(self):
+        """{'cycles': n, 'phases': {phase: {...}}} of the kept cycles
+
+        Every phase has the mean, p50, p95 and max of its duration, a
+        histogram of the durations ({bucket upper bound: cycles}) and the
+        mean etcd reads, writes and commands run per cycle.
+        """
+        with self._lock:
+            cycles = list(self._cycles)
+        phases = collections.OrderedDict()
+        for cycle in cycles:
+            for phase, stats in cycle.iteritems():
+                phases.setdefault(phase, []).append(stats)
+        summary = {"cycles": len(cycles), "phases": {}}
+        for phase, samples in phases.iteritems():
+            seconds = sorted(stats["seconds"] for stats in samples)
+            histogram = collections.OrderedDict(
+                (str(bucket), 0) for bucket in BUCKETS
+            )
+            for value in seconds:
+                for bucket in BUCKETS:
+                    if value <= bucket:
+                        histogram[str(bucket)] += 1
+                        break
+            phase_summary = {
+                "cycles": len(samples),
+                "mean": sum(seconds) / len(seconds),
+                "p50": _percentile(seconds, 50),
+                "p95": _percentile(seconds, 95),
+                "max": seconds[-1],
+                "histogram": histogram,
+            }
+            for field in FIELDS[1:]:
+                phase_summary[field] = sum(
+                    stats[field] for stats in samples
+                ) / float(len(samples))
+            summary["phases"][phase] = phase_summary
+        return summary
+
+    def write(self, path):
+        """Save summary() as json to path, replaced atomically"""
+        directory = os.path.dirname(path) or "."
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".sync_stats")
+        try:
+            with os.fdopen(fd, "w") as stats_file:
+                json.dump(self.summary(), stats_file, indent=2)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
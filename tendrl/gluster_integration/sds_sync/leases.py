@@ -0,0 +1,156 @@
+import threading
+import time
+
+import etcd
+
+from tendrl.commons.utils import etcd_utils
+from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration import worker_pool
+from tendrl.gluster_integration.sds_sync import batch_writer
+
+
+class LeaseManager(object):
+    """TTLs of the synced objects, renewed per sync generation
+
+    Every sync cycle is a generation. The objects saved in a cycle, or
+    whose TTL got renewed in it, belong to its generation. An object
+    still in get-state but unchanged is only marked alive, its TTL is
+    renewed together with all the keys of its generation once that
+    generation gets within `margin` seconds of expiring, instead of
+    once per cycle. Keys not synced in a cycle are forgotten and left
+    to expire, so objects deleted from gluster still go away. A renew
+    finding the key gone (deleted out of band) saves the objects again,
+    all of them when several (Volume and VolumeOptions) share the key.
+    """
+
+    def __init__(self, margin=0):
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._open = False
+        self._partial = False
+        # {key: [generation, expires, {object class: (object, ttl)}]}
+        self._keys = {}
+        # {generation: set of keys}
+        self._generations = {}
+        self._alive = set()
+        self.renewed = 0
+        self.rewritten = 0
+
+    def begin(self, margin=None, partial=False):
+        """Open the generation of a new sync cycle
+
+        A partial sync (of the targets of native events) only syncs some
+        of the objects, the keys it does not sync are not forgotten.
+        """
+        with self._lock:
+            if margin is not None:
+                self.margin = margin
+            self._generation += 1
+            self._open = True
+            self._partial = partial
+            self._alive = set()
+            self.renewed = 0
+            self.rewritten = 0
+
+    def _track(self, key, objects, ttl, now):
+        lease = self._keys.get(key)
+        if lease is not None:
+            self._generations[lease[0]].discard(key)
+            if not self._generations[lease[0]]:
+                del self._generations[lease[0]]
+            lease[2].update(objects)
+            objects = lease[2]
+        self._keys[key] = [self._generation, now + ttl, objects]
+        self._generations.setdefault(self._generation, set()).add(key)
+
+    def _forget(self, key):
+        generation = self._keys.pop(key)[0]
+        self._generations[generation].discard(key)
+        if not self._generations[generation]:
+            del self._generations[generation]
+
+    def track(self, key, obj, ttl, now=None):
+        """key was written (or its TTL set) with ttl in this cycle"""
+        if not ttl:
+            return
+        with self._lock:
+            if not self._open:
+                return
+            self._track(
+                key, {type(obj): (obj, ttl)}, ttl, now or time.time()
+            )
+            self._alive.add(key)
+
+    def keep(self, key, obj, ttl):
+        """Mark an unchanged key alive, False when its TTL is not
+        tracked and must be set by the caller
+        """
+        with self._lock:
+            lease = self._keys.get(key)
+            if not self._open or lease is None:
+                return False
+            # renewals use the details of the latest sync
+            lease[2][type(obj)] = (obj, ttl)
+            self._alive.add(key)
+            return True
+
+    def renew(self, workers=1, now=None):
+        """Close the generation, renew the generations about to expire
+
+        Returns the number of keys renewed.
+        """
+        now = now or time.time()
+        with self._lock:
+            if not self._open:
+                return 0
+            self._open = False
+            if not self._partial:
+                for key in self._keys.keys():
+                    if key not in self._alive:
+                        self._forget(key)
+            leases = []
+            for generation, keys in self._generations.items():
+                if min(
+                    self._keys[key][1] for key in keys
+                ) - now < self.margin:
+                    leases.extend(
+                        (key, dict(self._keys[key][2]), max(
+                            ttl for _, ttl in self._keys[key][2].values()
+                        ))
+                        for key in keys
+                    )
+        results = worker_pool.bounded_map(
+            lambda lease: etcd_utils.refresh(lease[0], lease[2]),
+            leases,
+            workers
+        )
+        error = None
+        with self._lock:
+            for (key, objects, ttl), result in zip(leases, results):
+                if isinstance(result.error, etcd.EtcdKeyNotFound):
+                    for obj, obj_ttl in objects.values():
+                        batch_writer.save(obj, obj_ttl)
+                    self.rewritten += 1
+                elif result.error is not None:
+                    error = error or result
+                    continue
+                self._track(key, objects, ttl, now)
+                self.renewed += 1
+        if leases:
+            logger.log(
+                "debug",
+                NS.publisher_id,
+                {
+                    "message": "Renewed the TTL of %s of %s synced "
+                    "key(s), %s saved again" % (
+                        self.renewed, len(self._keys), self.rewritten
+                    )
+                }
+            )
+        if error is not None:
+            error.get()
+        return self.renewed
+
+
+manager = LeaseManager()
@@ -0,0 +1,39 @@
+import etcd
+
+from tendrl.commons.utils import etcd_utils
+from tendrl.gluster_integration.sds_sync import batch_writer
+from tendrl.gluster_integration.sds_sync import leases
+
+
+# Objects keeping their TTL on the "status" key instead of the object
+# directory (see Brick.save and GlobalDetails.save)
+STATUS_TTL_OBJECTS = ("Brick", "GlobalDetails")
+
+
+def ttl_key(obj):
+    obj.render()
+    if obj.__class__.__name__ in STATUS_TTL_OBJECTS:
+        return obj.value + "/status"
+    return obj.value
+
+
+def sync_object(obj, ttl=None, changed=True):
+    # Objects which did not change since the previous get-state only
+    # get their TTL refreshed, if the key is gone (deleted out of band
+    # or expired) the object is written again. The refresh of objects
+    # with a lease is left to leases.manager.
+    if not changed:
+        if not ttl:
+            return
+        key = ttl_key(obj)
+        if leases.manager.keep(key, obj, ttl):
+            return
+        try:
+            etcd_utils.refresh(key, ttl)
+            leases.manager.track(key, obj, ttl)
+            return
+        except etcd.EtcdKeyNotFound:
+            pass
+    batch_writer.save(obj, ttl)
+    if ttl:
+        leases.manager.track(ttl_key(obj), obj, ttl)
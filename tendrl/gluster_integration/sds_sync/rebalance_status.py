@@ -1,4 +1,5 @@
-from tendrl.commons.utils import event_utils
+from tendrl.gluster_integration.sds_sync import alert_batch
+from tendrl.gluster_integration.sds_sync import batch_writer
 
 
 def sync_volume_rebalance_estimated_time(volumes):
@@ -12,7 +13,7 @@ def sync_volume_rebalance_estimated_time(volumes):
                 int(entry.time_left) > rebal_estimated_time:
                 rebal_estimated_time = int(entry.time_left)
         volume.rebal_estimated_time = rebal_estimated_time
-        volume.save()
+        batch_writer.save(volume)
 
 
 def sync_volume_rebalance_status(volumes):
@@ -71,7 +72,7 @@ def sync_volume_rebalance_status(volumes):
                            volume.rebal_status,
                            new_rebal_status)
                 instance = "volume_%s" % volume.name
-                event_utils.emit_event(
+                alert_batch.emit(
                     "rebalance_status",
                     new_rebal_status,
                     msg,
@@ -80,4 +81,4 @@ def sync_volume_rebalance_status(volumes):
                 )
 
             volume.rebal_status = new_rebal_status
-            volume.save()
+            batch_writer.save(volume)
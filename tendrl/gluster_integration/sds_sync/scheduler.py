@@ -0,0 +1,129 @@
+import time
+
+from tendrl.gluster_integration import metrics
+
+
+# share of the time spent syncing, a cycle taking longer than the sync
+# interval is followed by a proportionally longer sleep
+DEFAULT_DUTY_CYCLE = 0.5
+# seconds per etcd object write above which the sync backs off
+DEFAULT_ETCD_LATENCY = 0.2
+MAX_BACKOFF = 8
+# the cycle after a change comes this early (share of sync_interval)
+CHANGED_FACTOR = 0.25
+# the first cycles after startup sleep 1, 2 ... STARTUP_CYCLES seconds
+# at most, so the inventory fills up fast
+STARTUP_CYCLES = 6
+# objects get at least sync_interval + TTL_EXTRA seconds of TTL
+TTL_EXTRA = 100
+TTL_SLACK = 10
+
+metrics.registry.describe(
+    "gluster_integration_sync_sleep_seconds", metrics.GAUGE,
+    "Seconds the sync thread sleeps before its next cycle"
+)
+metrics.registry.describe(
+    "gluster_integration_sync_cycle_seconds", metrics.GAUGE,
+    "Duration of the last sync cycle"
+)
+metrics.registry.describe(
+    "gluster_integration_sync_backoff", metrics.GAUGE,
+    "Factor the sync sleep is stretched by because of etcd latency"
+)
+metrics.registry.describe(
+    "gluster_integration_sync_decisions_total", metrics.COUNTER,
+    "Sync sleeps chosen, by the rule which decided them"
+)
+
+
+class SyncScheduler(object):
+    """Picks the sleep between two sync cycles
+
+    The cycles normally start sync_interval apart. A cycle taking more
+    than its share (duty_cycle) of the time is followed by a longer
+    sleep, etcd writes slower than etcd_latency double the sleep (up to
+    MAX_BACKOFF times) until they are fast again, and a cycle finding
+    changes is followed by an early one. The first STARTUP_CYCLES
+    cycles sleep 1, 2 ... seconds at most, unless etcd is slow. The
+    sleep never lets the objects saved with the shortest TTL
+    (sync_interval + TTL_EXTRA) expire.
+    """
+
+    def __init__(
+        self,
+        interval,
+        duty_cycle=DEFAULT_DUTY_CYCLE,
+        etcd_latency=DEFAULT_ETCD_LATENCY,
+        min_sleep=1
+    ):
+        self.interval = interval
+        self.duty_cycle = duty_cycle
+        self.etcd_latency = etcd_latency
+        self.min_sleep = min_sleep
+        self.backoff = 1
+        self.duration = 0
+        self.cycles = 0
+        self._started = None
+        self._latency = None
+
+    @property
+    def ttl(self):
+        return self.interval + TTL_EXTRA
+
+    def start_cycle(self):
+        self._started = time.time()
+        self._latency = None
+
+    def observe_etcd(self, writes, seconds):
+        """writes objects saved to etcd in seconds"""
+        if writes:
+            latency = seconds / float(writes)
+            if self._latency is None or latency > self._latency:
+                self._latency = latency
+
+    def next_sleep(self, changed=False):
+        if self._started is not None:
+            self.duration = time.time() - self._started
+        duration = self.duration
+        self.cycles += 1
+        sleep = max(self.interval - duration, 0)
+        reason = "interval"
+        duty_sleep = duration * (1 - self.duty_cycle) / self.duty_cycle
+        if duty_sleep > sleep:
+            sleep = duty_sleep
+            reason = "duty_cycle"
+        if self._latency is not None and self._latency > self.etcd_latency:
+            self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+        else:
+            self.backoff = 1
+        if self.backoff > 1:
+            sleep = max(sleep, self.interval) * self.backoff
+            reason = "etcd_backoff"
+        elif changed:
+            early = max(self.interval * CHANGED_FACTOR, duty_sleep)
+            if early < sleep:
+                sleep = early
+                reason = "changed"
+        if self.backoff == 1 and self.cycles <= STARTUP_CYCLES and \
+            self.cycles < sleep:
+            sleep = self.cycles
+            reason = "startup"
+        # the next cycle, expected as long as this one, must save the
+        # objects again before their TTL runs out
+        ttl_sleep = self.ttl - TTL_SLACK - duration
+        if sleep > ttl_sleep:
+            sleep = ttl_sleep
+            reason = "ttl"
+        if sleep < self.min_sleep:
+            sleep = self.min_sleep
+        self._publish(sleep, reason)
+        return sleep
+
+    def _publish(self, sleep, reason):
+        registry = metrics.registry
+        registry.set("gluster_integration_sync_sleep_seconds", sleep)
+        registry.set("gluster_integration_sync_cycle_seconds", self.duration)
+        registry.set("gluster_integration_sync_backoff", self.backoff)
+        registry.inc(
+            "gluster_integration_sync_decisions_total", reason=reason
+        )
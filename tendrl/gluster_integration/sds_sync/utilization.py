@@ -1,13 +1,185 @@
 import json
 import os
+import Queue
 import subprocess
+import threading
+import time
 
 from tendrl.commons.utils import log_utils as logger
+from tendrl.gluster_integration import metrics
+from tendrl.gluster_integration.sds_sync import batch_writer
+from tendrl.gluster_integration.sds_sync import gfapi_utilization
 
 
-def sync_utilization_details(volumes):
+# seconds a single volume may take to report its utilization
+DEFAULT_TIMEOUT = 30
+DEFAULT_WORKERS = 4
+
+
+def _vol_utilization(volume_name, timeout=None):
+    metrics.spawned("vol_utilization")
+    cmd = subprocess.Popen(
+        # exec, so a kill on timeout reaches the script and not the shell
+        "exec tendrl-gluster-vol-utilization %s" % volume_name,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=open(os.devnull, "r"),
+        close_fds=True
+    )
+    timer = None
+    if timeout:
+        timer = threading.Timer(timeout, _kill, (cmd,))
+        timer.daemon = True
+        timer.start()
+    try:
+        out, err = cmd.communicate()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if cmd.returncode is not None and cmd.returncode < 0:
+        return None, "killed after %s seconds" % timeout
+    if err == '':
+        return json.loads(out), err
+    return None, err
+
+
+def _kill(cmd):
+    try:
+        cmd.kill()
+    except OSError:
+        # already exited
+        pass
+
+
+def _in_process_vol_utilization(volume_name, timeout=None):
+    try:
+        return gfapi_utilization.handles.utilization(volume_name), ''
+    except Exception as ex:
+        return None, str(ex) or ex.__class__.__name__
+
+
+class UtilizationCollector(object):
+    """Queries the utilization of many volumes concurrently
+
+    At most `workers` volumes are queried at a time and every query
+    has its own deadline, a volume missing it is reported as timed out
+    without holding back the others. Its query keeps running in the
+    background (a hung gfapi call cannot be interrupted) and the volume
+    is not queried again until that query finished.
+
+    The last good sample of every volume is kept, so callers can still
+    use recent enough data for volumes which timed out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {volume name: (collected_at, utilization)}
+        self._samples = {}
+        # {volume name: thread} of the queries which missed their
+        # deadline and are still running
+        self._hung = {}
+
+    def last_sample(self, volume_name, max_age=None):
+        with self._lock:
+            sample = self._samples.get(volume_name)
+        if sample is None:
+            return None
+        collected_at, utilization = sample
+        if max_age is not None and time.time() - collected_at > max_age:
+            return None
+        return utilization
+
+    def forget(self, volume_names):
+        """Drop the samples of volumes not in volume_names"""
+        with self._lock:
+            for volume_name in set(self._samples) - set(volume_names):
+                del self._samples[volume_name]
+
+    def collect(self, volume_names, query, timeout=DEFAULT_TIMEOUT,
+                workers=DEFAULT_WORKERS):
+        """Run query(volume_name, timeout) for every volume
+
+        query returns (utilization, err) like _vol_utilization, the
+        result is {volume name: (utilization, err)} for every volume,
+        with (None, "timed out") for the volumes missing the deadline.
+        """
+        results = {}
+        done = Queue.Queue()
+        waiting = []
+        with self._lock:
+            for volume_name in volume_names:
+                hung = self._hung.get(volume_name)
+                if hung is not None and hung.is_alive():
+                    results[volume_name] = (
+                        None, "previous query still running"
+                    )
+                    continue
+                self._hung.pop(volume_name, None)
+                waiting.append(volume_name)
+        waiting.reverse()
+
+        def _query(volume_name):
+            try:
+                result = query(volume_name, timeout)
+            except Exception as ex:
+                result = (None, str(ex) or ex.__class__.__name__)
+            if result[1] == '':
+                with self._lock:
+                    self._samples[volume_name] = (time.time(), result[0])
+            done.put((volume_name, result))
+
+        running = {}
+        while waiting or running:
+            while waiting and len(running) < max(int(workers), 1):
+                volume_name = waiting.pop()
+                thread = threading.Thread(
+                    target=_query, args=(volume_name,)
+                )
+                thread.daemon = True
+                thread.start()
+                running[volume_name] = (thread, time.time() + timeout)
+            wait = min(
+                deadline for _, deadline in running.values()
+            ) - time.time()
+            try:
+                volume_name, result = done.get(timeout=max(wait, 0.01))
+                if volume_name in running:
+                    del running[volume_name]
+                    results[volume_name] = result
+            except Queue.Empty:
+                pass
+            now = time.time()
+            for volume_name, (thread, deadline) in running.items():
+                if deadline <= now:
+                    del running[volume_name]
+                    results[volume_name] = (None, "timed out")
+                    with self._lock:
+                        self._hung[volume_name] = thread
+        return results
+
+
+_collector = UtilizationCollector()
+
+
+def sync_utilization_details(volumes, in_process=False,
+                             timeout=DEFAULT_TIMEOUT,
+                             workers=DEFAULT_WORKERS, max_age=None):
+    """Save the utilization of the started volumes and of the cluster
+
+    The utilization comes from the tendrl-gluster-vol-utilization
+    script, one run per volume, or with in_process from gfapi handles
+    kept open across sync cycles (see gfapi_utilization). Volumes are
+    queried `workers` at a time with a `timeout` for each of them.
+
+    A volume failing or missing its deadline keeps its last saved
+    utilization and its last good sample, if not older than max_age
+    seconds (any age when None), still counts in the cluster
+    Utilization.
+    """
     cluster_used_capacity = 0
     cluster_usable_capacity = 0
+    started = []
     for volume in volumes:
         if volume.status != "Started":
             logger.log(
@@ -19,24 +191,23 @@ def sync_utilization_details(volumes):
                 }
             )
             continue
-        cmd = subprocess.Popen(
-            "tendrl-gluster-vol-utilization %s" % volume.name,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=open(os.devnull, "r"),
-            close_fds=True
-        )
-        out, err = cmd.communicate()
+        started.append(volume)
+    results = _collector.collect(
+        [volume.name for volume in started],
+        _in_process_vol_utilization if in_process else _vol_utilization,
+        timeout,
+        workers
+    )
+    for volume in started:
+        util_det, err = results[volume.name]
         if err == '':
-            util_det = json.loads(out)
             volume.usable_capacity = int(util_det['total'])
             volume.used_capacity = int(util_det['used'])
             volume.pcnt_used = str(util_det['pcnt_used'])
             volume.total_inode_capacity = int(util_det['total_inode'])
             volume.used_inode_capacity = int(util_det['used_inode'])
             volume.pcnt_inode_used = str(util_det['pcnt_inode_used'])
-            volume.save()
+            batch_writer.save(volume)
             cluster_used_capacity += volume.used_capacity
             cluster_usable_capacity += volume.usable_capacity
         else:
@@ -48,14 +219,25 @@ def sync_utilization_details(volumes):
                     "volume: %s. Error: %s" % (volume.name, err)
                 }
             )
+            util_det = _collector.last_sample(volume.name, max_age)
+            if util_det is not None:
+                cluster_used_capacity += int(util_det['used'])
+                cluster_usable_capacity += int(util_det['total'])
+    started_names = [volume.name for volume in started]
+    _collector.forget(started_names)
+    if in_process:
+        # release the handles of stopped and deleted volumes
+        gfapi_utilization.handles.prune(started_names)
     cluster_pcnt_used = 0
     if cluster_usable_capacity > 0:
         cluster_pcnt_used = (
             cluster_used_capacity / float(cluster_usable_capacity)
         ) * 100
 
-    NS.gluster.objects.Utilization(
-        used_capacity=int(cluster_used_capacity),
-        usable_capacity=int(cluster_usable_capacity),
-        pcnt_used=str(cluster_pcnt_used)
-    ).save()
+    batch_writer.save(
+        NS.gluster.objects.Utilization(
+            used_capacity=int(cluster_used_capacity),
+            usable_capacity=int(cluster_usable_capacity),
+            pcnt_used=str(cluster_pcnt_used)
+        )
+    )
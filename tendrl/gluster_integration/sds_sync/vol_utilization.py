@@ -19,13 +19,7 @@ def computeVolumeStats(data):
             'sizeUsed': float(used)}
 
 
-def showVolumeUtilization(vname):
-    try:
-        data = gfapi.getVolumeStatvfs(vname)
-    except gfapi.GlusterLibgfapiException:
-        sys.stderr.write("CRITICAL: Failed to get the "
-                         "Volume Utilization Data\n")
-        sys.exit(-1)
+def volumeUtilization(data):
     volumeCapacity = computeVolumeStats(data)
     # total size in KB
     total_size = volumeCapacity['sizeTotal'] / BYTES_IN_KB
@@ -37,17 +31,25 @@ def showVolumeUtilization(vname):
     used_inode = data.f_files - data.f_ffree
     total_inode = data.f_files
     pcnt_inode_used = (float(used_inode) / total_inode) * 100
-    print (json.dumps(
-        {
-            'total': total_size,
-            'free': free_size,
-            'used': used_size,
-            'pcnt_used': vol_utilization,
-            'total_inode': total_inode,
-            'used_inode': used_inode,
-            'pcnt_inode_used': pcnt_inode_used
-        }
-    ))
+    return {
+        'total': total_size,
+        'free': free_size,
+        'used': used_size,
+        'pcnt_used': vol_utilization,
+        'total_inode': total_inode,
+        'used_inode': used_inode,
+        'pcnt_inode_used': pcnt_inode_used
+    }
+
+
+def showVolumeUtilization(vname):
+    try:
+        data = gfapi.getVolumeStatvfs(vname)
+    except gfapi.GlusterLibgfapiException:
+        sys.stderr.write("CRITICAL: Failed to get the "
+                         "Volume Utilization Data\n")
+        sys.exit(-1)
+    print (json.dumps(volumeUtilization(data)))
 
 
 def parse_input():
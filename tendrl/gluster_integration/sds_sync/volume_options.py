@@ -0,0 +1,44 @@
+from tendrl.commons.utils.time_utils import now as tendrl_now
+from tendrl.gluster_integration.sds_sync import batch_writer
+from tendrl.gluster_integration.sds_sync import object_sync
+
+
+# seconds an entry of the option change history is kept
+DEFAULT_HISTORY_TTL = 7 * 24 * 3600
+
+
+def sync_volume_options(volume_state, sync_ttl, delta, history_ttl=None):
+    """Save the options of a volume when they changed since the previous
+    get-state, and record what changed in its OptionsHistory
+
+    The saved options are the defaults of the volumeoptions get-state
+    with the overrides of the detail one applied, or only the overrides
+    when the defaults could not be collected.
+    """
+    options = volume_state.effective_options()
+    if options is None:
+        if not volume_state.options:
+            return
+        options = dict(volume_state.options)
+    object_sync.sync_object(
+        NS.gluster.objects.VolumeOptions(
+            vol_id=volume_state['id'],
+            options=options
+        ),
+        sync_ttl,
+        delta.options_changed(volume_state)
+    )
+    diff = delta.options_diff(volume_state)
+    if diff:
+        batch_writer.save(
+            NS.gluster.objects.VolumeOptionChange(
+                vol_id=volume_state['id'],
+                changed_at=tendrl_now().isoformat(),
+                changes=dict(
+                    (name, {'old': old, 'new': new})
+                    for name, (old, new) in diff.iteritems()
+                )
+            ),
+            history_ttl or DEFAULT_HISTORY_TTL
+        )
+    return diff
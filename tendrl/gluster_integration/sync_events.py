@@ -0,0 +1,234 @@
+import threading
+import time
+
+from tendrl.gluster_integration import metrics
+
+
+# Native events changing synced objects, by event type prefix: the kind
+# of target and the message fields naming it (the first one present is
+# used)
+EVENT_TARGETS = (
+    ("VOLUME_DELETE", None, ()),
+    ("VOLUME_", "volume", ("name", "volume", "Volume")),
+    ("BRICK_", "brick", ("volume",)),
+    ("PEER_", "peer", ("host", "peer")),
+    ("GEOREP_", "georep", ("master_volume", "master")),
+    ("SNAPSHOT_", "snapshot", ("volume_name", "volume")),
+)
+
+
+def _first(message, fields):
+    for field in fields:
+        if message.get(field):
+            return message[field]
+    return None
+
+
+class SyncTargets(object):
+    """Volumes, bricks and peers reported changed by native events"""
+
+    def __init__(self):
+        self.volumes = set()
+        # (peer, brick directory) of bricks whose volume is not named
+        self.bricks = set()
+        self.peers = False
+        self.georep = set()
+        self.snapshots = set()
+        # when the first of the events was received
+        self.received = None
+
+    def __nonzero__(self):
+        return any((
+            self.volumes, self.bricks, self.peers, self.georep,
+            self.snapshots
+        ))
+
+    def add(self, event, received=None):
+        """Add the targets of a native event, False if it has none"""
+        event_type = str(event.get("event", "")).upper()
+        message = event.get("message") or {}
+        for prefix, kind, fields in EVENT_TARGETS:
+            if event_type.startswith(prefix):
+                break
+        else:
+            return False
+        if kind is None:
+            return False
+        if kind == "peer":
+            self.peers = True
+        elif kind == "brick":
+            volume = _first(message, fields)
+            if volume:
+                self.volumes.add(volume)
+            elif message.get("peer") and message.get("brick"):
+                self.bricks.add((message["peer"], message["brick"]))
+            else:
+                return False
+        else:
+            volume = _first(message, fields)
+            if not volume:
+                return False
+            # the volume details, snapshot count and georep pairs all
+            # come from the volume sync
+            self.volumes.add(volume)
+            if kind == "georep":
+                self.georep.add(volume)
+            elif kind == "snapshot":
+                self.snapshots.add(volume)
+        if self.received is None:
+            self.received = received or time.time()
+        return True
+
+    def __len__(self):
+        return len(self.volumes) + len(self.bricks) + int(self.peers)
+
+    def volume_states(self, state):
+        """VolumeStates of the targeted volumes in state"""
+        volumes = []
+        for volume_state in state.volumes:
+            if volume_state.name in self.volumes:
+                volumes.append(volume_state)
+                continue
+            for brick_state in volume_state.bricks:
+                hostname, _, path = str(
+                    brick_state.get('path', '')
+                ).partition(':')
+                if (hostname, path) in self.bricks or \
+                    (brick_state.get('hostname'), path) in self.bricks:
+                    volumes.append(volume_state)
+                    break
+        return volumes
+
+
+class SyncRequests(object):
+    """Native events waiting for the sync thread
+
+    The message handler calls notify() for every event received, the
+    sync thread waits on wait() in between its full syncs and syncs the
+    targets of the events it returns.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._targets = SyncTargets()
+        self._expedited = False
+
+    def notify(self, event):
+        with self._cond:
+            if self._targets.add(event):
+                self._cond.notify_all()
+                return True
+        return False
+
+    def expedite(self):
+        """Have the sync thread start its next full sync right away"""
+        with self._cond:
+            self._expedited = True
+            self._cond.notify_all()
+
+    def _take_expedited(self):
+        expedited, self._expedited = self._expedited, False
+        return expedited
+
+    def pause(self, timeout):
+        """Sleep up to timeout seconds, True if cut short by expedite()"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._expedited:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return self._take_expedited()
+
+    def pending(self):
+        """Volumes, bricks and peers (counted once) waiting for a sync"""
+        with self._cond:
+            return len(self._targets)
+
+    def wait(self, timeout, delay=0):
+        """SyncTargets of the events received so far, waiting up to
+        timeout seconds for one. None if there was none, or once a full
+        sync is expedited.
+
+        delay gives the events of a burst (a volume stop disconnects
+        all its bricks ...) time to arrive, so they get synced together.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._targets:
+                if self._take_expedited():
+                    return None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+        if delay:
+            time.sleep(min(delay, max(deadline - time.time(), 0)))
+        with self._cond:
+            targets, self._targets = self._targets, SyncTargets()
+        return targets
+
+
+class SyncGenerations(object):
+    """Numbers the syncs (full or of event targets) of the sync thread
+
+    Instead of sleeping for a while, a callback needing the synced
+    objects to reflect its event waits for the first sync started after
+    the event (the one in progress may have run get-state before it) to
+    complete. Syncs run one after the other in the sync thread, once that
+    one completed no sync working on an older get-state is left to
+    overwrite what the callback does.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.started = 0
+        self.completed = 0
+
+    def start(self):
+        """Called by the sync thread when a sync starts, returns its
+        generation
+        """
+        with self._cond:
+            self.started += 1
+            return self.started
+
+    def complete(self, generation):
+        """Called by the sync thread when a sync ends, failed or not"""
+        with self._cond:
+            if generation > self.completed:
+                self.completed = generation
+                self._cond.notify_all()
+
+    def next(self):
+        """Generation of the first sync to start from now on"""
+        with self._cond:
+            return self.started + 1
+
+    def wait(self, generation, timeout):
+        """True once the sync of generation completed, False if that
+        takes more than timeout seconds
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self.completed < generation:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+requests = SyncRequests()
+generations = SyncGenerations()
+
+
+def _collect():
+    metrics.registry.set(
+        "gluster_integration_queue_depth", requests.pending(),
+        queue="sync_targets"
+    )
+
+
+metrics.registry.register_collector(_collect)
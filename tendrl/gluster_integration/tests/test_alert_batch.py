@@ -0,0 +1,70 @@
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import alert_batch  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+def _brick_alert(status):
+    return (
+        "brick_status", status, "brick b1 %s" % status,
+        "volume_vol1|brick_b1", "WARNING"
+    )
+
+
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_dedup(emit_event):
+    batch = alert_batch.begin(rate=0)
+    alert_batch.emit(*_brick_alert("Stopped"), tags={"fqdn": "host1"})
+    alert_batch.emit(
+        "peer_status", "Disconnected", "peer host1", "peer_host1", "WARNING"
+    )
+    alert_batch.emit(*_brick_alert("Stopped"))
+    assert not emit_event.called
+    assert len(batch) == 2
+    assert alert_batch.end() is batch
+    assert emit_event.call_args_list == [
+        mock.call(*_brick_alert("Stopped")),
+        mock.call(
+            "peer_status", "Disconnected", "peer host1", "peer_host1",
+            "WARNING"
+        ),
+    ]
+    # no batch open, emitted at once
+    alert_batch.emit(*_brick_alert("Started"))
+    assert emit_event.call_count == 3
+
+
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_rate_limit(emit_event):
+    with mock.patch('time.time', return_value=1000):
+        for status in ("Stopped", "Started", "Stopped"):
+            alert_batch.begin(rate=2, period=600)
+            alert_batch.emit(*_brick_alert(status))
+            alert_batch.end()
+        # held back, then replaced by the next state
+        alert_batch.begin(rate=2, period=600)
+        alert_batch.emit(*_brick_alert("Started"))
+        assert alert_batch.end().held.keys() == [
+            ("brick_status", "volume_vol1|brick_b1")
+        ]
+    assert [call[0][1] for call in emit_event.call_args_list] == \
+        ["Stopped", "Started"]
+    with mock.patch('time.time', return_value=1700):
+        # the latest held back alert goes with the next batch
+        alert_batch.begin(rate=2, period=600)
+        alert_batch.end()
+    assert [call[0][1] for call in emit_event.call_args_list] == \
+        ["Stopped", "Started", "Started"]
+
+
+def test_limiter_forgets():
+    limiter = alert_batch.RateLimiter(rate=1, period=10)
+    assert limiter.allow("a", 0)
+    assert not limiter.allow("a", 5)
+    limiter.forget(20)
+    assert limiter._emitted == {}
+    assert limiter.allow("a", 20)
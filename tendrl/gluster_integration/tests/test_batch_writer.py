@@ -0,0 +1,156 @@
+import __builtin__
+import maps
+import mock
+import pytest
+import sys
+import threading
+import time
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import batch_writer  # noqa
+from tendrl.gluster_integration.sds_sync import object_sync  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+class Volume(object):
+    def __init__(self, vol_id, **kwargs):
+        self.value = 'clusters/{0}/Volumes/%s' % vol_id
+        self.hash = None
+        self._defs = {}
+        self.state = None
+        self.client_count = None
+        self.pcnt_used = None
+        self.__dict__.update(kwargs)
+        self.saved = []
+
+    def render(self):
+        self.value = self.value.format(NS.tendrl_context.integration_id)
+
+    def save(self, update=True, ttl=None):
+        self.saved.append(ttl)
+
+
+def _init():
+    setattr(__builtin__, "NS", maps.NamedDict())
+    setattr(NS, "tendrl_context", maps.NamedDict(integration_id="int-id"))
+    setattr(NS, "publisher_id", "gluster-integration")
+
+
+def test_save_without_batch():
+    _init()
+    volume = Volume('vol-1')
+    batch_writer.save(volume)
+    batch_writer.save(volume, 10)
+    assert volume.saved == [None, 10]
+
+
+def test_repeated_saves_deduplicated():
+    _init()
+    batch = batch_writer.WriteBatch(2)
+    loaded = Volume('vol-1', state='up')
+    loaded.client_count = 3
+    batch.add(loaded, 100)
+    loaded.pcnt_used = '10.0'
+    batch.add(loaded)
+    # a new object of the same key keeps the pending values of the
+    # fields it leaves to None
+    synced = Volume('vol-1', state='down')
+    batch.add(synced)
+    batch.add(Volume('vol-2'), 50)
+    assert len(batch) == 2
+    assert batch.flush() == 2
+    assert not loaded.saved
+    assert synced.saved == [100]
+    assert synced.state == 'down'
+    assert synced.client_count == 3
+    assert synced.pcnt_used == '10.0'
+    assert (batch.saves, batch.writes) == (4, 2)
+    assert batch.flush() == 0
+
+
+class VolumeOptions(Volume):
+    pass
+
+
+def test_same_key_other_class():
+    _init()
+    batch = batch_writer.WriteBatch(2)
+    volume = Volume('vol-1', state='up')
+    options = VolumeOptions('vol-1')
+    batch.add(volume, 100)
+    batch.add(options, 100)
+    assert len(batch) == 2
+    assert batch.flush() == 2
+    assert volume.saved == [100]
+    assert options.saved == [100]
+    # the options did not get the volume fields
+    assert options.state is None
+
+
+def test_flush_raises_after_all_saves():
+    _init()
+    batch = batch_writer.WriteBatch(1)
+    failing = Volume('vol-1')
+    failing.save = mock.Mock(side_effect=ValueError)
+    other = Volume('vol-2')
+    batch.add(failing)
+    batch.add(other)
+    with pytest.raises(ValueError):
+        batch.flush()
+    assert other.saved == [None]
+
+
+def test_flush_concurrency():
+    _init()
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def _save(update=True, ttl=None):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+
+    batch = batch_writer.WriteBatch(4)
+    for index in range(20):
+        volume = Volume('vol-%s' % index)
+        volume.save = _save
+        batch.add(volume)
+    batch.flush()
+    assert 1 < max(peak) <= 4
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log')
+def test_sync_object_queued_in_cycle(log):
+    _init()
+    batch_writer.begin(2)
+    try:
+        volume = Volume('vol-1')
+        object_sync.sync_object(volume, 100, True)
+        batch_writer.save(volume)
+        assert not volume.saved
+        batch_writer.flush()
+        assert volume.saved == [100]
+        batch_writer.save(volume)
+    finally:
+        batch = batch_writer.end()
+    assert volume.saved == [100, None]
+    assert (batch.saves, batch.writes) == (3, 2)
+    assert log.called
+    batch_writer.save(volume)
+    assert volume.saved == [100, None, None]
+
+
+def test_discard():
+    _init()
+    batch_writer.begin()
+    volume = Volume('vol-1')
+    batch_writer.save(volume)
+    batch_writer.discard()
+    assert batch_writer.end() is None
+    assert not volume.saved
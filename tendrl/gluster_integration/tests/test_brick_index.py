@@ -0,0 +1,199 @@
+import __builtin__
+import etcd
+import maps
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import brick_index  # noqa
+from tendrl.gluster_integration.sds_sync import client_connections  # noqa
+from tendrl.gluster_integration.sds_sync import cluster_status  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+from tendrl.gluster_integration import get_state  # noqa
+from tendrl.gluster_integration import ini2json  # noqa
+
+
+# host1 is the local node, get-state has no status for the other bricks
+STATE = """[Volumes]
+Volume1.name: vol1
+Volume1.id: vol-id-1
+Volume1.brickcount: 4
+Volume1.subvol_count: 2
+Volume1.Brick1.path: host1:/bricks/b1
+Volume1.Brick1.status: Started
+Volume1.Brick1.client_count: 2
+Volume1.Brick1.Client1.hostname: 10.0.0.1:1023
+Volume1.Brick1.Client1.bytesread: 100
+Volume1.Brick1.Client1.byteswrite: 10
+Volume1.Brick1.Client2.hostname: 10.0.0.2:1021
+Volume1.Brick1.Client2.bytesread: 200
+Volume1.Brick1.Client2.byteswrite: 20
+Volume1.Brick2.path: host2:/bricks/b2
+Volume1.Brick3.path: host1:/bricks/b3
+Volume1.Brick3.status: Stopped
+Volume1.Brick4.path: host3:/bricks/b4
+Volume2.name: vol2
+Volume2.id: vol-id-2
+Volume2.brickcount: 1
+Volume2.subvol_count: 1
+Volume2.Brick1.path: host1:/bricks/b5
+Volume2.Brick1.status: Started
+Volume3.name: vol3
+Volume3.id: vol-id-3
+Volume3.Brick1.path: host1:/bricks/b6
+"""
+
+
+def _leaf(key, value):
+    return maps.NamedDict(key=key, value=value)
+
+
+def _bricks_all():
+    prefix = "/clusters/int-id/Bricks/all"
+    return maps.NamedDict(leaves=[
+        _leaf(prefix + "/host2/_bricks_b2/brick_path", "host2:/bricks/b2"),
+        _leaf(prefix + "/host2/_bricks_b2/status", "Started"),
+        _leaf(prefix + "/host2/_bricks_b2/client_count", "1"),
+        _leaf(prefix + "/host2/_bricks_b2/ClientConnections/"
+              "10.0.0.1:1022/bytesread", "1000"),
+        _leaf(prefix + "/host2/_bricks_b2/ClientConnections/"
+              "10.0.0.1:1022/byteswrite", "5"),
+        _leaf(prefix + "/host1/_bricks_b1/brick_path", "host1:/bricks/b1"),
+        _leaf(prefix + "/host1/_bricks_b1/status", "Stopped"),
+        _leaf(prefix + "/host3/_bricks_old/brick_path", "host3:/bricks/b4"),
+        _leaf(prefix + "/host3/_bricks_old/status", "Started"),
+        _leaf(prefix + "/host3/_bricks_old/deleted", "True"),
+    ])
+
+
+def _init(read):
+    setattr(__builtin__, "NS", maps.NamedDict())
+    setattr(NS, "_int", maps.NamedDict(client=mock.Mock()))
+    NS._int.client.read = read
+    setattr(NS, "tendrl_context", maps.NamedDict(integration_id="int-id"))
+
+
+def _index():
+    return brick_index.BrickIndex(get_state.GlusterState(
+        ini2json.ini_stream_to_dict(STATE.splitlines(True))
+    ))
+
+
+def test_local_statuses_without_etcd():
+    read = mock.Mock()
+    _init(read)
+    assert _index().subvolume_statuses('vol-id-2') == [['Started']]
+    assert not read.called
+
+
+def test_remote_statuses_with_one_read():
+    read = mock.Mock(return_value=_bricks_all())
+    _init(read)
+    index = _index()
+    # get-state status wins over etcd for local bricks, deleted bricks
+    # are ignored
+    assert index.subvolume_statuses('vol-id-1') == [
+        ['Started', 'Started'], ['Stopped', None]
+    ]
+    assert index.subvolume_statuses('vol-id-1') == [
+        ['Started', 'Started'], ['Stopped', None]
+    ]
+    read.assert_called_once_with(
+        "clusters/int-id/Bricks/all", recursive=True
+    )
+
+
+def test_unknown_volumes():
+    read = mock.Mock(side_effect=etcd.EtcdKeyNotFound)
+    _init(read)
+    index = _index()
+    # no layout details in get-state
+    assert index.subvolume_statuses('vol-id-3') is None
+    assert index.subvolume_statuses('vol-id-4') is None
+    assert index.subvolume_statuses('vol-id-1') == [
+        ['Started', None], ['Stopped', None]
+    ]
+
+
+def _volume(vol_id, **kwargs):
+    volume = maps.NamedDict(
+        vol_id=vol_id, name=vol_id, status="Started", state="",
+        brick_count=4, replica_count=2, disperse_count=0,
+        redundancy_count=0
+    )
+    volume.update(kwargs)
+    volume.save = mock.Mock()
+    return volume
+
+
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_derive_volume_states(emit_event):
+    read = mock.Mock(return_value=_bricks_all())
+    _init(read)
+    index = _index()
+    volumes = [
+        _volume('vol-id-1'),
+        _volume('vol-id-2', brick_count=1, replica_count=1),
+        _volume('vol-id-3', status="Stopped"),
+    ]
+    states = cluster_status._derive_volume_states(volumes, index)
+    # the brick of host3 is not synced yet
+    assert states['vol-id-1'] == 'unknown'
+    assert states['vol-id-2'] == 'up'
+    assert states['vol-id-3'] == 'down'
+    assert read.call_count == 1
+    for volume in volumes:
+        assert volume.save.called
+
+
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_derive_volume_states_degraded(emit_event):
+    bricks_all = _bricks_all()
+    bricks_all.leaves = bricks_all.leaves[:4] + [
+        _leaf("/clusters/int-id/Bricks/all/host3/_bricks_b4/brick_path",
+              "host3:/bricks/b4"),
+        _leaf("/clusters/int-id/Bricks/all/host3/_bricks_b4/status",
+              "Started"),
+    ]
+    _init(mock.Mock(return_value=bricks_all))
+    volume = _volume('vol-id-1', state='up')
+    states = cluster_status._derive_volume_states([volume], _index())
+    # one brick of the second replica pair is stopped
+    assert states['vol-id-1'] == '(degraded)'
+    assert emit_event.call_count == 1
+
+
+def test_client_aggregates():
+    read = mock.Mock(return_value=_bricks_all())
+    _init(read)
+    index = _index()
+    assert index.client_count('vol-id-2') == 0
+    assert not read.called
+    assert index.client_count('vol-id-1') == 3
+    assert index.client_count('vol-id-3') is None
+    assert index.client_totals() == {
+        '10.0.0.1': {'bytesread': 1100, 'byteswrite': 15, 'connections': 2},
+        '10.0.0.2': {'bytesread': 200, 'byteswrite': 20, 'connections': 1},
+    }
+    assert read.call_count == 1
+
+
+def test_sync_connections():
+    _init(mock.Mock(return_value=_bricks_all()))
+    setattr(NS, "gluster", maps.NamedDict(objects=maps.NamedDict()))
+    NS.gluster.objects.ClientTotals = mock.Mock()
+    volumes = [_volume('vol-id-1'), _volume('vol-id-2')]
+    index = _index()
+    client_connections.sync_volume_connections(volumes, index)
+    assert [volume.client_count for volume in volumes] == [3, 0]
+    client_connections.sync_client_totals(index, 100)
+    NS.gluster.objects.ClientTotals.assert_any_call(
+        hostname='10.0.0.2', bytesread=200, byteswrite=20,
+        connection_count=1
+    )
+    NS.gluster.objects.ClientTotals.return_value.save.assert_called_with(
+        ttl=100
+    )
@@ -0,0 +1,68 @@
+import mock
+import posix
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import brick_utilization  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+MOUNTS = {
+    '/bricks/b1': {
+        'device': '/dev/mapper/vg1-lv1',
+        'fsType': 'xfs',
+        'mountOptions': 'rw'
+    },
+    '/bricks/b2': {
+        'device': '/dev/mapper/vg2-lv2',
+        'fsType': 'xfs',
+        'mountOptions': 'rw'
+    },
+}
+
+
+def _mount_point(path):
+    return '/'.join(path.split('/')[:3])
+
+
+def _statvfs(mount_point):
+    return posix.statvfs_result(
+        (4096, 4096, 1000, 250, 250, 100, 50, 50, 0, 255)
+    )
+
+
+@mock.patch.object(brick_utilization, 'get_lvs', return_value={})
+@mock.patch.object(
+    brick_utilization, '_parse_proc_mounts', return_value=MOUNTS
+)
+@mock.patch.object(
+    brick_utilization, '_get_mount_point', side_effect=_mount_point
+)
+@mock.patch('os.statvfs', side_effect=_statvfs)
+def test_bricks_utilization(statvfs, mount_point, proc_mounts, lvs):
+    paths = [
+        'host1:/bricks/b1/vol1',
+        'host1:/bricks/b1/vol2',
+        'host1:/bricks/b2/vol1',
+        'host1:/bricks/b3/vol1',
+    ]
+    utilization = brick_utilization.bricks_utilization(paths)
+    assert proc_mounts.call_count == 1
+    assert lvs.call_count == 1
+    # b3 is not a mount point listed in /proc/mounts
+    assert sorted(utilization) == paths[:3]
+    assert utilization[paths[0]]['mount_point'] == '/bricks/b1'
+    assert utilization[paths[2]]['mount_point'] == '/bricks/b2'
+    assert utilization[paths[0]]['used_percent'] == 75.0
+    assert utilization[paths[0]]['thinpool_size'] is None
+    assert utilization[paths[0]] == brick_utilization.brick_utilization(
+        paths[0]
+    )
+
+
+@mock.patch.object(brick_utilization, 'get_lvs')
+def test_bricks_utilization_without_bricks(lvs):
+    assert brick_utilization.bricks_utilization([]) == {}
+    assert not lvs.called
@@ -0,0 +1,71 @@
+import threading
+
+from tendrl.gluster_integration.message import coalescer
+
+
+class FakeEvent(object):
+    saved = []
+    lock = threading.Lock()
+
+    def __init__(self, context, current_value):
+        self.context = context
+        self.current_value = current_value
+        self.occurrences = None
+
+    def save(self):
+        with self.lock:
+            self.saved.append(
+                (self.context, self.current_value, self.occurrences)
+            )
+
+
+def _saved():
+    with FakeEvent.lock:
+        saved, FakeEvent.saved[:] = list(FakeEvent.saved), []
+    return saved
+
+
+def test_storm():
+    _saved()
+    events = coalescer.Coalescer(window=60)
+    for _ in range(50):
+        events.save(FakeEvent("svc_connection|glustershd", "disconnected"))
+        events.save(FakeEvent("svc_connection|glustershd", "connected"))
+    events.save(FakeEvent("quorum|vol1", "quorum_lost"))
+    # the first event of every context is saved at once
+    assert _saved() == [
+        ("svc_connection|glustershd", "disconnected", 1),
+        ("quorum|vol1", "quorum_lost", 1),
+    ]
+    events.flush()
+    # then the latest one, once the window ends
+    assert _saved() == [("svc_connection|glustershd", "connected", 99)]
+    events.save(FakeEvent("quorum|vol1", "quorum_regained"))
+    events.stop()
+    assert _saved() == [("quorum|vol1", "quorum_regained", 1)]
+
+
+def test_window_ends():
+    _saved()
+    events = coalescer.Coalescer(window=0.1)
+    try:
+        for value in ("down", "up", "down"):
+            events.save(FakeEvent("afr_subvol|vol1-replicate-0", value))
+        for _ in range(100):
+            if len(FakeEvent.saved) == 2:
+                break
+            threading.Event().wait(0.05)
+        assert _saved() == [
+            ("afr_subvol|vol1-replicate-0", "down", 1),
+            ("afr_subvol|vol1-replicate-0", "down", 2),
+        ]
+    finally:
+        events.stop()
+
+
+def test_no_window():
+    _saved()
+    events = coalescer.Coalescer(window=0)
+    events.save(FakeEvent("quorum|vol1", "quorum_lost"))
+    events.save(FakeEvent("quorum|vol1", "quorum_lost"))
+    assert len(_saved()) == 2
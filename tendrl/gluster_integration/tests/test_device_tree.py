@@ -0,0 +1,90 @@
+import mock
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import device_tree  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+class TestDeviceTree(object):
+    def setup_method(self, method):
+        self.tempdir = tempfile.mkdtemp()
+        self.partitions = os.path.join(self.tempdir, 'partitions')
+        self.backup = os.path.join(self.tempdir, 'backup')
+        os.mkdir(self.backup)
+        self._write(self.partitions, "major minor  #blocks  name\n"
+                    "   8        0   10485760 sda\n")
+        self.patches = [
+            mock.patch.object(
+                device_tree, 'PARTITIONS_FILE', self.partitions
+            ),
+            mock.patch.object(
+                device_tree, 'LVM_METADATA_DIRS', (self.backup,)
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def teardown_method(self, method):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tempdir)
+
+    def _write(self, path, content):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_fingerprint(self):
+        first = device_tree.fingerprint()
+        assert device_tree.fingerprint() == first
+        self._write(self.partitions, "major minor  #blocks  name\n"
+                    "   8        0   10485760 sda\n"
+                    "   8        1    1048576 sda1\n")
+        second = device_tree.fingerprint()
+        assert second != first
+        vg_backup = os.path.join(self.backup, 'tendrl_vg')
+        self._write(vg_backup, "vg metadata")
+        third = device_tree.fingerprint()
+        assert third != second
+        os.utime(vg_backup, (time.time() + 10, time.time() + 10))
+        assert device_tree.fingerprint() != third
+
+    @mock.patch.object(device_tree, 'blivet')
+    def test_rescan_only_on_change(self, blivet):
+        blivet.Blivet.side_effect = lambda: mock.MagicMock()
+        cache = device_tree.DeviceTreeCache()
+        first = cache.get()
+        assert cache.get() is first
+        assert cache.current() is first
+        assert blivet.Blivet.call_count == 1
+        self._write(os.path.join(self.backup, 'tendrl_vg'), "vg metadata")
+        second = cache.get()
+        assert second is not first
+        assert blivet.Blivet.call_count == 2
+
+    @mock.patch.object(device_tree, 'blivet')
+    def test_current_scans_once(self, blivet):
+        cache = device_tree.DeviceTreeCache()
+        devicetree = cache.current()
+        assert devicetree is blivet.Blivet.return_value.devicetree
+        assert cache.current() is devicetree
+        assert blivet.Blivet.return_value.reset.call_count == 1
+
+    @mock.patch.object(device_tree, 'blivet')
+    def test_refresher(self, blivet):
+        cache = device_tree.DeviceTreeCache()
+        refresher = device_tree.DeviceTreeRefresher(cache, 0.01)
+        refresher.start()
+        try:
+            time.sleep(0.1)
+        finally:
+            refresher.stop()
+            refresher.join()
+        assert cache.current() is blivet.Blivet.return_value.devicetree
+        assert blivet.Blivet.return_value.reset.call_count == 1
@@ -0,0 +1,120 @@
+import threading
+
+from tendrl.gluster_integration.message import event_queue
+from tendrl.gluster_integration import metrics
+
+
+class Callbacks(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.running = {}
+        self.most = {}
+        self.handled = []
+
+    def __call__(self, event_type, event):
+        with self.lock:
+            self.running[event_type] = self.running.get(event_type, 0) + 1
+            self.most[event_type] = max(
+                self.most.get(event_type, 0), self.running[event_type]
+            )
+        if event_type == "volume_delete":
+            self.release.wait(5)
+        with self.lock:
+            self.running[event_type] -= 1
+            self.handled.append(event["name"])
+
+
+def test_type_limits():
+    callbacks = Callbacks()
+    queue = event_queue.EventQueue(
+        callbacks, workers=4, default_limit=3,
+        type_limits={"volume_delete": 1}
+    )
+    queue.start()
+    try:
+        for index in range(3):
+            assert queue.put("volume_delete", {"name": "delete%s" % index})
+        for index in range(5):
+            assert queue.put("volume_start", {"name": "start%s" % index})
+        # the starts are not held up by the sleeping volume_delete
+        for _ in range(100):
+            if len(callbacks.handled) == 5:
+                break
+            threading.Event().wait(0.05)
+        assert sorted(callbacks.handled) == \
+            ["start%s" % index for index in range(5)]
+        assert queue.depth() == 2
+        callbacks.release.set()
+        assert queue.wait_idle(5)
+    finally:
+        queue.stop()
+    assert callbacks.handled[5:] == ["delete0", "delete1", "delete2"]
+    assert callbacks.most["volume_delete"] == 1
+    assert callbacks.most["volume_start"] <= 3
+
+
+def test_drops():
+    before = metrics.registry.get(
+        "gluster_integration_events_dropped_total", event="peer_detach"
+    ) or 0
+    queue = event_queue.EventQueue(lambda event_type, event: None, size=2)
+    assert queue.put("peer_detach", {})
+    assert queue.put("peer_detach", {})
+    assert not queue.put("peer_detach", {})
+    assert queue.dropped == 1
+    assert metrics.registry.get(
+        "gluster_integration_events_dropped_total", event="peer_detach"
+    ) == before + 1
+    queue.collect()
+    assert metrics.registry.get(
+        "gluster_integration_queue_depth", queue="events"
+    ) == 2
+    queue.start()
+    try:
+        assert queue.wait_idle(5)
+    finally:
+        queue.stop()
+
+
+def test_one_volume_in_order():
+    done = []
+    lock = threading.Lock()
+
+    def _handle(event_type, event):
+        if event_type == "afr_subvols_down":
+            # the down event of vol1 takes longer than the up after it
+            threading.Event().wait(0.2)
+        with lock:
+            done.append((event_type, event["message"]["subvol"]))
+
+    queue = event_queue.EventQueue(_handle, workers=4)
+    queue.start()
+    try:
+        queue.put("afr_subvols_down",
+                  {"message": {"subvol": "vol1-replicate-0"}})
+        queue.put("afr_subvol_up",
+                  {"message": {"subvol": "vol1-replicate-0"}})
+        queue.put("afr_subvol_up",
+                  {"message": {"subvol": "vol2-replicate-0"}})
+        assert queue.wait_idle(5)
+    finally:
+        queue.stop()
+    assert done == [
+        ("afr_subvol_up", "vol2-replicate-0"),
+        ("afr_subvols_down", "vol1-replicate-0"),
+        ("afr_subvol_up", "vol1-replicate-0"),
+    ]
+
+
+def test_ordering_key():
+    assert event_queue.ordering_key(
+        {"message": {"svc_name": "glustershd", "volume": "vol1"}}
+    ) == "volume|vol1"
+    assert event_queue.ordering_key(
+        {"message": {"subvol": "vol-1-disperse-0"}}
+    ) == "volume|vol-1"
+    assert event_queue.ordering_key(
+        {"message": {"peer": "host1:24007"}}
+    ) == "peer|host1"
+    assert event_queue.ordering_key({"message": {}}) is None
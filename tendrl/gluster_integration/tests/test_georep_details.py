@@ -0,0 +1,126 @@
+import __builtin__
+import maps
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration import get_state  # noqa
+from tendrl.gluster_integration.sds_sync import georep_details  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+PREFIX = "clusters/int-id/Volumes"
+
+
+def _leaf(key, value):
+    return maps.NamedDict(key="/" + PREFIX + key, value=value)
+
+
+def _volume(vol_id, pairs):
+    volume = get_state.VolumeState(0)
+    volume.fields['id'] = vol_id
+    volume.pairs = [
+        get_state.PairState(pair, volume) for pair in range(pairs)
+    ]
+    return volume
+
+
+def _setup(volumes, sessions, pairs, status=lambda v, s, p: "Active"):
+    """get-state volumes with pairs and the etcd reads of their sessions
+    and brick_count
+    """
+    reads = {}
+    for volume in range(volumes):
+        vol_id = "vol-%s" % volume
+        reads["%s/%s/brick_count" % (PREFIX, vol_id)] = maps.NamedDict(
+            value=str(pairs)
+        )
+        leaves = []
+        for session in range(sessions):
+            for pair in range(pairs):
+                pair_key = "/%s/GeoRepSessions/session%s/pairs/pair%s" % (
+                    vol_id, session, pair
+                )
+                leaves.extend([
+                    _leaf(pair_key + "/status", status(volume, session, pair)),
+                    _leaf(pair_key + "/master_node", "host"),
+                ])
+        reads["%s/%s/GeoRepSessions" % (PREFIX, vol_id)] = maps.NamedDict(
+            leaves=leaves
+        )
+
+    def read(key, **kwargs):
+        try:
+            return reads[key]
+        except KeyError:
+            raise georep_details.etcd.EtcdKeyNotFound
+
+    setattr(__builtin__, "NS", maps.NamedDict())
+    setattr(NS, "_int", maps.NamedDict(client=mock.Mock()))
+    NS._int.client.read = mock.Mock(side_effect=read)
+    setattr(NS, "tendrl_context", maps.NamedDict(integration_id="int-id"))
+    return [
+        _volume("vol-%s" % volume, pairs) for volume in range(volumes)
+    ]
+
+
+@mock.patch.object(georep_details, 'GeoReplicationSession')
+def test_session_status(session):
+    statuses = {
+        0: lambda pair: "Active",
+        1: lambda pair: "Faulty",
+        2: lambda pair: "Faulty" if pair else "Passive",
+        3: lambda pair: "Created",
+        4: lambda pair: "Stopped",
+        5: lambda pair: "Paused",
+    }
+    volumes = _setup(1, 6, 3, lambda v, s, p: statuses[s](p))
+    # a volume without pairs is not read
+    volumes.append(_volume("vol-x", 0))
+    georep_details.aggregate_session_status(volumes)
+    saved = dict(
+        (call[1]['session_id'], call[1]['session_status'])
+        for call in session.call_args_list
+    )
+    assert saved == {
+        'session0': 'up',
+        'session1': 'down',
+        'session2': 'partial',
+        'session3': 'created',
+        'session4': 'stopped',
+        'session5': 'paused',
+    }
+    assert set(call[1]['vol_id'] for call in session.call_args_list) == \
+        set(['vol-0'])
+    assert session.return_value.save.call_count == 6
+    assert NS._int.client.read.call_count == 2
+
+
+@mock.patch.object(georep_details, 'GeoReplicationSession')
+def test_sessions_not_synced_yet(session):
+    volumes = _setup(0, 0, 0)
+    volumes.append(_volume("vol-x", 3))
+    georep_details.aggregate_session_status(volumes)
+    assert not session.called
+
+
+@mock.patch.object(georep_details, 'GeoReplicationSession')
+def test_no_georep_no_read(session):
+    _setup(0, 0, 0)
+    georep_details.aggregate_session_status(
+        [_volume("vol-%s" % volume, 0) for volume in range(100)]
+    )
+    assert not NS._int.client.read.called
+    assert not session.called
+
+
+@mock.patch.object(georep_details, 'GeoReplicationSession')
+def test_reads_100_volumes_10_sessions_24_pairs(session):
+    volumes = _setup(100, 10, 24)
+    georep_details.aggregate_session_status(volumes)
+    # two reads per volume with pairs, the per pair implementation
+    # needed 1 + 100 + 1000 reads plus 24000 pair loads
+    assert NS._int.client.read.call_count == 200
+    assert session.return_value.save.call_count == 1000
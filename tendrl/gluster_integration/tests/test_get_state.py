@@ -0,0 +1,337 @@
+import mock
+import os
+import tempfile
+import threading
+import time
+
+from tendrl.gluster_integration import get_state
+from tendrl.gluster_integration import ini2json
+
+
+STATE = """[Global]
+MYUUID: 7f9c4c22-0c1b-4b5e-a0c4-2d8e2b7c2a11
+
+[Peers]
+Peer1.primary_hostname: host2
+Peer1.uuid: peer-uuid-1
+Peer1.state: Peer in Cluster
+Peer1.connected: Connected
+Peer2.primary_hostname: host3
+Peer2.uuid: peer-uuid-2
+Peer2.state: Peer in Cluster
+Peer2.connected: Disconnected
+
+[Volumes]
+Volume1.name: vol1
+Volume1.id: vol-id-1
+Volume1.brickcount: 2
+Volume1.Brick1.path: host1:/bricks/b1
+Volume1.Brick1.hostname: host1
+Volume1.Brick1.client_count: 2
+Volume1.Brick1.Client1.hostname: 10.0.0.1:1023
+Volume1.Brick1.Client1.bytesread: 100
+Volume1.Brick1.Client2.hostname: 10.0.0.2:1023
+Volume1.Brick1.Client2.bytesread: 200
+Volume1.Brick2.path: host2:/bricks/b2
+Volume1.Brick2.hostname: host2
+Volume1.snap_count: 1
+Volume1.Snapshot1.name: snap1
+Volume1.Snapshot1.time: 2017-07-25 11:09:34
+Volume1.snapd_svc.online_status: Offline
+Volume1.rebalance.status: not_started
+Volume1.options.nfs.disable: on
+Volume2.name: vol2
+Volume2.id: vol-id-2
+Volume2.Brick1.path: host1:/bricks/b3
+Volume2.Brick1.hostname: host1
+Volume2.Pair1.master_node: host1
+Volume2.Pair1.status: Active
+"""
+
+
+def _state():
+    return get_state.GlusterState(
+        ini2json.ini_stream_to_dict(STATE.splitlines(True))
+    )
+
+
+def test_peers():
+    state = _state()
+    assert [peer['uuid'] for peer in state.peers] == \
+        ['peer-uuid-1', 'peer-uuid-2']
+    assert state.peers[1]['connected'] == 'Disconnected'
+
+
+def test_volume_fields():
+    state = _state()
+    assert [volume.name for volume in state.volumes] == ['vol1', 'vol2']
+    volume = state.volume_by_id['vol-id-1']
+    assert volume.index == 1
+    assert volume['brickcount'] == '2'
+    assert volume['snapd_svc.online_status'] == 'Offline'
+    assert volume['rebalance.status'] == 'not_started'
+    assert volume['options.nfs.disable'] == 'on'
+    assert volume.get('disperse_count') is None
+
+
+def test_nested_entities():
+    state = _state()
+    volume = state.volume_by_name['vol1']
+    assert [brick.index for brick in volume.bricks] == [1, 2]
+    assert volume.bricks[0]['path'] == 'host1:/bricks/b1'
+    assert volume.bricks[0].volume is volume
+    assert [client['bytesread'] for client in volume.bricks[0].clients] == \
+        ['100', '200']
+    assert volume.bricks[1].clients == []
+    assert volume.snapshots[0]['time'] == ['2017-07-25', '11:09:34']
+    assert state.volume_by_name['vol2'].pairs[0]['status'] == 'Active'
+
+
+def test_bricks_by_hostname():
+    state = _state()
+    assert [brick['path'] for brick in state.bricks_by_hostname['host1']] \
+        == ['host1:/bricks/b1', 'host1:/bricks/b3']
+    assert len(state.bricks_by_hostname['host2']) == 1
+
+
+def test_empty_state():
+    state = get_state.GlusterState({})
+    assert state.peers == []
+    assert state.volumes == []
+
+
+def test_delta_without_previous_state():
+    state = _state()
+    delta = state.delta(None)
+    volume = state.volumes[0]
+    assert delta.peer_changed(state.peers[0])
+    assert delta.volume_changed(volume)
+    assert delta.snapshot_changed(volume.snapshots[0])
+
+
+def test_delta_unchanged_state():
+    previous = _state()
+    state = _state()
+    delta = state.delta(previous)
+    volume = state.volumes[0]
+    assert not delta.peer_changed(state.peers[0])
+    assert not delta.volume_changed(volume)
+    assert not delta.clients_changed(volume.bricks[0])
+    assert not delta.snapshot_changed(volume.snapshots[0])
+    assert not delta.pairs_changed(state.volumes[1])
+
+
+def test_delta_changed_entities():
+    previous = _state()
+    body = STATE.replace(
+        "Peer2.connected: Disconnected", "Peer2.connected: Connected"
+    ).replace(
+        "Client2.bytesread: 200", "Client2.bytesread: 300"
+    ).replace(
+        "Pair1.status: Active", "Pair1.status: Faulty"
+    )
+    state = get_state.GlusterState(
+        ini2json.ini_stream_to_dict(body.splitlines(True))
+    )
+    delta = state.delta(previous)
+    assert not delta.peer_changed(state.peers[0])
+    assert delta.peer_changed(state.peers[1])
+    volume = state.volumes[0]
+    assert not delta.volume_changed(volume)
+    assert delta.clients_changed(volume.bricks[0])
+    assert not delta.clients_changed(volume.bricks[1])
+    assert delta.pairs_changed(state.volumes[1])
+
+
+def test_default_options():
+    options = {
+        'Volume Options': {
+            'volume1.name': 'vol1',
+            'volume1.options.count': '3',
+            'volume1.options.key1': 'nfs.disable',
+            'volume1.options.value1': 'on',
+            'volume1.options.key2': 'performance.readdir-ahead',
+            'volume1.options.value2': 'on',
+            'volume2.name': 'vol2',
+        }
+    }
+    state = get_state.GlusterState(
+        ini2json.ini_stream_to_dict(STATE.splitlines(True)), options
+    )
+    assert state.volumes[0].default_options == {
+        'nfs.disable': 'on',
+        'performance.readdir-ahead': 'on'
+    }
+    assert state.volumes[1].default_options is None
+    previous = get_state.GlusterState(state.raw_data, options)
+    assert not state.delta(previous).options_changed(state.volumes[0])
+
+
+def test_options_diff():
+    options = {
+        'Volume Options': {
+            'volume1.options.count': '3',
+            'volume1.options.key1': 'nfs.disable',
+            'volume1.options.value1': 'off',
+            'volume1.options.key2': 'performance.readdir-ahead',
+            'volume1.options.value2': 'on',
+        }
+    }
+    raw_data = ini2json.ini_stream_to_dict(STATE.splitlines(True))
+    state = get_state.GlusterState(raw_data, options)
+    assert state.volumes[0].options == {'nfs.disable': 'on'}
+    assert state.volumes[0].effective_options() == {
+        'nfs.disable': 'on',
+        'performance.readdir-ahead': 'on'
+    }
+    assert state.volumes[1].effective_options() is None
+    assert state.delta(None).options_diff(state.volumes[0]) is None
+    previous = get_state.GlusterState(raw_data, options)
+    delta = state.delta(previous)
+    assert delta.options_diff(state.volumes[0]) == {}
+
+    raw_data = dict(raw_data)
+    raw_data['Volumes'] = dict(raw_data['Volumes'])
+    raw_data['Volumes']['volume1.options.nfs.disable'] = 'off'
+    raw_data['Volumes']['volume1.options.cluster.quorum-type'] = 'auto'
+    state = get_state.GlusterState(raw_data, options)
+    delta = state.delta(previous)
+    assert delta.options_changed(state.volumes[0])
+    assert delta.options_diff(state.volumes[0]) == {
+        'nfs.disable': ('on', 'off'),
+        'cluster.quorum-type': (None, 'auto')
+    }
+    # no defaults this time, nothing to compare
+    state = get_state.GlusterState(raw_data)
+    assert state.delta(previous).options_diff(state.volumes[0]) is None
+
+
+def _write_state(cmd):
+    with open(os.path.join(cmd[4], cmd[6]), 'w') as f:
+        f.write(STATE)
+        # more than a pipe buffer worth of output
+        for index in range(5000):
+            f.write("[Section%s]\nkey: value %s\n" % (index, index))
+    return 0
+
+
+def _collect(mode, side_effect):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        with mock.patch('subprocess.call', side_effect=side_effect) as call:
+            result = get_state.collect('detail', mode, tmp_dir)
+        cmd = call.call_args[0][0]
+        assert cmd[:3] == ['gluster', 'get-state', 'glusterd']
+        assert cmd[-1] == 'detail'
+        # the private output directory is always cleaned up
+        assert os.listdir(tmp_dir) == []
+    finally:
+        os.rmdir(tmp_dir)
+    return result
+
+
+def test_collect():
+    expected = ini2json.ini_stream_to_dict(STATE.splitlines(True))
+    for mode in (get_state.COLLECT_FIFO, get_state.COLLECT_FILE):
+        result = _collect(mode, _write_state)
+        assert len(result) == len(expected) + 5000
+        assert result['Volumes'] == expected['Volumes']
+        assert result['Section4999'] == {'key': ['value', '4999']}
+
+
+def test_collect_failed_command():
+    def empty_state(cmd):
+        open(os.path.join(cmd[4], cmd[6]), 'w').close()
+        return 0
+    for mode in (get_state.COLLECT_FIFO, get_state.COLLECT_FILE):
+        for side_effect in (lambda cmd: 1, empty_state):
+            try:
+                _collect(mode, side_effect)
+            except IOError:
+                pass
+            else:
+                assert False
+
+
+def test_collect_parse_error():
+    def bad_state(cmd):
+        with open(os.path.join(cmd[4], cmd[6]), 'w') as f:
+            f.write("[Global]\n[Global]\n" + "key: value\n" * 20000)
+        return 0
+    for mode in (get_state.COLLECT_FIFO, get_state.COLLECT_FILE):
+        try:
+            _collect(mode, bad_state)
+        except ValueError:
+            pass
+        else:
+            assert False
+
+
+def test_state_cache_versions():
+    cache = get_state.StateCache()
+    first = get_state.GlusterState()
+    second = get_state.GlusterState()
+    cache.update(first, 10)
+    cache.update(second, 20)
+    assert (first.version, second.version) == (1, 2)
+    # an older collection never replaces a newer one
+    cache.update(get_state.GlusterState(), 15)
+    assert cache.version == 2
+    refresh = mock.Mock()
+    assert cache.latest(newer_than=20, refresh=refresh) is second
+    assert not refresh.called
+
+
+def test_state_cache_refresh():
+    cache = get_state.StateCache()
+    old = get_state.GlusterState()
+    cache.update(old, time.time() - 100)
+    assert cache.latest(max_age=1000) is old
+    new = get_state.GlusterState()
+    refresh = mock.Mock(return_value=new)
+    assert cache.latest(max_age=10, refresh=refresh) is new
+    assert cache.latest(max_age=10, refresh=refresh) is new
+    assert refresh.call_count == 1
+    assert new.version == 2
+
+
+def test_state_cache_coalesced_refresh():
+    cache = get_state.StateCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return get_state.GlusterState()
+
+    results = []
+
+    def reader():
+        results.append(cache.latest(refresh=refresh))
+
+    threads = [threading.Thread(target=reader) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(result is results[0] for result in results)
+
+
+def test_state_cache_failed_refresh():
+    cache = get_state.StateCache()
+    refresh = mock.Mock(side_effect=[OSError, get_state.GlusterState()])
+    try:
+        cache.latest(refresh=refresh)
+    except OSError:
+        pass
+    else:
+        assert False
+    assert cache.latest(refresh=refresh).version == 1
@@ -0,0 +1,93 @@
+import maps
+import mock
+import posix
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import gfapi_utilization  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+import tendrl.gluster_integration  # noqa
+
+
+class GlusterLibgfapiException(Exception):
+    pass
+
+
+class GlfsStatvfsException(GlusterLibgfapiException):
+    pass
+
+
+def _gfapi():
+    gfapi = maps.NamedDict(
+        GLUSTER_VOL_HOST='localhost',
+        GLUSTER_VOL_PORT=24007,
+        GLUSTER_VOL_PROTOCAL='tcp',
+        GlusterLibgfapiException=GlusterLibgfapiException,
+        GlfsStatvfsException=GlfsStatvfsException,
+    )
+    gfapi.glfsInit = mock.Mock(side_effect=lambda name, *args: object())
+    gfapi.glfsFini = mock.Mock()
+    gfapi.glfsStatvfs = mock.Mock(return_value=posix.statvfs_result(
+        (4096, 4096, 1000, 250, 250, 100, 20, 20, 0, 255)
+    ))
+    return gfapi
+
+
+def test_handle_reused_across_calls():
+    gfapi = _gfapi()
+    handles = gfapi_utilization.VolumeHandles()
+    with mock.patch.object(gfapi_utilization, '_gfapi', return_value=gfapi):
+        handles.statvfs('vol1')
+        handles.statvfs('vol1')
+        handles.statvfs('vol2')
+    assert gfapi.glfsInit.call_count == 2
+    assert gfapi.glfsStatvfs.call_count == 3
+    assert not gfapi.glfsFini.called
+
+
+def test_reconnect_on_failure():
+    gfapi = _gfapi()
+    handles = gfapi_utilization.VolumeHandles()
+    with mock.patch.object(gfapi_utilization, '_gfapi', return_value=gfapi):
+        handles.statvfs('vol1')
+        result = gfapi.glfsStatvfs.return_value
+        gfapi.glfsStatvfs.side_effect = [GlfsStatvfsException(), result]
+        assert handles.statvfs('vol1') is result
+    assert gfapi.glfsInit.call_count == 2
+    assert gfapi.glfsFini.call_count == 1
+
+
+def test_prune():
+    gfapi = _gfapi()
+    handles = gfapi_utilization.VolumeHandles()
+    with mock.patch.object(gfapi_utilization, '_gfapi', return_value=gfapi):
+        handles.statvfs('vol1')
+        handles.statvfs('vol2')
+        handles.prune(['vol2'])
+        assert gfapi.glfsFini.call_count == 1
+        assert gfapi.glfsFini.call_args[0][1] == 'vol1'
+        handles.statvfs('vol2')
+    assert gfapi.glfsInit.call_count == 2
+
+
+def test_utilization():
+    gfapi = _gfapi()
+    handles = gfapi_utilization.VolumeHandles()
+    with mock.patch.object(gfapi_utilization, '_gfapi', return_value=gfapi):
+        # vol_utilization imports gfapi, which needs libgfapi
+        with mock.patch.dict(
+            sys.modules,
+            {'tendrl.gluster_integration.gfapi': gfapi}
+        ), mock.patch.object(
+            tendrl.gluster_integration, 'gfapi', gfapi, create=True
+        ):
+            utilization = handles.utilization('vol1')
+    assert utilization['total'] == 4000.0
+    assert utilization['used'] == 3000.0
+    assert utilization['pcnt_used'] == 75.0
+    assert utilization['total_inode'] == 100
+    assert utilization['used_inode'] == 80
+    assert utilization['pcnt_inode_used'] == 80.0
@@ -123,3 +123,138 @@ class Test_StrictConfigParser(TestGluster_integration):
         self.strict_config_parser.has_option = MagicMock(return_value=True)
         with pytest.raises(NotImplementedError):
             assert self.strict_config_parser.dget("pytest", 1, 12345, float)
+
+
+def _config_parser_ini_to_dict(ini_file_path):
+    # Reference StrictConfigParser based conversion, used to make sure
+    # the streaming parser keeps returning the very same structure
+    cfg = ini2json.StrictConfigParser()
+    f = open(ini_file_path)
+    cfg.readfp(f)
+    f.close()
+
+    config = {}
+    for section in cfg.sections():
+        config[section] = {}
+        for name, value in cfg.items(section):
+            config[section][name] = [x.strip() for x in value.split() if x]
+            if len(config[section][name]) == 1:
+                config[section][name] = config[section][name][0]
+            elif len(config[section][name]) == 0:
+                config[section][name] = ''
+    return config
+
+
+def _get_state_body(volumes=10, bricks=6, clients=2, peers=3):
+    lines = [
+        "[Global]",
+        "MYUUID: 7f9c4c22-0c1b-4b5e-a0c4-2d8e2b7c2a11",
+        "op-version: 31302",
+        "",
+        "[Global options]",
+        "",
+        "[Peers]",
+    ]
+    for p in range(1, peers + 1):
+        lines.extend([
+            "Peer%s.primary_hostname: host%s.example.com" % (p, p),
+            "Peer%s.uuid: 00000000-0000-0000-0000-%012d" % (p, p),
+            "Peer%s.state: Peer in Cluster" % p,
+            "Peer%s.connected: Connected" % p,
+            "Peer%s.othernames: " % p,
+        ])
+    lines.extend(["", "[Volumes]"])
+    for v in range(1, volumes + 1):
+        lines.extend([
+            "Volume%s.name: vol%s" % (v, v),
+            "Volume%s.id: 11111111-0000-0000-0000-%012d" % (v, v),
+            "Volume%s.type: Distributed-Replicate" % v,
+            "Volume%s.transport_type: tcp" % v,
+            "Volume%s.status: Started" % v,
+            "Volume%s.brickcount: %s" % (v, bricks),
+            "Volume%s.subvol_count: %s" % (v, bricks / 3),
+            "Volume%s.replica_count: 3" % v,
+            "Volume%s.arbiter_count: 0" % v,
+            "Volume%s.quorum_status: not_applicable" % v,
+        ])
+        for b in range(1, bricks + 1):
+            lines.extend([
+                "Volume%s.Brick%s.path: host%s.example.com:"
+                "/bricks/vol%s/b%s" % (v, b, b % peers + 1, v, b),
+                "Volume%s.Brick%s.hostname: host%s.example.com" % (
+                    v, b, b % peers + 1),
+                "Volume%s.Brick%s.port: %s" % (v, b, 49152 + b),
+                "Volume%s.Brick%s.status: Started" % (v, b),
+                "Volume%s.Brick%s.spacefree: 10724966400Bytes" % (v, b),
+                "Volume%s.Brick%s.mount_options: rw,seclabel,relatime" % (
+                    v, b),
+                "Volume%s.Brick%s.client_count: %s" % (v, b, clients),
+            ])
+            for c in range(1, clients + 1):
+                lines.extend([
+                    "Volume%s.Brick%s.Client%s.hostname: "
+                    "10.70.%s.%s:1023" % (v, b, c, b, c),
+                    "Volume%s.Brick%s.Client%s.bytesread: %s" % (
+                        v, b, c, 1000 * c),
+                    "Volume%s.Brick%s.Client%s.byteswrite: %s" % (
+                        v, b, c, 2000 * c),
+                    "Volume%s.Brick%s.Client%s.opversion: 31302" % (
+                        v, b, c),
+                ])
+        lines.extend([
+            "Volume%s.snap_count: 1" % v,
+            "Volume%s.Snapshot1.name: snap%s" % (v, v),
+            "Volume%s.Snapshot1.time: 2017-07-25 11:09:34" % v,
+            "Volume%s.Snapshot1.description: " % v,
+            "Volume%s.snapd_svc.online_status: Offline" % v,
+            "Volume%s.rebalance.id: 00000000-0000-0000-0000-000000000000" % v,
+            "Volume%s.rebalance.status: not_started" % v,
+            "Volume%s.options.nfs.disable: on" % v,
+            "Volume%s.options.transport.address-family: inet" % v,
+            "",
+        ])
+    lines.extend([
+        "[Services]",
+        "svc1.name: glustershd",
+        "svc1.online_status: Online",
+        "",
+        "[Misc]",
+        "Base port: 49152",
+        "Last allocated port: 49155",
+    ])
+    return "\n".join(lines) + "\n"
+
+
+class Test_IniStreamParity(TestGluster_integration):
+
+    def _assert_parity(self, body):
+        filename = self._makeFile('pytest', body)
+        assert ini2json.ini_to_dict(filename) == \
+            _config_parser_ini_to_dict(filename)
+
+    def test_parity_small_get_state(self):
+        self._assert_parity(_get_state_body())
+
+    def test_parity_large_get_state(self):
+        self._assert_parity(
+            _get_state_body(volumes=300, bricks=12, clients=3, peers=12)
+        )
+
+    def test_parity_comments_and_continuations(self):
+        body = "# comment\n; other comment\nREM ark\n[foo]\n" \
+               "bar: 1 2\n  3\n\n  4\nbaz = x ; comment\nqux: a;b\n" \
+               "empty: \"\"\nColon: a:b=c\nEq = a:b\n[DEFAULT]\nd: 1\n"
+        self._assert_parity(body)
+
+    def test_parity_reads_from_stream(self):
+        body = _get_state_body(volumes=3)
+        filename = self._makeFile('pytest', body)
+        assert ini2json.ini_stream_to_dict(body.splitlines(True)) == \
+            _config_parser_ini_to_dict(filename)
+
+    def test_parse_errors_collected(self):
+        body = """[foo]\na=1\n:bad\n=bad\nbar=2"""
+        filename = self._makeFile('pytest', body)
+        with pytest.raises(ini2json.ParsingError) as ex:
+            ini2json.ini_to_dict(filename)
+        assert len(ex.value.errors) == 2
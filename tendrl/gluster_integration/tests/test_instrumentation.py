@@ -0,0 +1,109 @@
+import json
+import mock
+import os
+import shutil
+import sys
+import tempfile
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import instrumentation  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+from tendrl.gluster_integration import metrics  # noqa
+
+
+class FakeClient(object):
+    def read(self, key, **kwargs):
+        return key
+
+    def write(self, key, value, **kwargs):
+        return value
+
+    def refresh(self, key, ttl):
+        # python-etcd refreshes through write()
+        return self.write(key, None, ttl=ttl, refresh=True)
+
+    def delete(self, key, **kwargs):
+        if key == "missing":
+            raise KeyError(key)
+
+
+def _cycle(stats, client, now):
+    with mock.patch('time.time', return_value=now):
+        stats.start_cycle()
+    client.read("a")
+    client.read("b")
+    metrics.spawned("get_state")
+    with mock.patch('time.time', return_value=now + 2):
+        stats.mark("get_state")
+    client.write("a", "1")
+    client.refresh("b", 10)
+    client.delete("c")
+    with mock.patch('time.time', return_value=now + 2.5):
+        stats.mark("volumes")
+    return stats.end_cycle()
+
+
+def test_phase_stats():
+    client = FakeClient()
+    instrumentation.count_etcd(client)
+    # installed once
+    instrumentation.count_etcd(client)
+    stats = instrumentation.SyncStats(window=3)
+    cycle = _cycle(stats, client, 1000)
+    assert cycle["get_state"] == {
+        "seconds": 2, "etcd_reads": 2, "etcd_writes": 0, "spawns": 1
+    }
+    assert cycle["volumes"] == {
+        "seconds": 0.5, "etcd_reads": 0, "etcd_writes": 3, "spawns": 0
+    }
+    assert metrics.registry.get(
+        "gluster_integration_sync_phase_seconds", phase="volumes"
+    ) == 0.5
+    for now in range(4):
+        _cycle(stats, client, now)
+    summary = stats.summary()
+    assert summary["cycles"] == 3
+    get_state = summary["phases"]["get_state"]
+    assert (get_state["mean"], get_state["p95"], get_state["max"]) == \
+        (2, 2, 2)
+    assert get_state["histogram"]["5"] == 3
+    assert get_state["etcd_reads"] == 2
+    assert summary["phases"]["volumes"]["histogram"]["0.5"] == 3
+
+
+def test_write_summary():
+    stats = instrumentation.SyncStats()
+    stats.start_cycle()
+    stats.mark("get_state")
+    stats.end_cycle()
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "stats", "sync_stats.json")
+        stats.write(path)
+        stats.write(path)
+        with open(path) as stats_file:
+            assert json.load(stats_file)["cycles"] == 1
+        assert os.listdir(os.path.dirname(path)) == ["sync_stats.json"]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_etcd_errors():
+    client = FakeClient()
+    instrumentation.count_etcd(client)
+    before = metrics.registry.get(
+        "gluster_integration_etcd_errors_total", op="delete", error="KeyError"
+    ) or 0
+    try:
+        client.delete("missing")
+    except KeyError:
+        pass
+    else:
+        assert False, "the error was swallowed"
+    client.delete("c")
+    assert metrics.registry.get(
+        "gluster_integration_etcd_errors_total", op="delete", error="KeyError"
+    ) == before + 1
@@ -0,0 +1,156 @@
+import __builtin__
+import etcd
+import maps
+import mock
+import pytest
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import leases  # noqa
+from tendrl.gluster_integration.sds_sync import object_sync  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+class FakeObject(object):
+    def __init__(self, name):
+        self.value = 'clusters/{0}/Fake/%s' % name
+        self.save = mock.MagicMock()
+
+    def render(self):
+        self.value = self.value.format(NS.tendrl_context.integration_id)
+
+
+def _init():
+    setattr(__builtin__, "NS", maps.NamedDict())
+    setattr(NS, "tendrl_context", maps.NamedDict(integration_id="int-id"))
+    setattr(NS, "publisher_id", "gluster-integration")
+
+
+def _cycle(manager, objects, changed, now):
+    with mock.patch('time.time', return_value=now):
+        manager.begin()
+        for obj in objects:
+            object_sync.sync_object(obj, 100, changed)
+        return manager.renew()
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log', mock.Mock())
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_generation_renewed_as_a_group(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        objects = [FakeObject('obj%s' % index) for index in range(10)]
+        _cycle(manager, objects, True, 1000)
+        for obj in objects:
+            obj.save.assert_called_once_with(ttl=100)
+        # unchanged objects far from their expiry cost no etcd operation
+        for now in (1010, 1020, 1060):
+            assert _cycle(manager, objects, False, now) == 0
+        assert not refresh.called
+        # the generation expires at 1100, renewed within the margin
+        assert _cycle(manager, objects, False, 1075) == 10
+        assert refresh.call_count == 10
+        refresh.assert_any_call('clusters/int-id/Fake/obj0', 100)
+        assert _cycle(manager, objects, False, 1085) == 0
+        assert refresh.call_count == 10
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log', mock.Mock())
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_objects_gone_are_forgotten(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        objects = [FakeObject('obj0'), FakeObject('obj1')]
+        _cycle(manager, objects, True, 1000)
+        # obj1 is no more in get-state, its key is left to expire
+        _cycle(manager, objects[:1], False, 1080)
+        refresh.assert_called_once_with('clusters/int-id/Fake/obj0', 100)
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log', mock.Mock())
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_deleted_key_saved_again(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        obj = FakeObject('obj0')
+        _cycle(manager, [obj], True, 1000)
+        refresh.side_effect = etcd.EtcdKeyNotFound
+        _cycle(manager, [obj], False, 1080)
+        assert obj.save.call_count == 2
+        assert manager.rewritten == 1
+        refresh.side_effect = None
+        assert _cycle(manager, [obj], False, 1090) == 0
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log', mock.Mock())
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_failed_renewal_retried(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        obj = FakeObject('obj0')
+        _cycle(manager, [obj], True, 1000)
+        refresh.side_effect = etcd.EtcdConnectionFailed
+        with pytest.raises(etcd.EtcdConnectionFailed):
+            _cycle(manager, [obj], False, 1080)
+        refresh.side_effect = None
+        assert _cycle(manager, [obj], False, 1085) == 1
+
+
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_not_tracked_outside_cycle(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        obj = FakeObject('obj0')
+        object_sync.sync_object(obj, 100, False)
+        object_sync.sync_object(obj, 100, False)
+        assert refresh.call_count == 2
+        assert manager.renew() == 0
+
+
+class FakeOptions(FakeObject):
+    pass
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log', mock.Mock())
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_deleted_key_shared_by_two_objects(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        # Volume and VolumeOptions share clusters/<cid>/Volumes/<vol_id>
+        volume = FakeObject('vol1')
+        options = FakeOptions('vol1')
+        _cycle(manager, [volume, options], True, 1000)
+        refresh.side_effect = etcd.EtcdKeyNotFound
+        _cycle(manager, [volume, options], False, 1080)
+        # one refresh of the key, both objects written back
+        assert refresh.call_count == 1
+        assert volume.save.call_count == 2
+        assert options.save.call_count == 2
+        refresh.side_effect = None
+        assert _cycle(manager, [volume, options], False, 1090) == 0
+
+
+@mock.patch('tendrl.commons.utils.log_utils.log', mock.Mock())
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_partial_sync_keeps_other_keys(refresh):
+    _init()
+    manager = leases.LeaseManager(margin=30)
+    with mock.patch.object(leases, 'manager', manager):
+        objects = [FakeObject('obj0'), FakeObject('obj1')]
+        _cycle(manager, objects, True, 1000)
+        # an event sync of obj1 alone
+        with mock.patch('time.time', return_value=1010):
+            manager.begin(partial=True)
+            object_sync.sync_object(objects[1], 100, True)
+            manager.renew()
+        # obj0 is still tracked, obj1 expires later since rewritten
+        assert _cycle(manager, objects, False, 1075) == 1
+        refresh.assert_called_once_with('clusters/int-id/Fake/obj0', 100)
@@ -0,0 +1,48 @@
+from tendrl.gluster_integration import metrics
+
+
+def test_registry():
+    registry = metrics.Registry()
+    registry.describe("sync_seconds", metrics.GAUGE, "sync duration")
+    registry.set("sync_seconds", 1.5)
+    registry.set("sync_seconds", 2.5)
+    registry.inc("decisions_total", reason="interval")
+    registry.inc("decisions_total", 2, reason="interval")
+    registry.inc("decisions_total", reason="ttl")
+    assert registry.get("sync_seconds") == 2.5
+    assert registry.get("decisions_total", reason="interval") == 3
+    assert registry.get("missing") is None
+    assert registry.snapshot() == [
+        ("sync_seconds", metrics.GAUGE, "sync duration", [({}, 2.5)]),
+        ("decisions_total", metrics.GAUGE, "", [
+            ({"reason": "interval"}, 3), ({"reason": "ttl"}, 1)
+        ]),
+    ]
+
+
+def test_render():
+    registry = metrics.Registry()
+    registry.describe("events_total", metrics.COUNTER, "events\nreceived")
+    registry.inc("events_total", event='volume_"stop"', result="processed")
+    registry.inc("events_total", event="peer_connect", result="ignored")
+    registry.set("backlog", 0)
+    depth = []
+    registry.register_collector(lambda: registry.set("depth", len(depth)))
+    depth.append(1)
+    registry.maximum("slowest", 2)
+    registry.maximum("slowest", 1)
+    registry.set("never", float("inf"))
+    assert registry.render() == (
+        u'# HELP events_total events\\nreceived\n'
+        u'# TYPE events_total counter\n'
+        u'events_total{event="volume_\\"stop\\"",result="processed"} 1.0\n'
+        u'events_total{event="peer_connect",result="ignored"} 1.0\n'
+        u'# TYPE backlog gauge\n'
+        u'backlog 0.0\n'
+        u'# TYPE slowest gauge\n'
+        u'slowest 2.0\n'
+        u'# TYPE never gauge\n'
+        u'never +Inf\n'
+        u'# TYPE depth gauge\n'
+        u'depth 1.0\n'
+    )
@@ -0,0 +1,76 @@
+import __builtin__
+import etcd
+import maps
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import object_sync  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+class FakeObject(object):
+    def __init__(self):
+        self.value = 'clusters/{0}/Fake'
+        self.save = mock.MagicMock()
+
+    def render(self):
+        self.value = self.value.format(NS.tendrl_context.integration_id)
+
+
+class Brick(FakeObject):
+    pass
+
+
+def _init():
+    setattr(__builtin__, "NS", maps.NamedDict())
+    setattr(NS, "tendrl_context", maps.NamedDict())
+    NS.tendrl_context["integration_id"] = "int-id"
+
+
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_changed_object_is_saved(refresh):
+    _init()
+    obj = FakeObject()
+    object_sync.sync_object(obj, 100, True)
+    obj.save.assert_called_once_with(ttl=100)
+    assert not refresh.called
+
+
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_unchanged_object_only_refreshed(refresh):
+    _init()
+    obj = FakeObject()
+    object_sync.sync_object(obj, 100, False)
+    refresh.assert_called_once_with('clusters/int-id/Fake', 100)
+    assert not obj.save.called
+
+
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_unchanged_brick_refreshes_status(refresh):
+    _init()
+    obj = Brick()
+    object_sync.sync_object(obj, 100, False)
+    refresh.assert_called_once_with('clusters/int-id/Fake/status', 100)
+
+
+@mock.patch(
+    'tendrl.commons.utils.etcd_utils.refresh',
+    mock.Mock(side_effect=etcd.EtcdKeyNotFound)
+)
+def test_unchanged_object_saved_when_missing():
+    _init()
+    obj = FakeObject()
+    object_sync.sync_object(obj, 100, False)
+    obj.save.assert_called_once_with(ttl=100)
+
+
+@mock.patch('tendrl.commons.utils.etcd_utils.refresh')
+def test_unchanged_object_without_ttl(refresh):
+    _init()
+    obj = FakeObject()
+    object_sync.sync_object(obj, None, False)
+    assert not refresh.called
+    assert not obj.save.called
@@ -0,0 +1,97 @@
+import __builtin__
+import etcd
+import maps
+import mock
+
+from tendrl.gluster_integration.message import process_events
+
+
+class Leaf(object):
+    def __init__(self, key, value, index, directory=False):
+        self.key = key
+        self.value = value
+        self.modifiedIndex = index
+        self.dir = directory
+
+
+def _event(context, severity="warning", **kwargs):
+    fields = dict(
+        context=context, severity=severity, message="msg", tags=None,
+        occurrences=None, processed=None, recovery_processed=None,
+        alert_notify=None, current_value="down"
+    )
+    fields.update(kwargs)
+    return maps.NamedDict(fields)
+
+
+def _setup(stored, pending):
+    saved = []
+
+    def native_events(context=None, **kwargs):
+        obj = mock.MagicMock()
+        obj.load_all.return_value = stored.values()
+        if context in stored:
+            obj.load.return_value = stored[context]
+        else:
+            obj.load.side_effect = etcd.EtcdKeyNotFound
+        obj.save.side_effect = lambda *args, **kw: saved.append(
+            (context, kwargs)
+        )
+        return obj
+
+    prefix = "/clusters/cid/native_events_pending"
+    result = mock.MagicMock()
+    result.leaves = [Leaf(prefix, None, 1, directory=True)] + [
+        Leaf("%s/%s" % (prefix, context), context, index)
+        for index, context in enumerate(pending, 10)
+    ]
+    setattr(__builtin__, "NS", maps.NamedDict())
+    NS.tendrl_context = maps.NamedDict(integration_id="cid")
+    NS.gluster = maps.NamedDict(
+        objects=maps.NamedDict(NativeEvents=native_events)
+    )
+    NS._int = maps.NamedDict(client=mock.MagicMock(),
+                             wclient=mock.MagicMock())
+    NS._int.client.read.return_value = result
+    return saved
+
+
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_incremental(emit_event):
+    stored = {
+        "quorum|vol1": _event("quorum|vol1", occurrences="3"),
+        "quorum|vol2": _event("quorum|vol2", processed="True"),
+        "svc|shd": _event("svc|shd", severity="recovery"),
+    }
+    process_events._scanned = False
+    # the first run processes everything
+    saved = _setup(stored, ["quorum|vol1"])
+    process_events.process_events(True)
+    assert sorted(context for context, _ in saved) == \
+        ["quorum|vol1", "svc|shd"]
+    assert "msg (3 occurrences)" in [
+        call[0][2] for call in emit_event.call_args_list
+    ]
+    NS._int.wclient.delete.assert_called_once_with(
+        "/clusters/cid/native_events_pending/quorum|vol1", prevIndex=10
+    )
+
+    # then only the pending contexts
+    emit_event.reset_mock()
+    saved = _setup(stored, ["svc|shd", "expired|ctx"])
+    stored["svc|shd"] = _event("svc|shd", severity="warning")
+    process_events.process_events(True)
+    assert [context for context, _ in saved] == ["svc|shd"]
+    assert emit_event.call_count == 1
+    assert NS._int.wclient.delete.call_count == 2
+
+
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_full(emit_event):
+    stored = {"quorum|vol1": _event("quorum|vol1")}
+    saved = _setup(stored, ["quorum|vol1"])
+    process_events._scanned = True
+    process_events.process_events()
+    assert [context for context, _ in saved] == ["quorum|vol1"]
+    assert not NS._int.client.read.called
+    assert not process_events._scanned
@@ -0,0 +1,84 @@
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import scheduler  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+from tendrl.gluster_integration import metrics  # noqa
+
+
+def _cycle(sync_scheduler, duration, changed=False, writes=0, flush=0):
+    with mock.patch('time.time', return_value=1000):
+        sync_scheduler.start_cycle()
+    sync_scheduler.observe_etcd(writes, flush)
+    with mock.patch('time.time', return_value=1000 + duration):
+        return sync_scheduler.next_sleep(changed)
+
+
+def _started(*args, **kwargs):
+    # a scheduler past the startup cycles
+    sync_scheduler = scheduler.SyncScheduler(*args, **kwargs)
+    sync_scheduler.cycles = scheduler.STARTUP_CYCLES
+    return sync_scheduler
+
+
+def _decisions(reason):
+    return metrics.registry.get(
+        "gluster_integration_sync_decisions_total", reason=reason
+    ) or 0
+
+
+def test_interval_includes_the_cycle():
+    sync_scheduler = _started(60)
+    assert _cycle(sync_scheduler, 10) == 50
+    assert metrics.registry.get(
+        "gluster_integration_sync_cycle_seconds"
+    ) == 10
+    assert metrics.registry.get(
+        "gluster_integration_sync_sleep_seconds"
+    ) == 50
+
+
+def test_long_cycle_keeps_the_duty_cycle():
+    sync_scheduler = _started(60, duty_cycle=0.5)
+    before = _decisions("duty_cycle")
+    assert _cycle(sync_scheduler, 40) == 40
+    assert _decisions("duty_cycle") == before + 1
+    # never more than a TTL in between two cycles
+    assert _cycle(sync_scheduler, 100) == 160 - 10 - 100
+
+
+def test_changes_bring_the_next_cycle_early():
+    sync_scheduler = _started(60)
+    assert _cycle(sync_scheduler, 2, changed=True) == 15
+    assert _cycle(sync_scheduler, 20, changed=True) == 20
+    assert _cycle(sync_scheduler, 2) == 58
+
+
+def test_backoff_on_etcd_latency():
+    sync_scheduler = _started(60, etcd_latency=0.1)
+    assert _cycle(sync_scheduler, 10, True, writes=10, flush=5) == 120
+    assert sync_scheduler.backoff == 2
+    # backing off further would let the TTLs run out
+    before = _decisions("ttl")
+    assert _cycle(sync_scheduler, 10, writes=10, flush=5) == 140
+    assert _decisions("ttl") == before + 1
+    assert _cycle(sync_scheduler, 10, writes=10, flush=5) == 140
+    assert sync_scheduler.backoff == 8
+    assert metrics.registry.get("gluster_integration_sync_backoff") == 8
+    assert _cycle(sync_scheduler, 10, writes=10, flush=0.1) == 50
+    assert sync_scheduler.backoff == 1
+
+
+def test_startup_ramp():
+    sync_scheduler = scheduler.SyncScheduler(60)
+    before = _decisions("startup")
+    assert [_cycle(sync_scheduler, 0.5) for _ in range(7)] == \
+        [1, 2, 3, 4, 5, 6, 59.5]
+    assert _decisions("startup") == before + 6
+    # etcd being slow wins over the ramp
+    sync_scheduler = scheduler.SyncScheduler(60, etcd_latency=0.1)
+    assert _cycle(sync_scheduler, 10, writes=10, flush=5) == 120
@@ -0,0 +1,52 @@
+import __builtin__
+import maps
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration import sds_sync  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+def _init(stored_status):
+    setattr(__builtin__, "NS", maps.NamedDict())
+    NS.tendrl_context = maps.NamedDict(integration_id="cid")
+    NS.gluster = maps.NamedDict(
+        objects=maps.NamedDict(Peer=mock.MagicMock())
+    )
+    NS._int = maps.NamedDict(client=mock.MagicMock())
+    NS._int.client.read.return_value = maps.NamedDict(value=stored_status)
+
+
+def _sync_peers(delta):
+    state = maps.NamedDict(peers=[{
+        "uuid": "p1", "primary_hostname": "host1", "state": "Peer in Cluster",
+        "connected": "Connected"
+    }])
+    sync_peers = sds_sync.GlusterIntegrationSdsSyncStateThread._sync_peers
+    return sync_peers.im_func(None, state, delta, 0)
+
+
+@mock.patch('tendrl.gluster_integration.sds_sync.object_sync.sync_object')
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_unchanged_peer_with_drifted_status(emit_event, sync_object):
+    _init("Disconnected")
+    delta = mock.MagicMock()
+    delta.peer_changed.return_value = False
+    assert _sync_peers(delta) == 5
+    # the stored status differs from get-state: alert and rewrite
+    assert emit_event.call_args[0][:2] == ("peer_status", "Connected")
+    assert sync_object.call_args[0][1:] == (5, True)
+
+
+@mock.patch('tendrl.gluster_integration.sds_sync.object_sync.sync_object')
+@mock.patch('tendrl.commons.utils.event_utils.emit_event')
+def test_unchanged_peer(emit_event, sync_object):
+    _init("Connected")
+    delta = mock.MagicMock()
+    delta.peer_changed.return_value = False
+    _sync_peers(delta)
+    assert not emit_event.called
+    assert sync_object.call_args[0][1:] == (5, False)
@@ -0,0 +1,128 @@
+import threading
+import time
+
+from tendrl.gluster_integration import get_state
+from tendrl.gluster_integration import ini2json
+from tendrl.gluster_integration import sync_events
+
+
+STATE = """[Volumes]
+Volume1.name: vol1
+Volume1.id: vol-id-1
+Volume1.Brick1.path: host1:/bricks/b1
+Volume1.Brick1.hostname: host1
+Volume2.name: vol2
+Volume2.id: vol-id-2
+Volume2.Brick1.path: host2:/bricks/b2
+Volume2.Brick1.hostname: host2
+Volume3.name: vol3
+Volume3.id: vol-id-3
+Volume3.Brick1.path: host2:/bricks/b3
+Volume3.Brick1.hostname: host2
+"""
+
+
+def _state():
+    return get_state.GlusterState(
+        ini2json.ini_stream_to_dict(STATE.splitlines(True))
+    )
+
+
+def _event(event, **message):
+    return {"event": event, "message": message}
+
+
+def test_event_targets():
+    targets = sync_events.SyncTargets()
+    assert not targets
+    assert targets.add(_event("VOLUME_STOP", name="vol1"), 100)
+    assert targets.add(_event("BRICK_DISCONNECTED", peer="host2",
+                              brick="/bricks/b2"))
+    assert targets.add(_event("SNAPSHOT_CREATE", volume_name="vol3"))
+    assert targets.add(_event("GEOREP_FAULTY", master_volume="vol3"))
+    assert not targets.peers
+    assert targets.add(_event("PEER_CONNECT", host="host3"))
+    assert targets.peers
+    # deleted volumes are cleaned up by the callbacks
+    assert not targets.add(_event("VOLUME_DELETE", name="vol2"))
+    assert not targets.add(_event("QUOTA_CROSSED_SOFT_LIMIT", volume="v"))
+    assert not targets.add(_event("VOLUME_START"))
+    assert targets.volumes == set(["vol1", "vol3"])
+    assert targets.snapshots == set(["vol3"])
+    assert targets.georep == set(["vol3"])
+    assert targets.received == 100
+    assert [volume.name for volume in targets.volume_states(_state())] == \
+        ["vol1", "vol2", "vol3"]
+
+
+def test_unknown_volume():
+    targets = sync_events.SyncTargets()
+    targets.add(_event("VOLUME_CREATE", name="vol4"))
+    assert targets.volume_states(_state()) == []
+
+
+def test_pending():
+    requests = sync_events.SyncRequests()
+    requests.notify(_event("VOLUME_STOP", name="vol1"))
+    requests.notify(_event("SNAPSHOT_CREATE", volume_name="vol1"))
+    requests.notify(_event("PEER_CONNECT", host="host3"))
+    requests.notify(_event("PEER_DISCONNECT", host="host4"))
+    assert requests.pending() == 2
+    requests.wait(0)
+    assert requests.pending() == 0
+
+
+def test_wait_timeout():
+    requests = sync_events.SyncRequests()
+    assert not requests.notify(_event("AFR_SPLIT_BRAIN"))
+    start = time.time()
+    assert requests.wait(0.1) is None
+    assert time.time() - start >= 0.1
+
+
+def test_wait_collects_a_burst():
+    requests = sync_events.SyncRequests()
+
+    def _burst():
+        for volume in ("vol1", "vol2", "vol3"):
+            requests.notify(_event("VOLUME_STOP", name=volume))
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=_burst)
+    thread.start()
+    targets = requests.wait(5, 0.2)
+    thread.join()
+    assert targets.volumes == set(["vol1", "vol2", "vol3"])
+    assert requests.wait(0) is None
+
+
+def test_expedite():
+    requests = sync_events.SyncRequests()
+    assert not requests.pause(0.05)
+    requests.expedite()
+    start = time.time()
+    assert requests.pause(5)
+    # the full sync asked for is not asked again
+    assert not requests.pause(0)
+    requests.expedite()
+    assert requests.wait(5) is None
+    assert time.time() - start < 1
+
+
+def test_generations():
+    generations = sync_events.SyncGenerations()
+    running = generations.start()
+    # an event arriving during a sync waits for the next one
+    wanted = generations.next()
+    assert wanted == running + 1
+    generations.complete(running)
+    assert not generations.wait(wanted, 0.05)
+
+    def _sync():
+        generations.complete(generations.start())
+
+    thread = threading.Thread(target=_sync)
+    thread.start()
+    assert generations.wait(wanted, 5)
+    thread.join()
+    assert generations.wait(running, 0)
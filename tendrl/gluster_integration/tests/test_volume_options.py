@@ -0,0 +1,108 @@
+import __builtin__
+import maps
+import mock
+import sys
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration.sds_sync import volume_options  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+from tendrl.gluster_integration import get_state  # noqa
+from tendrl.gluster_integration import ini2json  # noqa
+
+
+STATE = """[Volumes]
+Volume1.name: vol1
+Volume1.id: vol-id-1
+Volume1.options.nfs.disable: %s
+"""
+
+OPTIONS = {
+    'Volume Options': {
+        'volume1.options.count': '3',
+        'volume1.options.key1': 'nfs.disable',
+        'volume1.options.value1': 'on',
+        'volume1.options.key2': 'performance.readdir-ahead',
+        'volume1.options.value2': 'on',
+    }
+}
+
+
+def _state(nfs_disable, options=OPTIONS):
+    return get_state.GlusterState(
+        ini2json.ini_stream_to_dict(
+            (STATE % nfs_disable).splitlines(True)
+        ),
+        options
+    )
+
+
+def _init():
+    setattr(__builtin__, "NS", maps.NamedDict())
+    setattr(NS, "gluster", maps.NamedDict(objects=maps.NamedDict()))
+    NS.gluster.objects.VolumeOptions = mock.Mock()
+    NS.gluster.objects.VolumeOptionChange = mock.Mock()
+
+
+@mock.patch.object(volume_options.batch_writer, 'save')
+@mock.patch.object(volume_options.object_sync, 'sync_object')
+def test_first_sync(sync_object, save):
+    _init()
+    state = _state('off')
+    diff = volume_options.sync_volume_options(
+        state.volumes[0], 100, state.delta(None)
+    )
+    assert diff is None
+    NS.gluster.objects.VolumeOptions.assert_called_once_with(
+        vol_id='vol-id-1',
+        options={'nfs.disable': 'off', 'performance.readdir-ahead': 'on'}
+    )
+    sync_object.assert_called_once_with(
+        NS.gluster.objects.VolumeOptions.return_value, 100, True
+    )
+    assert not save.called
+
+
+@mock.patch.object(volume_options.batch_writer, 'save')
+@mock.patch.object(volume_options.object_sync, 'sync_object')
+def test_unchanged_options(sync_object, save):
+    _init()
+    state = _state('off')
+    volume_options.sync_volume_options(
+        state.volumes[0], 100, state.delta(_state('off'))
+    )
+    assert sync_object.call_args[0][2] is False
+    assert not save.called
+
+
+@mock.patch.object(volume_options.batch_writer, 'save')
+@mock.patch.object(volume_options.object_sync, 'sync_object')
+def test_changed_option_recorded(sync_object, save):
+    _init()
+    state = _state('off')
+    volume_options.sync_volume_options(
+        state.volumes[0], 100, state.delta(_state('on')), 3600
+    )
+    assert sync_object.call_args[0][2] is True
+    kwargs = NS.gluster.objects.VolumeOptionChange.call_args[1]
+    assert kwargs['vol_id'] == 'vol-id-1'
+    assert kwargs['changes'] == {
+        'nfs.disable': {'old': 'on', 'new': 'off'}
+    }
+    save.assert_called_once_with(
+        NS.gluster.objects.VolumeOptionChange.return_value, 3600
+    )
+
+
+@mock.patch.object(volume_options.object_sync, 'sync_object')
+def test_overrides_without_defaults(sync_object):
+    _init()
+    state = _state('off', None)
+    volume_options.sync_volume_options(
+        state.volumes[0], 100, state.delta(None)
+    )
+    NS.gluster.objects.VolumeOptions.assert_called_once_with(
+        vol_id='vol-id-1', options={'nfs.disable': 'off'}
+    )
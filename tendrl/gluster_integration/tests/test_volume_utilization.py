@@ -2,6 +2,8 @@ import importlib
 import inspect
 import maps
 import mock
+import threading
+import time
 
 from tendrl.gluster_integration.objects.utilization import Utilization
 from tendrl.gluster_integration.objects.volume import Volume
@@ -175,3 +177,55 @@ def test_sync_volume_utilization_details_with_stopped_volume():
 
     with mock.patch.object(Utilization, 'save') as util_save_mock:
         assert not util_save_mock.called
+
+
+def test_collector_concurrent_with_deadline():
+    release = threading.Event()
+
+    def query(volume_name, timeout):
+        if volume_name == 'hung':
+            release.wait()
+        else:
+            time.sleep(0.05)
+        return {'total': 100, 'used': 10}, ''
+
+    collector = utilization.UtilizationCollector()
+    volumes = ['vol%s' % index for index in range(8)] + ['hung']
+    start = time.time()
+    results = collector.collect(volumes, query, timeout=0.5, workers=8)
+    # the fast volumes ran concurrently and did not wait for 'hung'
+    assert time.time() - start < 1
+    assert results['hung'] == (None, 'timed out')
+    for volume_name in volumes[:-1]:
+        assert results[volume_name] == ({'total': 100, 'used': 10}, '')
+
+    # no second query for a volume whose query is still hanging
+    results = collector.collect(['hung'], query, timeout=0.5)
+    assert results['hung'][0] is None
+    assert 'still running' in results['hung'][1]
+
+    release.set()
+    time.sleep(0.1)
+    assert collector.last_sample('hung') == {'total': 100, 'used': 10}
+    results = collector.collect(['hung'], query, timeout=0.5)
+    assert results['hung'] == ({'total': 100, 'used': 10}, '')
+
+
+def test_collector_last_sample():
+    samples = [({'total': 100, 'used': 10}, ''), (None, 'failed')]
+
+    def query(volume_name, timeout):
+        return samples.pop(0)
+
+    collector = utilization.UtilizationCollector()
+    collector.collect(['vol1'], query)
+    results = collector.collect(['vol1'], query)
+    assert results['vol1'] == (None, 'failed')
+    assert collector.last_sample('vol1') == {'total': 100, 'used': 10}
+    assert collector.last_sample('vol1', max_age=60) == {
+        'total': 100, 'used': 10
+    }
+    time.sleep(0.02)
+    assert collector.last_sample('vol1', max_age=0.01) is None
+    collector.forget(['vol2'])
+    assert collector.last_sample('vol1') is None
@@ -0,0 +1,163 @@
+import mock
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from tendrl.gluster_integration import get_state
+from tendrl.gluster_integration.tests.test_ini2json import _get_state_body
+from tendrl.gluster_integration import worker_pool
+
+sys.modules['tendrl.gluster_integration.sds_sync.blivet'] = mock.MagicMock()
+
+from tendrl.gluster_integration import sds_sync  # noqa
+
+del sys.modules['tendrl.gluster_integration.sds_sync.blivet']
+
+
+def test_results_in_item_order():
+    def slow_square(item):
+        # later items finish first
+        time.sleep((10 - item) * 0.001)
+        return item * item
+    results = worker_pool.bounded_map(slow_square, range(10), 4)
+    assert [result.get() for result in results] == [
+        item * item for item in range(10)
+    ]
+
+
+def test_errors_are_per_item():
+    def fail_odd(item):
+        if item % 2:
+            raise KeyError(item)
+        return item
+    for workers in (1, 3):
+        results = worker_pool.bounded_map(fail_odd, range(6), workers)
+        assert [result.error is None for result in results] == [
+            True, False, True, False, True, False
+        ]
+        assert isinstance(results[1].error, KeyError)
+        try:
+            results[1].get()
+        except KeyError:
+            pass
+        else:
+            assert False
+
+
+def test_bounded_concurrency():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def track(item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.005)
+        with lock:
+            running[0] -= 1
+    worker_pool.bounded_map(track, range(20), 3)
+    assert peak[0] == 3
+
+
+def test_serial_runs_in_caller_thread():
+    threads = set()
+
+    def record(item):
+        threads.add(threading.current_thread())
+    worker_pool.bounded_map(record, range(5), 1)
+    worker_pool.bounded_map(record, range(1), 8)
+    assert threads == set([threading.current_thread()])
+    assert worker_pool.bounded_map(record, [], 8) == []
+
+
+def _sync_volume_list(volumes, workers, skipped):
+    """sync_volume_list() of volumes with a sync_volumes costing 1ms of
+    (simulated) etcd/statvfs round trips, raising KeyError for the
+    skipped volumes. Returns the volumes synced, the peak number of
+    volumes synced at once, the number of volumes whose sync started
+    while another one was running, the (volume, ttl) of the calls and
+    the volumes alerted on in emit order.
+    """
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    overlapped = [0]
+    calls = []
+
+    def sync_volumes(volume_state, sync_ttl, delta, context, alerts):
+        with lock:
+            if active[0]:
+                overlapped[0] += 1
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            calls.append((volume_state.name, sync_ttl))
+        try:
+            time.sleep(0.001)
+            if volume_state in skipped:
+                raise KeyError('status')
+            alerts.append((
+                ("volume_status", "Started", volume_state.name,
+                 "volume_%s" % volume_state.name, "INFO"),
+                {}
+            ))
+        finally:
+            with lock:
+                active[0] -= 1
+
+    utilization = mock.patch.object(
+        sds_sync.brick_utilization, 'bricks_utilization', return_value={}
+    )
+    emit_event = mock.patch('tendrl.commons.utils.event_utils.emit_event')
+    with mock.patch.object(sds_sync, 'sync_volumes', sync_volumes):
+        with utilization, emit_event as emit:
+            synced = sds_sync.sync_volume_list(
+                volumes, 100, mock.Mock(), workers, mock.MagicMock()
+            )
+    return (
+        synced, peak[0], overlapped[0], sorted(calls),
+        [call[0][2] for call in emit.call_args_list]
+    )
+
+
+def test_sync_volume_list_500_volumes():
+    # serial and pooled sync_volume_list of a synthetic 500 volume
+    # get-state, every 50th volume with incomplete details
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        state_file = os.path.join(tmp_dir, 'glusterd-state')
+        with open(state_file, 'w') as f:
+            f.write(_get_state_body(volumes=500, bricks=3, clients=1))
+        state = get_state.load(state_file)
+    finally:
+        shutil.rmtree(tmp_dir)
+    volumes = state.volumes
+    assert len(volumes) == 500
+    skipped = volumes[::50]
+    alerted = [
+        volume.name for volume in volumes if volume not in skipped
+    ]
+    ttls = sorted(
+        (volume.name, 100 + index) for index, volume in enumerate(volumes)
+    )
+
+    synced, peak, overlapped, calls, emitted = _sync_volume_list(
+        volumes, 1, skipped
+    )
+    assert (synced, peak, overlapped) == (490, 1, 0)
+    assert calls == ttls
+    assert emitted == alerted
+
+    synced, peak, overlapped, calls, emitted = _sync_volume_list(
+        volumes, 8, skipped
+    )
+    # same TTLs, skips and alert order as the serial run, with up to 8
+    # volumes synced at once
+    assert synced == 490
+    assert calls == ttls
+    assert emitted == alerted
+    assert 1 < peak <= 8
+    assert overlapped > 250
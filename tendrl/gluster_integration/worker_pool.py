@@ -0,0 +1,66 @@
+import Queue
+import sys
+import threading
+
+
+class WorkResult(object):
+    """Outcome of one bounded_map() call: either a value or an error"""
+
+    def __init__(self, value=None, exc_info=None):
+        self.value = value
+        self.exc_info = exc_info
+
+    @property
+    def error(self):
+        if self.exc_info is None:
+            return None
+        return self.exc_info[1]
+
+    def get(self):
+        if self.exc_info is not None:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.value
+
+
+def _call(func, item):
+    try:
+        return WorkResult(func(item))
+    except Exception:
+        return WorkResult(exc_info=sys.exc_info())
+
+
+def bounded_map(func, items, workers=1):
+    """Call func(item) for every item with at most `workers` threads
+
+    Returns one WorkResult per item, in the order of items, so callers
+    can post-process the results (raise alerts, stop at the first
+    error ...) exactly like a serial loop would. With workers <= 1 (or
+    a single item) everything runs in the calling thread.
+    """
+    items = list(items)
+    workers = min(int(workers or 1), len(items))
+    if workers <= 1:
+        return [_call(func, item) for item in items]
+
+    results = [None] * len(items)
+    pending = Queue.Queue()
+    for index, item in enumerate(items):
+        pending.put((index, item))
+
+    def worker():
+        while True:
+            try:
+                index, item = pending.get_nowait()
+            except Queue.Empty:
+                return
+            results[index] = _call(func, item)
+
+    threads = []
+    for _ in range(workers):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results